@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the size and decoding speed of the compiled e2e corpus and the
+stories in benchmarks/stories in every output format.
+
+    python -m benchmarks.formats [--runs N]
+"""
+import argparse
+import json
+import time
+
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.compiler.binary import BinaryEncoder, BinaryLoader
+
+from tests.e2e.utils import parse_features
+
+from .suite import e2e_dir, e2e_features, load_corpus, stories_dir
+
+
+def compile_stories(corpus):
+    compiled = {}
+    for name, source, nodes in corpus:
+        story = Story(source, Features(parse_features(e2e_features, source)))
+        compiled[name] = story.process()
+    return compiled
+
+
+def best_time(function, data, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(data)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    compiled = compile_stories(load_corpus([e2e_dir, stories_dir]))
+    formats = {
+        'json': (json.dumps(compiled, indent=2).encode('utf-8'),
+                 json.loads),
+        'json (compact)': (json.dumps(compiled, separators=(',', ':'))
+                           .encode('utf-8'), json.loads),
+        'binary': (BinaryEncoder().encode(compiled), BinaryLoader.load),
+    }
+    print('{} stories'.format(len(compiled)))
+    print('{:<16} {:>12} {:>12}'.format('Format', 'Bytes', 'Decode (ms)'))
+    for name, (data, load) in formats.items():
+        assert load(data) == compiled
+        seconds = best_time(load, data, args.runs)
+        print('{:<16} {:>12} {:>12.2f}'.format(name, len(data),
+                                               seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
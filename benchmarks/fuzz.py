@@ -0,0 +1,614 @@
+# -*- coding: utf-8 -*-
+"""
+Looks for inputs that are pathologically slow to compile, or crash the
+compiler, by deriving random stories from the grammar and mutating the e2e
+stories. Every phase is timed and inputs over the time budget are
+minimized and can be saved to the regression corpus with their budget:
+
+    python -m benchmarks.fuzz --seconds 60 --save
+    python -m benchmarks.fuzz --check
+
+An input is over budget when it takes longer than --allowance plus
+--per-byte seconds for every byte of its source. The corpus keeps budgets
+relative to the time a generated reference story takes to compile, so that
+they hold on faster and slower machines.
+"""
+import argparse
+import hashlib
+import io
+import json
+import random
+import re
+import signal
+import sys
+import time
+import traceback
+from collections import defaultdict
+from glob import glob
+from os import path
+
+from lark.load_grammar import GrammarLoader
+
+from storyscript.ErrorCodes import ErrorCodes
+from storyscript.Features import Features
+from storyscript.Profiler import Profiler
+from storyscript.Story import Story, _parser
+from storyscript.exceptions import StoryError
+from storyscript.parser.Grammar import Grammar
+
+from tests.e2e.utils import parse_features
+
+from .generator import StoryGenerator
+from .suite import e2e_dir, e2e_features, root
+
+corpus_dir = path.join(root, 'benchmarks', 'corpus')
+budgets_file = path.join(corpus_dir, 'budgets.json')
+
+# sample values of the terminals defined by regular expressions
+samples = {
+    'NAME': ['a', 'b', 'items', 'result', 'x', 'http', 'fetch', 'item'],
+    'RAW_INT': ['0', '1', '7', '42'],
+    'INT': ['0', '1', '-3', '42'],
+    'FLOAT': ['1.5', '-0.25', '.5'],
+    'SINGLE_QUOTED': ["'a'", "'b c'"],
+    'DOUBLE_QUOTED': ['"a"', '"text {a}"', '"{a} and {b}"'],
+    'SINGLE_QUOTED_HEREDOC': ["'''a\nb'''"],
+    'DOUBLE_QUOTED_HEREDOC': ['"""a {b}\nc"""'],
+    'REGEXP': ['/ab+/', '/^x/i'],
+    'RAW_TIME': ['5m', '1h30m', '10s'],
+}
+
+# fragments inserted by the mutations, many of them chosen to derail the
+# parser's error recovery
+fragments = [':', ')', '(', '[', ']', '{', '}', ',', '"', "'", '=', '.',
+             ' as ', ' then ', ' if ', '\n', '    ', '\n    ', '#', '/']
+
+
+class Timeout(Exception):
+    pass
+
+
+class GrammarFuzzer:
+    """
+    Derives random stories from the grammar. Past max_depth, derivations
+    take the expansion that terminates the soonest.
+    """
+
+    def __init__(self, rng, max_depth=12):
+        self.rng = rng
+        self.max_depth = max_depth
+        grammar = GrammarLoader().load_grammar(Grammar().build(), '<fuzz>')
+        terminals, rules, ignore = grammar.compile()
+        self.terminals = {t.name: t.pattern for t in terminals}
+        self.rules = defaultdict(list)
+        for rule in rules:
+            self.rules[rule.origin.name].append(rule.expansion)
+        self.heights = self.min_heights()
+
+    def min_heights(self):
+        """
+        Computes the height of the shallowest derivation of every rule.
+        """
+        heights = {}
+        changed = True
+        while changed:
+            changed = False
+            for name, expansions in self.rules.items():
+                for expansion in expansions:
+                    height = self.height(expansion, heights)
+                    if height is not None and \
+                            height < heights.get(name, float('inf')):
+                        heights[name] = height
+                        changed = True
+        return heights
+
+    @staticmethod
+    def height(expansion, heights):
+        height = 0
+        for symbol in expansion:
+            if not symbol.is_term:
+                if symbol.name not in heights:
+                    return None
+                height = max(height, heights[symbol.name])
+        return height + 1
+
+    def terminal(self, name):
+        if name in samples:
+            return self.rng.choice(samples[name])
+        return self.terminals[name].value
+
+    def derive(self, name, depth, tokens):
+        expansions = self.rules[name]
+        if depth >= self.max_depth:
+            shallowest = min(self.height(expansion, self.heights)
+                             for expansion in expansions)
+            expansions = [expansion for expansion in expansions
+                          if self.height(expansion, self.heights) ==
+                          shallowest]
+        for symbol in self.rng.choice(expansions):
+            if symbol.is_term:
+                tokens.append(symbol.name)
+            else:
+                self.derive(symbol.name, depth + 1, tokens)
+        return tokens
+
+    def render(self, tokens):
+        """
+        Renders terminals as source, turning the indenter's tokens back
+        into indentation.
+        """
+        parts = []
+        level = 0
+        line_start = True
+        for name in tokens:
+            if name == '_NL':
+                parts.append('\n')
+                line_start = True
+            elif name == '_INDENT':
+                level += 1
+            elif name in ('_DEDENT', '_DOUBLE_DEDENT'):
+                level = max(level - 1, 0)
+            else:
+                if line_start:
+                    parts.append('    ' * level)
+                    line_start = False
+                else:
+                    parts.append(' ')
+                parts.append(self.terminal(name))
+        return ''.join(parts)
+
+    def story(self):
+        return self.render(self.derive('start', 0, []))
+
+
+class Mutator:
+    """
+    Mutates seed stories, mostly by growing the constructs that could be
+    expensive to compile.
+    """
+
+    def __init__(self, rng, seeds, max_size=400):
+        self.rng = rng
+        self.seeds = seeds
+        self.max_size = max_size
+
+    def size(self):
+        """
+        Returns a random size, mostly small but sometimes large enough for
+        superlinear costs to show.
+        """
+        return int(self.rng.expovariate(1 / 40)) % self.max_size + 1
+
+    def repeat_lines(self, lines):
+        index = self.rng.randrange(len(lines))
+        return lines[:index] + [lines[index]] * self.size() + lines[index:]
+
+    def repeat_story(self, lines):
+        return lines * self.size()
+
+    def nest(self, lines):
+        depth = self.size()
+        nested = ['{}if true'.format('    ' * i) for i in range(depth)]
+        return nested + ['    ' * depth + line for line in lines]
+
+    def parentheses(self, lines):
+        size = self.size()
+        return lines + ['n = {}1{}'.format('(' * size, ')' * size)]
+
+    def chain(self, lines):
+        operators = ['+', '*', 'and', 'or', '>', 'then increment']
+        operator = self.rng.choice(operators)
+        terms = ' {} '.format(operator).join(['1'] * (self.size() + 1))
+        return lines + ['n = {}'.format(terms)]
+
+    def collection(self, lines):
+        items = ', '.join(['{"k": [1, 2]}'] * self.size())
+        return lines + ['n = [{}]'.format(items)]
+
+    def template(self, lines):
+        values = ' '.join(['{n}'] * self.size())
+        return lines + ['n = 1', 's = "{}"'.format(values)]
+
+    def splice(self, lines):
+        other = self.rng.choice(self.seeds).split('\n')
+        index = self.rng.randrange(len(lines) + 1)
+        return lines[:index] + other + lines[index:]
+
+    def insert(self, lines):
+        index = self.rng.randrange(len(lines))
+        line = lines[index]
+        for _ in range(self.rng.randint(1, 3)):
+            position = self.rng.randint(0, len(line))
+            fragment = self.rng.choice(fragments)
+            line = line[:position] + fragment + line[position:]
+        return lines[:index] + [line] + lines[index + 1:]
+
+    def delete(self, lines):
+        index = self.rng.randrange(len(lines))
+        line = lines[index]
+        start = self.rng.randint(0, len(line))
+        end = self.rng.randint(start, len(line))
+        return lines[:index] + [line[:start] + line[end:]] + lines[index + 1:]
+
+    def mutations(self):
+        return [self.repeat_lines, self.repeat_story, self.nest,
+                self.parentheses, self.chain, self.collection, self.template,
+                self.splice, self.insert, self.delete]
+
+    def mutate(self, source):
+        """
+        Applies one to three random mutations, returning their names and
+        the mutated source.
+        """
+        lines = source.split('\n') or ['']
+        names = []
+        for _ in range(self.rng.randint(1, 3)):
+            mutation = self.rng.choice(self.mutations())
+            names.append(mutation.__name__)
+            lines = mutation(lines)
+        return '+'.join(names), '\n'.join(lines)
+
+
+def crash(error):
+    """
+    Names an unexpected exception and the innermost function of the
+    compiler which raised it. Line numbers are left out, so that crashes are
+    still recognized after the code around them changes.
+    """
+    frames = traceback.extract_tb(error.__traceback__)
+    frames = [frame for frame in frames if 'storyscript' in frame.filename]
+    if not frames:
+        return type(error).__name__
+    frame = frames[-1]
+    filename = path.relpath(frame.filename, root)
+    return '{} ({}:{})'.format(type(error).__name__, filename, frame.name)
+
+
+def compile_source(source, features):
+    """
+    Compiles a source with profiling, returning the profiler and the
+    outcome: ok, the code of a StoryError or the crash of any other
+    exception.
+    """
+    profiler = Profiler()
+    with profiler.span('story', story='fuzz'):
+        try:
+            Story(source, features, profiler=profiler).process()
+            return profiler, 'ok'
+        except StoryError as error:
+            story_error = error
+        except Timeout:
+            raise
+        except Exception as error:
+            return profiler, crash(error)
+        with profiler.span('error'):
+            try:
+                story_error.message()
+            except Timeout:
+                raise
+            except Exception as error:
+                return profiler, crash(error)
+        return profiler, story_error.error_code()
+
+
+def dominant(profiler):
+    """
+    Returns the innermost phase that took the most time.
+    """
+    parents = {span.parent.name for span in profiler.spans if span.parent}
+    totals = defaultdict(int)
+    for span in profiler.spans:
+        if span.name not in parents:
+            totals[span.name] += span.duration()
+    return max(totals, key=totals.get, default=None)
+
+
+def measure(source, features, timeout):
+    """
+    Returns the seconds, phases, dominant phase and outcome of compiling a
+    source. Inputs running past timeout are interrupted.
+    """
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        profiler, outcome = compile_source(source, features)
+    except Timeout:
+        return timeout, {}, None, 'Timeout'
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    phases = {name: seconds for name, seconds, calls in profiler.phases()}
+    return profiler.total(), phases, dominant(profiler), outcome
+
+
+def crashed(outcome):
+    """
+    Whether an outcome is an internal error rather than a compiled story or
+    a helpful error.
+    """
+    if outcome == ErrorCodes.unidentified_error[0]:
+        return True
+    return not (outcome == 'ok' or re.match(r'E\d+$', outcome))
+
+
+class Budget:
+    """
+    The time a source may take to compile: an allowance plus a cost per
+    byte.
+    """
+
+    def __init__(self, allowance, per_byte):
+        self.allowance = allowance
+        self.per_byte = per_byte
+
+    def seconds(self, source):
+        return self.allowance + self.per_byte * len(source.encode('utf-8'))
+
+    def exceeded(self, source, seconds):
+        return seconds > self.seconds(source)
+
+
+def minimize(source, failing, seconds):
+    """
+    Shrinks a source while failing(source) holds, removing chunks of lines
+    and then of words, in the way of delta debugging. Gives up on shrinking
+    further after the given seconds.
+    """
+    deadline = time.perf_counter() + seconds
+    for separator in ('\n', ' '):
+        parts = source.split(separator)
+        chunk = len(parts) // 2
+        while chunk >= 1:
+            index = 0
+            while index < len(parts):
+                if time.perf_counter() > deadline:
+                    return separator.join(parts)
+                candidate = parts[:index] + parts[index + chunk:]
+                if candidate and failing(separator.join(candidate)):
+                    parts = candidate
+                else:
+                    index += chunk
+            chunk //= 2
+        source = separator.join(parts)
+    return source
+
+
+class Fuzzer:
+
+    def __init__(self, budget, rng, timeout=10, repeat=2,
+                 minimize_seconds=30):
+        self.budget = budget
+        self.rng = rng
+        self.timeout = timeout
+        self.repeat = repeat
+        self.minimize_seconds = minimize_seconds
+        self.seeds = self.load_seeds()
+        self.grammar = GrammarFuzzer(rng)
+        self.mutator = Mutator(rng, [source for source, _ in self.seeds])
+        self.runs = 0
+
+    @staticmethod
+    def load_seeds():
+        seeds = []
+        files = glob(path.join(e2e_dir, '**', '*.story'), recursive=True)
+        for file in sorted(files):
+            with io.open(file, 'r', encoding='utf8') as f:
+                source = f.read()
+            seeds.append((source, parse_features(e2e_features, source)))
+        return seeds
+
+    def candidate(self):
+        """
+        Returns the origin, source and features of a new input.
+        """
+        if self.rng.random() < 0.3:
+            return 'grammar', self.grammar.story(), {'globals': True}
+        seed, features = self.rng.choice(self.seeds)
+        origin, source = self.mutator.mutate(seed)
+        return origin, source, features
+
+    def best(self, source, features):
+        """
+        Measures a source several times, keeping the fastest run.
+        """
+        results = [measure(source, Features(features), self.timeout)
+                   for _ in range(self.repeat)]
+        return min(results, key=lambda result: result[0])
+
+    def offends(self, source, features, outcome):
+        """
+        Whether a source crashes like outcome or, for slow inputs, is over
+        budget on all of its runs.
+        """
+        features = Features(features)
+        for _ in range(self.repeat):
+            seconds, phases, phase, new_outcome = measure(source, features,
+                                                          self.timeout)
+            if crashed(outcome):
+                return new_outcome == outcome
+            if not self.budget.exceeded(source, seconds):
+                return False
+        return True
+
+    def signature(self, source, seconds, phase, outcome):
+        """
+        Tells offenders apart by their crash, or by the phase that was slow.
+        Returns None for inputs that aren't offending.
+        """
+        if crashed(outcome):
+            return outcome
+        if self.budget.exceeded(source, seconds):
+            return (outcome, phase)
+        return None
+
+    def run(self, seconds):
+        """
+        Fuzzes for the given number of seconds, returning the minimized
+        offenders. Every signature is minimized and reported once.
+        """
+        offenders = {}
+        signatures = set()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            origin, source, features = self.candidate()
+            self.runs += 1
+            took, phases, phase, outcome = measure(
+                source, Features(features), self.timeout)
+            signature = self.signature(source, took, phase, outcome)
+            if signature is None or signature in signatures or \
+                    not self.offends(source, features, outcome):
+                continue
+            signatures.add(signature)
+            source = minimize(source, lambda candidate: self.offends(
+                candidate, features, outcome), self.minimize_seconds)
+            took, phases, phase, outcome = self.best(source, features)
+            minimized = self.signature(source, took, phase, outcome)
+            if minimized != signature:
+                if minimized in signatures:
+                    continue
+                signatures.add(minimized)
+            name = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+            offenders[name] = {
+                'source': source,
+                'features': features,
+                'origin': origin,
+                'outcome': outcome,
+                'phase': phase,
+                'seconds': took,
+                'budget': self.budget.seconds(source),
+                'bytes': len(source.encode('utf-8')),
+            }
+            print('{} {} {:.2f} ms {} bytes ({}, {})'.format(
+                name, outcome, took * 1000, offenders[name]['bytes'],
+                origin, phase))
+        return offenders
+
+
+def reference_seconds(timeout, repeat):
+    """
+    Times the compilation of a fixed generated story, which is the unit of
+    the budgets of the corpus.
+    """
+    source = StoryGenerator().story()
+    features = Features(parse_features(e2e_features, source))
+    return min(measure(source, features, timeout)[0]
+               for _ in range(max(repeat, 3)))
+
+
+def load_budgets():
+    if not path.isfile(budgets_file):
+        return {}
+    with io.open(budgets_file, 'r') as f:
+        return json.load(f)
+
+
+def save(offenders, headroom, max_bytes, reference):
+    """
+    Adds offenders to the regression corpus, allowing them headroom times
+    the time they took, and at least the fuzzing budget, in units of the
+    reference time. Offenders that couldn't be minimized below max_bytes
+    are left out.
+    """
+    budgets = load_budgets()
+    for name, offender in offenders.items():
+        if offender['bytes'] > max_bytes:
+            print('{} is too large to be saved'.format(name))
+            continue
+        story = path.join(corpus_dir, '{}.story'.format(name))
+        with io.open(story, 'w', encoding='utf8') as f:
+            f.write(offender['source'])
+        seconds = max(offender['seconds'] * headroom, offender['budget'])
+        budgets[name] = {
+            'ratio': round(seconds / reference, 2),
+            'bytes': offender['bytes'],
+            'features': offender['features'],
+            'origin': offender['origin'],
+            'outcome': offender['outcome'],
+            'phase': offender['phase'],
+        }
+    with io.open(budgets_file, 'w') as f:
+        json.dump(budgets, f, indent=2, sort_keys=True)
+
+
+def check(timeout, repeat):
+    """
+    Compiles the regression corpus, returning the entries over their
+    budget or crashing differently from when they were saved, as (name,
+    budget, seconds, outcome) tuples.
+    """
+    reference = reference_seconds(timeout, repeat)
+    failures = []
+    for name, budget in sorted(load_budgets().items()):
+        story = path.join(corpus_dir, '{}.story'.format(name))
+        with io.open(story, 'r', encoding='utf8') as f:
+            source = f.read()
+        results = [measure(source, Features(budget['features']), timeout)
+                   for _ in range(repeat)]
+        seconds, phases, phase, outcome = min(results, key=lambda r: r[0])
+        new_crash = crashed(outcome) and outcome != budget['outcome']
+        limit = budget['ratio'] * reference
+        if seconds > limit or new_crash:
+            failures.append((name, limit, seconds, outcome))
+    return failures
+
+
+def interrupt(signum, frame):
+    raise Timeout()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=60,
+                        help='how long to fuzz for')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the random generator')
+    parser.add_argument('--allowance', type=float, default=0.02,
+                        help='seconds any input may take')
+    parser.add_argument('--per-byte', type=float, default=0.0002,
+                        help='seconds every byte of an input may add')
+    parser.add_argument('--timeout', type=float, default=10,
+                        help='seconds after which an input is interrupted')
+    parser.add_argument('--repeat', type=int, default=2,
+                        help='runs per offender, the fastest is kept')
+    parser.add_argument('--minimize', type=float, default=30,
+                        help='seconds spent minimizing an offender')
+    parser.add_argument('--save', action='store_true',
+                        help='add the offenders to the regression corpus')
+    parser.add_argument('--headroom', type=float, default=3,
+                        help='budget of saved offenders, relative to the '
+                        'time they take')
+    parser.add_argument('--max-bytes', type=int, default=4096,
+                        help='size of the largest offender that is saved')
+    parser.add_argument('--check', action='store_true',
+                        help='check the regression corpus against its '
+                        'budgets instead of fuzzing')
+    args = parser.parse_args(argv)
+
+    signal.signal(signal.SIGALRM, interrupt)
+    _parser()
+
+    if args.check:
+        failures = check(args.timeout, args.repeat)
+        for name, budget, seconds, outcome in failures:
+            print('FAILED {}: {:.2f} ms, budget {:.2f} ms ({})'.format(
+                name, seconds * 1000, budget * 1000, outcome))
+        if failures:
+            return 1
+        print('{} stories within budget'.format(len(load_budgets())))
+        return 0
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    print('seed {}'.format(seed))
+    fuzzer = Fuzzer(Budget(args.allowance, args.per_byte),
+                    random.Random(seed), timeout=args.timeout,
+                    repeat=args.repeat, minimize_seconds=args.minimize)
+    offenders = fuzzer.run(args.seconds)
+    print('{} inputs, {} offenders'.format(fuzzer.runs, len(offenders)))
+    if args.save and offenders:
+        reference = reference_seconds(args.timeout, args.repeat)
+        save(offenders, args.headroom, args.max_bytes, reference)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
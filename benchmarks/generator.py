@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Generates valid synthetic stories of tunable size, for finding how the
+compiler scales:
+
+    python -m benchmarks.generator --functions 10 --depth 3 > big.story
+"""
+import argparse
+
+
+class StoryGenerator:
+    """
+    Generates a story and the modules it imports. Every generated name is
+    unique, so that stories stay valid whatever the parameters.
+    """
+
+    def __init__(self, functions=4, depth=2, statements=5, templates=1,
+                 services=1, mutations=1, imports=0, collection=3):
+        self.functions = functions
+        self.depth = depth
+        self.statements = statements
+        self.templates = templates
+        self.services = services
+        self.mutations = mutations
+        self.imports = imports
+        self.collection = collection
+        self.counter = 0
+
+    def name(self, prefix):
+        self.counter += 1
+        return '{}{}'.format(prefix, self.counter)
+
+    def arithmetic(self, scope):
+        name = self.name('a')
+        return name, '{} = {} + {} * 2'.format(name, scope[-1], len(scope))
+
+    def template(self, scope):
+        name = self.name('s')
+        values = ' '.join('{{{}}}'.format(scope[i % len(scope)])
+                          for i in range(self.templates))
+        return None, '{} = "text {}"'.format(name, values)
+
+    def service(self, scope):
+        name = self.name('r')
+        calls = ['(service{} fetch value:{})'.format(i, scope[-1])
+                 for i in range(self.services)]
+        return None, '{} = {}'.format(name, ' + '.join(calls or ['0']))
+
+    def mutation(self, scope):
+        name = self.name('m')
+        chain = ' then '.join(['increment'] * max(self.mutations, 1))
+        return name, '{} = {} {}'.format(name, scope[-1], chain)
+
+    def collections(self, scope):
+        name = self.name('l')
+        items = [scope[i % len(scope)] for i in range(self.collection)]
+        keys = ['"k{}": {}'.format(i, item) for i, item in enumerate(items)]
+        return None, '{} = [{}]\n{} = {{{}}}'.format(
+            name, ', '.join(items), self.name('d'), ', '.join(keys))
+
+    def statement(self, index, scope):
+        """
+        Returns the name of the int variable defined by a statement, if
+        any, and its source.
+        """
+        kinds = [self.arithmetic, self.template, self.service,
+                 self.mutation, self.collections]
+        return kinds[index % len(kinds)](scope)
+
+    def block(self, indent, depth, scope):
+        """
+        Generates the statements of a block and its nested blocks, returning
+        its lines and the int variables visible at its end. Only the if
+        branch nests further, so that the size grows linearly with depth.
+        """
+        scope = list(scope)
+        lines = []
+        for index in range(self.statements):
+            name, source = self.statement(index, scope)
+            for line in source.split('\n'):
+                lines.append(indent + line)
+            if name is not None:
+                scope.append(name)
+        if depth > 0:
+            condition = '{} > {}'.format(scope[-1], depth)
+            lines.append('{}if {}'.format(indent, condition))
+            nested, _ = self.block(indent + '    ', depth - 1, scope)
+            lines.extend(nested)
+            lines.append('{}else'.format(indent))
+            nested, _ = self.block(indent + '    ', 0, scope)
+            lines.extend(nested)
+            items = self.name('items')
+            lines.append('{}{} = [{}]'.format(indent, items, scope[-1]))
+            item = self.name('item')
+            lines.append('{}foreach {} as {}'.format(indent, items, item))
+            nested, _ = self.block(indent + '    ', 0, scope + [item])
+            lines.extend(nested)
+        return lines, scope
+
+    def function(self, name):
+        lines = ['function {} x:int returns int'.format(name)]
+        body, scope = self.block('    ', self.depth, ['x'])
+        lines.extend(body)
+        lines.append('    return {}'.format(scope[-1]))
+        return lines
+
+    def story(self, modules=()):
+        """
+        Generates the source of a single story.
+        """
+        lines = ['import "{}" as {}'.format(module, module[:-len('.story')])
+                 for module in modules]
+        functions = [self.name('f') for _ in range(self.functions)]
+        for function in functions:
+            lines.extend(self.function(function))
+        lines.append('base = 1')
+        scope = ['base']
+        for function in functions:
+            result = self.name('c')
+            lines.append('{} = {}(x: {})'.format(result, function, scope[-1]))
+            scope.append(result)
+        body, _ = self.block('', self.depth, scope)
+        lines.extend(body)
+        return '\n'.join(lines) + '\n'
+
+    def generate(self, entrypoint='main.story'):
+        """
+        Returns the sources of the entrypoint and of the modules it
+        imports, by path.
+        """
+        modules = ['module{}.story'.format(i) for i in range(self.imports)]
+        stories = {module: self.story() for module in modules}
+        stories[entrypoint] = self.story(modules)
+        return stories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    for option, default in [('functions', 4), ('depth', 2),
+                            ('statements', 5), ('templates', 1),
+                            ('services', 1), ('mutations', 1),
+                            ('collection', 3)]:
+        parser.add_argument('--' + option, type=int, default=default)
+    args = parser.parse_args(argv)
+    generator = StoryGenerator(**vars(args))
+    print(generator.story(), end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Measures the startup time of the storyscript package and its command line.
+
+    python -m benchmarks.imports [--runs N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+commands = {
+    'import storyscript': [sys.executable, '-c', 'import storyscript'],
+    'import storyscript.Api': [sys.executable, '-c',
+                               'import storyscript.Api'],
+    'storyscript version': [sys.executable, '-c',
+                            'from storyscript.Cli import Cli; '
+                            'Cli.main(["version"])'],
+    'python (baseline)': [sys.executable, '-c', 'pass'],
+}
+
+
+def measure(command, runs):
+    """
+    Returns the wall-clock times of running a command in a fresh interpreter
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+    for name, command in commands.items():
+        times = measure(command, args.runs)
+        print('{:<26} median {:7.1f} ms  min {:7.1f} ms'.format(
+            name, statistics.median(times) * 1000, min(times) * 1000))
+
+
+if __name__ == '__main__':
+    main()
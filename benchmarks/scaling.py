@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how the compile time and memory of Parser, Lowering, Semantics and
+JSONCompiler grow with the size parameters of synthetic stories:
+
+    python -m benchmarks.scaling --parameter functions --values 1 2 4 8 16
+    python -m benchmarks.scaling --plot scaling/
+
+Every parameter is swept on its own, keeping the others at their defaults.
+Growth exponents well above 1 point at superlinear behaviour. Plots need
+matplotlib and are skipped without it.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import tracemalloc
+
+from storyscript.Bundle import Bundle
+from storyscript.Profiler import Profiler
+from storyscript.Story import _parser
+
+from .generator import StoryGenerator
+
+sweeps = {
+    'functions': [1, 2, 4, 8, 16, 32],
+    'depth': [1, 2, 4, 8, 16, 32],
+    'statements': [5, 10, 20, 40, 80],
+    'templates': [1, 2, 4, 8, 16, 32],
+    'services': [1, 2, 4, 8, 16, 32],
+    'mutations': [1, 2, 4, 8, 16, 32],
+    'imports': [1, 2, 4, 8, 16, 32],
+    'collection': [1, 4, 16, 64, 256],
+}
+
+# the compiler components and the profiler phases they are made of
+components = {
+    'Parser': ('parse', 'transform'),
+    'Lowering': ('lowering',),
+    'Semantics': ('semantics',),
+    'JSONCompiler': ('JSONCompiler',),
+}
+
+
+def compile_stories(stories, profiler=None):
+    bundle = Bundle(story_files=stories, profiler=profiler)
+    bundle.compile(['main.story'], parser=None)
+
+
+def measure(parameter, value, repeat):
+    """
+    Returns the fastest time of every component and the peak memory of
+    compiling a story generated with parameter set to value.
+    """
+    stories = StoryGenerator(**{parameter: value}).generate()
+    best = {}
+    for _ in range(repeat):
+        profiler = Profiler()
+        compile_stories(stories, profiler)
+        phases = {name: seconds for name, seconds, calls
+                  in profiler.phases()}
+        for component, names in components.items():
+            seconds = sum(phases.get(name, 0) for name in names)
+            best[component] = min(best.get(component, seconds), seconds)
+    tracemalloc.start()
+    compile_stories(stories)
+    best['memory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best['lines'] = sum(len(story.splitlines()) for story in stories.values())
+    return best
+
+
+def exponent(points, metric):
+    """
+    Estimates the growth exponent of a metric from the last two points.
+    """
+    (x1, first), (x2, last) = points[-2], points[-1]
+    if first[metric] <= 0 or last[metric] <= 0 or x1 == x2:
+        return None
+    return math.log(last[metric] / first[metric]) / math.log(x2 / x1)
+
+
+def sweep(parameter, values, repeat):
+    points = [(value, measure(parameter, value, repeat)) for value in values]
+    header = '{:<12} {:>8}'.format(parameter, 'Lines')
+    header += ''.join('{:>14}'.format(name) for name in components)
+    header += '{:>14}'.format('Memory (KiB)')
+    print(header)
+    for value, result in points:
+        row = '{:<12} {:>8}'.format(value, result['lines'])
+        row += ''.join('{:>14.2f}'.format(result[name] * 1000)
+                       for name in components)
+        row += '{:>14.1f}'.format(result['memory'] / 1024)
+        print(row)
+    if len(points) > 1:
+        row = '{:<12} {:>8}'.format('exponent', '')
+        for name in list(components) + ['memory']:
+            growth = exponent(points, name)
+            row += '{:>14}'.format('-' if growth is None
+                                   else '{:.2f}'.format(growth))
+        print(row)
+    print()
+    return points
+
+
+def plot(results, directory):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as pyplot
+    except ImportError:
+        print('matplotlib is not installed, skipping the plots')
+        return
+    os.makedirs(directory, exist_ok=True)
+    for parameter, points in results.items():
+        figure, (times, memory) = pyplot.subplots(1, 2, figsize=(12, 4))
+        values = [value for value, result in points]
+        for name in components:
+            times.plot(values, [result[name] * 1000 for _, result in points],
+                       marker='o', label=name)
+        times.set_xlabel(parameter)
+        times.set_ylabel('time (ms)')
+        times.legend()
+        memory.plot(values, [result['memory'] / 1024 for _, result in points],
+                    marker='o')
+        memory.set_xlabel(parameter)
+        memory.set_ylabel('peak memory (KiB)')
+        figure.savefig(os.path.join(directory, '{}.png'.format(parameter)))
+        pyplot.close(figure)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parameter', choices=sorted(sweeps),
+                        action='append',
+                        help='parameter to sweep, all of them by default')
+    parser.add_argument('--values', type=int, nargs='+', default=None,
+                        help='values of the swept parameter')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per point, the fastest is kept')
+    parser.add_argument('--json', default=None,
+                        help='write the measurements to a JSON file')
+    parser.add_argument('--plot', default=None,
+                        help='write a plot per parameter to this directory')
+    args = parser.parse_args(argv)
+
+    _parser()
+    results = {}
+    for parameter in args.parameter or sorted(sweeps):
+        values = args.values or sweeps[parameter]
+        results[parameter] = sweep(parameter, values, args.repeat)
+    if args.json:
+        with io.open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.plot:
+        plot(results, args.plot)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Compiles the e2e corpus and the stories in benchmarks/stories, reporting
+the throughput of every compiler phase and the peak memory of compiling a
+story. Results can be saved as a baseline and compared against later:
+
+    python -m benchmarks --save baseline.json
+    python -m benchmarks --compare baseline.json --threshold 0.1
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import tracemalloc
+from glob import glob
+from os import path
+
+from storyscript.Features import Features
+from storyscript.Profiler import Profiler
+from storyscript.Story import Story, _parser
+from storyscript.Version import get_version
+
+from tests.e2e.utils import parse_features
+
+root = path.dirname(path.dirname(path.realpath(__file__)))
+e2e_dir = path.join(root, 'tests', 'e2e')
+stories_dir = path.join(root, 'benchmarks', 'stories')
+# features of the e2e runner, which `# FEAT:` comments of a story extend
+e2e_features = {'globals': True}
+
+# phases which aren't proportional to the size of a story
+ignored_phases = ('parser_init', 'story')
+
+
+def count_nodes(tree):
+    return sum(1 for _ in tree.iter_subtrees())
+
+
+def load_corpus(directories, pattern=None):
+    """
+    Loads the stories that compile successfully, e.g. skipping the e2e
+    stories expecting an error.
+    """
+    corpus = []
+    for directory in directories:
+        files = glob(path.join(directory, '**', '*.story'), recursive=True)
+        for file in sorted(files):
+            name = path.relpath(file, root)
+            if pattern is not None and pattern not in name:
+                continue
+            with io.open(file, 'r', encoding='utf8') as f:
+                source = f.read()
+            features = Features(parse_features(e2e_features, source))
+            story = Story(source, features)
+            try:
+                story.process()
+            except Exception:
+                continue
+            nodes = count_nodes(_parser().parse(source))
+            corpus.append((name, source, nodes))
+    return corpus
+
+
+def compile_corpus(corpus, profiler=None):
+    for name, source, nodes in corpus:
+        story = Story(source, Features(parse_features(e2e_features, source)),
+                      profiler=profiler)
+        if profiler is None:
+            story.process()
+            continue
+        with profiler.span('story', story=name):
+            story.process()
+
+
+def measure_phases(corpus, repeat):
+    """
+    Returns the fastest time of every phase over several runs.
+    """
+    best = {}
+    for _ in range(repeat):
+        profiler = Profiler()
+        compile_corpus(corpus, profiler)
+        for name, seconds, calls in profiler.phases():
+            if name not in ignored_phases:
+                best[name] = min(best.get(name, seconds), seconds)
+        total = profiler.total()
+        best['total'] = min(best.get('total', total), total)
+    return best
+
+
+def measure_memory(corpus):
+    """
+    Returns the peak traced memory of compiling each story.
+    """
+    peaks = {}
+    for entry in corpus:
+        tracemalloc.start()
+        compile_corpus([entry])
+        peaks[entry[0]] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peaks
+
+
+def run(corpus, repeat, memory=True):
+    lines = sum(len(source.splitlines()) for name, source, nodes in corpus)
+    nodes = sum(nodes for name, source, nodes in corpus)
+    phases = {}
+    for name, seconds in measure_phases(corpus, repeat).items():
+        phases[name] = {
+            'seconds': seconds,
+            'lines_per_second': lines / seconds if seconds else None,
+            'nodes_per_second': nodes / seconds if seconds else None,
+        }
+    results = {
+        'version': get_version(),
+        'python': platform.python_version(),
+        'stories': len(corpus),
+        'lines': lines,
+        'nodes': nodes,
+        'phases': phases,
+    }
+    if memory:
+        peaks = measure_memory(corpus)
+        story = max(peaks, key=peaks.get)
+        results['peak_memory'] = peaks[story]
+        results['peak_memory_story'] = story
+    return results
+
+
+def print_results(results):
+    print('{stories} stories, {lines} lines, {nodes} nodes'.format(**results))
+    print('{:<32} {:>11} {:>13} {:>13}'.format('Phase', 'Time (ms)',
+                                               'Lines/s', 'Nodes/s'))
+    phases = sorted(results['phases'].items(),
+                    key=lambda phase: phase[1]['seconds'], reverse=True)
+    for name, phase in phases:
+        print('{:<32} {:>11.2f} {:>13.0f} {:>13.0f}'.format(
+            name, phase['seconds'] * 1000, phase['lines_per_second'] or 0,
+            phase['nodes_per_second'] or 0))
+    if 'peak_memory' in results:
+        print('Peak memory: {:.1f} KiB ({})'.format(
+            results['peak_memory'] / 1024, results['peak_memory_story']))
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns the regressions of results against a baseline, as
+    (metric, baseline value, new value) tuples.
+    """
+    regressions = []
+    for name, phase in baseline['phases'].items():
+        if name not in results['phases']:
+            continue
+        before = phase['seconds']
+        after = results['phases'][name]['seconds']
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    if 'peak_memory' in baseline and 'peak_memory' in results:
+        before = baseline['peak_memory']
+        after = results['peak_memory']
+        if after > before * (1 + threshold):
+            regressions.append(('peak_memory', before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per phase, the fastest is kept')
+    parser.add_argument('--filter', default=None,
+                        help='only compile stories whose path contains this')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the memory measurements')
+    parser.add_argument('--save', default=None,
+                        help='write the results to a JSON baseline')
+    parser.add_argument('--compare', default=None,
+                        help='compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus([e2e_dir, stories_dir], pattern=args.filter)
+    results = run(corpus, args.repeat, memory=not args.no_memory)
+    print_results(results)
+
+    if args.save:
+        with io.open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with io.open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if (baseline['stories'], baseline['lines']) != \
+                (results['stories'], results['lines']):
+            print('Warning: the baseline was measured on a different corpus')
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print('REGRESSION {}: {:.6g} -> {:.6g} (+{:.1f}%)'.format(
+                name, before, after, (after / before - 1) * 100))
+        if regressions:
+            return 1
+        print('No regressions past {:.0f}%'.format(args.threshold * 100))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
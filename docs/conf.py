@@ -68,7 +68,7 @@ try:
     script = io.open(path.join(root_dir, 'storyscript', 'Version.py')).read()
     result = {'__file__': path.join(root_dir, 'storyscript', 'Version.py')}
     exec(script, result)
-    version = result['release_version']
+    version = result['get_release_version']()
 except FileNotFoundError:
     pass
 # The full version, including alpha/beta/rc tags.
@@ -24,8 +24,8 @@ release_version = None
 try:
     result = {'__file__': path.join(root_dir, name, 'Version.py')}
     exec(read(path.join(name, 'Version.py')), result)
-    version = result['version']
-    release_version = result['release_version']
+    version = result['get_version']()
+    release_version = result['get_release_version']()
 except FileNotFoundError:
     pass
 
@@ -59,6 +59,10 @@ extras = [
     'guzzle-sphinx-theme'
 ]
 
+fast_extras = [
+    'orjson'
+]
+
 ###############################################################################
 # Custom build steps
 ###############################################################################
@@ -128,7 +132,8 @@ setup(name=name,
       zip_safe=True,
       install_requires=requirements,
       extras_require={
-          'docs': extras
+          'docs': extras,
+          'fast': fast_extras
       },
       python_requires='>=3.5',
       entry_points={
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from .Bundle import Bundle
 from .Features import Features
+from .Profiler import NullProfiler, Profiler
+from .Serializer import Serializer
 from .Story import Story
 from .exceptions import StoryError
 
@@ -11,25 +13,28 @@ class StoryscriptCompilationResult:
     Contains the compiled story or a list of compilation errors.
     """
 
-    def __init__(self, result, errors):
+    def __init__(self, result, errors, stats=None, warnings=None):
         self._result = result
         self._errors = errors
         self._deprecations = []
-        self._warnings = []
+        if warnings is None:
+            warnings = []
+        self._warnings = warnings
+        self._stats = stats
 
     @classmethod
-    def from_result(cls, story):
+    def from_result(cls, story, stats=None, warnings=None):
         """
         Creates a CompilationResult from a result.
         """
-        return cls(story, errors=[])
+        return cls(story, errors=[], stats=stats, warnings=warnings)
 
     @classmethod
-    def from_error(cls, error):
+    def from_error(cls, error, stats=None):
         """
         Creates a CompilationResult from a single error.
         """
-        return cls(None, errors=[error])
+        return cls(None, errors=[error], stats=stats)
 
     def result(self):
         """
@@ -37,6 +42,13 @@ class StoryscriptCompilationResult:
         """
         return self._result
 
+    def encoded(self, compact=False):
+        """
+        Returns the compiled story encoded as UTF-8 JSON bytes, with the
+        fast encoder when it is installed.
+        """
+        return Serializer(compact=compact).dumpb(self._result)
+
     def errors(self):
         """
         Returns a list of all errorsemitted by the Storyscript compiler.
@@ -55,6 +67,16 @@ class StoryscriptCompilationResult:
         """
         return self._deprecations
 
+    def stats(self):
+        """
+        Returns the counters and per-phase durations in seconds collected
+        during the compilation: source_lines, tokens, nodes and
+        lowered_nodes (before and after lowering), temporaries, mutations,
+        cache_hits, cache_misses and phases. Statistics are only collected
+        when requested with stats, and are None otherwise.
+        """
+        return self._stats
+
     def success(self):
         """
         Returns `True` if the compilation succeeded.
@@ -71,59 +93,121 @@ class StoryscriptCompilationResult:
 
 class Api:
     """
-    Exposes functionalities for external use
+    Exposes functionalities for external use. Given stats, the results
+    report the statistics of the compilation.
     """
     @staticmethod
-    def loads(string, features=None):
+    def profiler(stats):
         """
-        Load story from a string.
+        Returns a Profiler when statistics are requested, or else a
+        NullProfiler which costs nothing.
+        """
+        if stats:
+            return Profiler()
+        return NullProfiler()
+
+    @classmethod
+    def loads(cls, string, features=None, path=None, stats=False):
+        """
+        Load story from a string. The optional path is used in error
+        messages.
         """
         features = Features(features)
+        profiler = cls.profiler(stats)
         try:
-            s = Story(string, features).process()
-            return StoryscriptCompilationResult.from_result(s)
+            story = Story(string, features, path=path, profiler=profiler)
+            s = story.process()
+            return StoryscriptCompilationResult.from_result(
+                s, stats=profiler.stats(), warnings=story.warnings)
         except StoryError as e:
-            return StoryscriptCompilationResult.from_error(e)
+            return StoryscriptCompilationResult.from_error(
+                e, stats=profiler.stats())
         except Exception as e:
             if features.debug:
                 raise e
             else:
                 e = StoryError.internal_error(e)
-                return StoryscriptCompilationResult.from_error(e)
+                return StoryscriptCompilationResult.from_error(
+                    e, stats=profiler.stats())
 
-    @staticmethod
-    def load(stream, features=None):
+    @classmethod
+    def load(cls, stream, features=None, stats=False):
         """
         Load story from a file stream.
         """
         features = Features(features)
+        profiler = cls.profiler(stats)
         try:
-            story = Story.from_stream(stream, features).process()
-            s = {stream.name: story, 'services': story['services']}
-            return StoryscriptCompilationResult.from_result(s)
+            story = Story.from_stream(stream, features, profiler=profiler)
+            compiled = story.process()
+            s = {stream.name: compiled, 'services': compiled['services']}
+            return StoryscriptCompilationResult.from_result(
+                s, stats=profiler.stats(), warnings=story.warnings)
         except StoryError as e:
-            return StoryscriptCompilationResult.from_error(e)
+            return StoryscriptCompilationResult.from_error(
+                e, stats=profiler.stats())
         except Exception as e:
             if features.debug:
                 raise e
             else:
                 e = StoryError.internal_error(e)
-                return StoryscriptCompilationResult.from_error(e)
+                return StoryscriptCompilationResult.from_error(
+                    e, stats=profiler.stats())
 
-    @staticmethod
-    def load_map(files, features=None):
+    @classmethod
+    def load_map(cls, files, features=None, all_errors=False, stats=False):
         """
-        Load multiple stories from a file mapping
+        Load multiple stories from a file mapping. With all_errors, the
+        errors of all stories, and of all independent functions and blocks
+        in them, are reported.
         """
         features = Features(features)
+        profiler = cls.profiler(stats)
         try:
-            s = Bundle(story_files=files, features=features).bundle()
-            return StoryscriptCompilationResult.from_result(s)
+            bundle = Bundle(story_files=files, features=features,
+                            profiler=profiler)
+            s = bundle.bundle(all_errors=all_errors)
+            if bundle.errors:
+                return StoryscriptCompilationResult(
+                    None, errors=bundle.errors, stats=profiler.stats())
+            return StoryscriptCompilationResult.from_result(
+                s, stats=profiler.stats(), warnings=bundle.warnings)
         except StoryError as e:
-            return StoryscriptCompilationResult.from_error(e)
+            return StoryscriptCompilationResult.from_error(
+                e, stats=profiler.stats())
+        except Exception as e:
+            if features.debug:
+                raise e
+            else:
+                e = StoryError.internal_error(e)
+                return StoryscriptCompilationResult.from_error(
+                    e, stats=profiler.stats())
+
+    @classmethod
+    def check(cls, files, features=None, syntax_only=False, all_errors=False,
+              stats=False):
+        """
+        Checks multiple stories from a file mapping without compiling them.
+        The result lists the stories checked. Only the first error is
+        reported, unless all_errors is given. With syntax_only, stories
+        are only parsed.
+        """
+        features = Features(features)
+        profiler = cls.profiler(stats)
+        try:
+            bundle = Bundle(story_files=files, features=features,
+                            profiler=profiler)
+            checked, errors = bundle.check(syntax_only=syntax_only,
+                                           all_errors=all_errors)
+            if errors:
+                return StoryscriptCompilationResult(
+                    None, errors=errors, stats=profiler.stats())
+            return StoryscriptCompilationResult.from_result(
+                checked, stats=profiler.stats(), warnings=bundle.warnings)
         except Exception as e:
             if features.debug:
                 raise e
             else:
                 e = StoryError.internal_error(e)
-                return StoryscriptCompilationResult.from_error(e)
+                return StoryscriptCompilationResult.from_error(
+                    e, stats=profiler.stats())
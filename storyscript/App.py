@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
-import json
+import io
 
 from .Bundle import Bundle
+from .ConstantPool import ConstantPool
+from .CostReport import CostReport
+from .JSONStream import JSONStream
+from .Serializer import Serializer
+from .SourceMap import SourceMap
+from .compiler.binary import BinaryEncoder
 from .exceptions import StoryError
 from .parser import Grammar
 
@@ -22,20 +28,114 @@ class App:
 
     @staticmethod
     def compile(path, ignored_path=None, ebnf=None, concise=False,
-                first=False, features=None):
+                first=False, features=None, cache=None, profiler=None,
+                compact=False, binary=False, pool=False, source_map=None):
         """
-        Parses and compiles stories found in path, returning JSON
+        Parses and compiles stories found in path, returning JSON, or bytes
+        encoded by the BinaryEncoder. Concise JSON is cleaned one story at a
+        time while it is written. With pool, repeated objects are moved to
+        a ConstantPool. Given a dict, the source of the lines is moved to it
+        as a SourceMap.
         """
         bundle = Bundle.from_path(path, ignored_path=ignored_path,
-                                  features=features)
+                                  features=features, cache=cache,
+                                  profiler=profiler)
         result = bundle.bundle(ebnf=ebnf)
+        serializer = Serializer(compact=compact)
+        with bundle.profiler.span('serialize'):
+            if source_map is not None:
+                sources = SourceMap()
+                result = sources.strip(result)
+                source_map.update(sources.output())
+            if first or binary or pool:
+                if concise:
+                    result = _clean_dict(result)
+                if first:
+                    result = _first_story(result)
+                if pool:
+                    result = ConstantPool().apply(result)
+                if binary:
+                    return BinaryEncoder().encode(result)
+                return serializer.dumps(result)
+            output = io.StringIO()
+            clean = None
+            if concise:
+                clean = _clean_dict
+            writer = JSONStream(output, clean=clean, serializer=serializer)
+            for storypath, story in result.pop('stories').items():
+                writer.story(storypath, story)
+            writer.end(result)
+            return output.getvalue()
+
+    @staticmethod
+    def stream(path, output, ignored_path=None, ebnf=None, concise=False,
+               features=None, profiler=None, compact=False, source_map=None):
+        """
+        Compiles stories found in path like compile, writing each story to
+        output as soon as it is compiled, so that only one story at a time
+        is kept in memory
+        """
+        bundle = Bundle.from_path(path, ignored_path=ignored_path,
+                                  features=features, profiler=profiler,
+                                  lazy=True)
+        clean = None
         if concise:
-            result = _clean_dict(result)
-        if first:
-            if len(result['stories']) != 1:
-                raise StoryError.create_error('first_option_more_stories')
-            result = next(iter(result['stories'].values()))
-        return json.dumps(result, indent=2)
+            clean = _clean_dict
+        writer = JSONStream(output, clean=clean,
+                            serializer=Serializer(compact=compact))
+        sources = SourceMap()
+
+        def sink(storypath, story):
+            if source_map is not None:
+                story = sources.strip_story(storypath, story)
+            writer.story(storypath, story)
+
+        metadata = bundle.stream(sink, ebnf=ebnf)
+        writer.end(metadata)
+        if source_map is not None:
+            source_map.update(sources.output())
+
+    @staticmethod
+    def check(path, ignored_path=None, ebnf=None, syntax_only=False,
+              all_errors=False, features=None, profiler=None):
+        """
+        Checks stories found in path without compiling them, returning the
+        errors found
+        """
+        bundle = Bundle.from_path(path, ignored_path=ignored_path,
+                                  features=features, profiler=profiler)
+        checked, errors = bundle.check(ebnf=ebnf, syntax_only=syntax_only,
+                                       all_errors=all_errors)
+        return errors
+
+    @staticmethod
+    def analyze(path, ignored_path=None, ebnf=None, features=None,
+                profiler=None):
+        """
+        Compiles stories found in path, returning the CostReport of their
+        service calls
+        """
+        features = dict(features or {}, linear=False)
+        bundle = Bundle.from_path(path, ignored_path=ignored_path,
+                                  features=features, profiler=profiler)
+        report = CostReport()
+        report.analyze(bundle.bundle(ebnf=ebnf))
+        return report
+
+    @staticmethod
+    def lint(path, ignored_path=None, ebnf=None, features=None,
+             profiler=None):
+        """
+        Checks stories found in path, returning the performance issues
+        found in them
+        """
+        features = dict(features or {}, lint=True)
+        bundle = Bundle.from_path(path, ignored_path=ignored_path,
+                                  features=features, profiler=profiler)
+        checked, errors = bundle.check(ebnf=ebnf)
+        if errors:
+            raise errors[0]
+        return bundle.warnings
 
     @staticmethod
     def lex(path, features, ebnf=None):
@@ -52,6 +152,15 @@ class App:
         return Grammar().build()
 
 
+def _first_story(result):
+    """
+    Returns the only story of a bundle
+    """
+    if len(result['stories']) != 1:
+        raise StoryError.create_error('first_option_more_stories')
+    return next(iter(result['stories'].values()))
+
+
 def _clean_dict(d):
     """
     Removes all falsy elements from a nested dict
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+
+from .Api import Api
+from .Features import Features
+from .Story import Story, _parser
+from .exceptions import StoryError
+
+
+class Batch:
+    """
+    Compiles newline-delimited JSON requests of the form
+    `{"id", "path", "source", "features"}`, writing one JSON result per
+    request as soon as it is ready.
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+
+    @staticmethod
+    def result(request_id, compilation):
+        """
+        Builds the JSON result of a StoryscriptCompilationResult
+        """
+        return {
+            'id': request_id,
+            'success': compilation.success(),
+            'result': compilation.result(),
+            'errors': [e.to_dict() for e in compilation.errors()],
+        }
+
+    @staticmethod
+    def error(request_id, reason):
+        error = StoryError.create_error('batch_invalid_request',
+                                        reason=reason)
+        return {'id': request_id, 'success': False, 'result': None,
+                'errors': [error.to_dict()]}
+
+    @classmethod
+    def compile(cls, line):
+        """
+        Compiles a single request line. Stories without a source are read
+        from their path.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return cls.error(None, str(e))
+        if not isinstance(request, dict):
+            return cls.error(None, 'a request must be an object')
+        request_id = request.get('id')
+        path = request.get('path')
+        source = request.get('source')
+        features = request.get('features')
+        reason = cls.invalid_features(features)
+        if reason is not None:
+            return cls.error(request_id, reason)
+        if source is None:
+            if path is None:
+                return cls.error(request_id, '`source` or `path` required')
+            try:
+                source = Story.read(path)
+            except StoryError as e:
+                return {'id': request_id, 'success': False, 'result': None,
+                        'errors': [e.to_dict()]}
+            except (OSError, UnicodeDecodeError) as e:
+                return cls.error(request_id, f'cannot read `{path}`: {e}')
+        compilation = Api.loads(source, features=features, path=path)
+        return cls.result(request_id, compilation)
+
+    @staticmethod
+    def invalid_features(features):
+        """
+        Returns why the features of a request are invalid, or None.
+        """
+        if features is None:
+            return None
+        if not isinstance(features, dict):
+            return '`features` must be an object'
+        for name in features:
+            if name not in Features.defaults and name not in Features.limits:
+                return f'`{name}` is not a feature'
+        return None
+
+    def results(self, lines):
+        """
+        Yields the results of all request lines. With more than one worker,
+        results are yielded in completion order.
+        """
+        lines = (line for line in lines if line.strip())
+        # build the parser once, so that forked workers inherit it
+        _parser()
+        if self.workers <= 1:
+            for line in lines:
+                yield self.compile(line)
+            return
+        from multiprocessing import Pool
+        with Pool(self.workers) as pool:
+            yield from pool.imap_unordered(self.compile, lines)
+
+    def run(self, stream, output):
+        """
+        Reads requests from stream and writes their results to output.
+        """
+        for result in self.results(stream):
+            output.write(json.dumps(result))
+            output.write('\n')
+            output.flush()
@@ -3,7 +3,10 @@ import os
 import subprocess
 
 from .Features import Features
+from .Limits import Limits
+from .Profiler import NullProfiler
 from .Story import Story
+from .exceptions import StoryError
 from .parser import Parser
 
 
@@ -12,7 +15,8 @@ class Bundle:
     Bundles all stories that must be compiled together.
     """
 
-    def __init__(self, story_files=None, features=None):
+    def __init__(self, story_files=None, features=None, cache=None,
+                 profiler=None):
         self.stories = {}
         if isinstance(features, Features):
             self.features = features
@@ -21,6 +25,19 @@ class Bundle:
         if story_files is None:
             story_files = {}
         self.story_files = story_files
+        self.cache = cache
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        # the errors of all stories, when collecting them
+        self.errors = None
+        # the performance issues of all stories, with the lint feature
+        self.warnings = []
+        self.failed = set()
+        # when streaming, receives compiled stories instead of self.stories
+        self.sink = None
+        self.streamed = set()
+        self.streamed_services = set()
 
     @staticmethod
     def gitignores():
@@ -74,27 +91,40 @@ class Bundle:
         return paths
 
     @classmethod
-    def from_path(cls, path, ignored_path=None, features=None):
+    def from_path(cls, path, ignored_path=None, features=None, cache=None,
+                  profiler=None, lazy=False):
         """
         Load a bundle of stories from the filesystem.
         If a directory is given. all `.story` files in the directory will be
-        loaded.
+        loaded. When lazy, stories are only read when they are compiled.
         """
-        bundle = Bundle(features=features)
+        bundle = Bundle(features=features, cache=cache, profiler=profiler)
+        load = bundle.load_story
+        if lazy:
+            load = bundle.defer_story
         if os.path.isdir(path):
             for story in cls.parse_directory(path, ignored_path=ignored_path):
-                bundle.load_story(story)
+                load(story)
             return bundle
-        bundle.load_story(path)
+        load(path)
         return bundle
 
+    def defer_story(self, path):
+        """
+        Adds a story to the bundle without reading it yet
+        """
+        self.story_files[path] = None
+
     def load_story(self, path):
         """
-        Reads a story file and adds it to the loaded stories
+        Reads a story file and adds it to the loaded stories. Every story
+        gets its own limits, starting its deadline.
         """
-        if path not in self.story_files:
-            self.story_files[path] = Story.read(path)
-        return Story(self.story_files[path], features=self.features)
+        if self.story_files.get(path) is None:
+            with self.profiler.span('read', story=path):
+                self.story_files[path] = Story.read(path)
+        return Story(self.story_files[path], features=self.features,
+                     profiler=self.profiler, limits=Limits(self.features))
 
     def find_stories(self):
         """
@@ -129,24 +159,140 @@ class Bundle:
         """
         Reads and parses a story, then compiles its modules and finally
         compiles the story itself.
+        Stories found in the cache are neither parsed nor compiled again.
+        When collecting errors, a story that fails is skipped afterwards.
         """
         for storypath in stories:
-            story = self.load_story(storypath)
-            story.parse(parser=parser)
-            self.compile(story.modules(), parser=parser)
-            story.compile()
-            self.stories[storypath] = story.compiled
+            if storypath in self.failed or storypath in self.streamed:
+                continue
+            with self.profiler.span('story', story=storypath):
+                start = len(self.errors or ())
+                try:
+                    self.compile_story(storypath, parser)
+                except StoryError as error:
+                    if self.errors is None:
+                        raise
+                    self.failed.add(storypath)
+                    if error not in self.errors:
+                        self.errors.append(error)
+                    self.name_errors(self.errors[start:], storypath)
+
+    @staticmethod
+    def name_errors(errors, storypath):
+        """
+        Names the story of collected errors, which don't know it when the
+        story was given as a string.
+        """
+        for error in errors:
+            if error.path is None:
+                error.path = storypath
+
+    def keep_warnings(self, story, storypath):
+        """
+        Keeps the warnings of a story, naming the story they're in.
+        """
+        self.name_errors(story.warnings, storypath)
+        self.warnings.extend(story.warnings)
+
+    def compile_story(self, storypath, parser):
+        """
+        Compiles a single story after its modules.
+        """
+        story = self.load_story(storypath)
+        if self.cache is not None:
+            cached = self.cache.get(story)
+            if cached is not None:
+                self.profiler.count('cache_hits')
+                modules, compiled, warnings = cached
+                story.warnings = [story.error(warning.error)
+                                  for warning in warnings]
+                self.compile(modules, parser=parser)
+                self.keep_warnings(story, storypath)
+                self.store(storypath, compiled)
+                return
+            self.profiler.count('cache_misses')
+        story.parse(parser=parser)
+        modules = story.modules()
+        self.compile(modules, parser=parser)
+        story.compile(errors=self.errors)
+        self.keep_warnings(story, storypath)
+        if self.cache is not None:
+            self.cache.put(story, modules, story.compiled,
+                           warnings=story.warnings)
+        self.store(storypath, story.compiled)
 
-    def bundle(self, ebnf=None):
+    def store(self, storypath, compiled):
         """
-        Makes the bundle
+        Keeps a compiled story in the bundle or, when streaming, passes it
+        to the sink and releases its source.
         """
+        if self.sink is None:
+            self.stories[storypath] = compiled
+            return
+        self.sink(storypath, compiled)
+        self.streamed.add(storypath)
+        self.streamed_services.update(compiled['services'])
+        self.story_files[storypath] = None
+
+    def bundle(self, ebnf=None, all_errors=False):
+        """
+        Makes the bundle. With all_errors, every story is compiled even when
+        others fail, and their errors are collected in Bundle.errors.
+        """
+        if all_errors:
+            self.errors = []
         entrypoint = self.find_stories()
         parser = self.parser(ebnf)
         self.compile(entrypoint, parser=parser)
         return {'stories': self.stories, 'services': self.services(),
                 'entrypoint': entrypoint}
 
+    def check(self, ebnf=None, syntax_only=False, all_errors=False):
+        """
+        Checks the stories and their modules without compiling them,
+        returning the paths of the stories checked and the errors found.
+        The first error ends the check, unless all_errors is given.
+        """
+        parser = self.parser(ebnf)
+        checked = []
+        errors = []
+        collected = errors if all_errors else None
+        pending = self.find_stories()
+        while pending:
+            storypath = pending.pop(0)
+            if storypath in checked:
+                continue
+            checked.append(storypath)
+            with self.profiler.span('story', story=storypath):
+                start = len(errors)
+                try:
+                    story = self.load_story(storypath)
+                    story.check(parser=parser, syntax_only=syntax_only,
+                                errors=collected)
+                    self.keep_warnings(story, storypath)
+                except StoryError as error:
+                    if error not in errors:
+                        errors.append(error)
+                    if all_errors:
+                        self.name_errors(errors[start:], storypath)
+                        continue
+                    break
+            pending.extend(story.modules())
+        return checked, errors
+
+    def stream(self, sink, ebnf=None):
+        """
+        Makes the bundle one story at a time: every story is passed to
+        sink(path, story) as soon as it is compiled and is then released,
+        along with its source. Returns the services and entrypoint.
+        """
+        self.sink = sink
+        entrypoint = self.find_stories()
+        parser = self.parser(ebnf)
+        self.compile(entrypoint, parser=parser)
+        return {'services': sorted(self.streamed_services),
+                'entrypoint': entrypoint}
+
     def bundle_trees(self, ebnf=None, lower=False):
         """
         Makes a bundle of syntax trees
@@ -1,15 +1,16 @@
 # -*- coding: utf-8 -*-
 import io
+import json
 import os
+from contextlib import contextmanager
 
 import click
 
 from click_alias import ClickAliasedGroup
 
-from .App import App
+from .DaemonClient import DaemonClient, DaemonError
 from .Features import Features
-from .Project import Project
-from .Version import version as app_version
+from .Version import get_version
 from .exceptions import StoryError
 
 
@@ -41,12 +42,122 @@ def preview_cb(ctx, param, values):
     return features
 
 
+@contextmanager
+def profiling(profile, cprofile, trace, memprofile=False):
+    """
+    Yields the profiler of a compilation, printing its report at the end.
+    With cprofile, a cProfile profile of the block is written to that path.
+    With trace, its spans are written there as Chrome trace events.
+    With memprofile, memory is traced and its report printed too.
+    """
+    profiler = None
+    if memprofile:
+        from .MemoryProfiler import MemoryProfiler
+        profiler = MemoryProfiler()
+        profiler.start()
+    elif profile or trace:
+        from .Profiler import Profiler
+        profiler = Profiler()
+    if cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    try:
+        yield profiler
+    finally:
+        if memprofile:
+            profiler.stop()
+        if cprofile:
+            cprofiler.disable()
+            cprofiler.dump_stats(cprofile)
+        if trace:
+            with io.open(trace, 'w') as f:
+                json.dump(profiler.trace(), f)
+        if profile:
+            click.echo(profiler.report(), err=True)
+        if memprofile:
+            click.echo(profiler.memory_report(), err=True)
+
+
+def write_results(results, output, binary=False):
+    """
+    Writes compiled stories to the output file, or else to stdout.
+    """
+    if output:
+        with io.open(output, 'wb' if binary else 'w') as f:
+            f.write(results)
+        exit()
+    if binary:
+        click.get_binary_stream('stdout').write(results)
+    else:
+        click.echo(results)
+
+
+def stream_results(path, output, json=True, silent=False, **options):
+    """
+    Streams compiled stories to the output file, or else to stdout. Like
+    compile, the JSON is only written with json, and nothing with silent.
+    """
+    from .App import App
+    if silent or not json:
+        with io.open(os.devnull, 'w') as f:
+            App.stream(path, f, **options)
+        if not silent:
+            click.echo(click.style('Script syntax passed!', fg='green'))
+        return
+    if output:
+        with io.open(output, 'w') as f:
+            App.stream(path, f, **options)
+        return
+    stdout = click.get_text_stream('stdout')
+    App.stream(path, stdout, **options)
+    stdout.write('\n')
+
+
+def check_stream_options(stream, **options):
+    """
+    Refuses the options that need all stories at once when streaming, which
+    doesn't keep them.
+    """
+    for name, flag in options.items():
+        if stream and flag:
+            raise click.UsageError(f'--{name} cannot be used with --stream')
+
+
+def write_source_map(path, source_map, compact=False):
+    from .Serializer import Serializer
+    with io.open(path, 'w') as f:
+        f.write(Serializer(compact=compact).dumps(source_map))
+
+
 class Cli:
 
     version_help = 'Prints Storyscript version'
     silent_help = 'Silent mode. Return syntax errors only.'
     ebnf_help = 'Load the grammar from a file. Useful for development'
     preview_help = 'Activate upcoming Storyscript features'
+    socket_help = 'Path of the daemon socket'
+    workers_help = 'Number of daemon workers. Defaults to the number of CPUs'
+    batch_help = ('Compile newline-delimited JSON requests from stdin, '
+                  'writing one JSON result per line')
+    batch_workers_help = 'Number of parallel workers in batch mode'
+    profile_help = 'Print the time spent in each phase and story'
+    cprofile_help = 'Write a cProfile profile of the compilation to a file'
+    trace_help = 'Write a Chrome trace of the compilation to a file'
+    memprofile_help = ('Print the peak and retained memory of each phase '
+                       'and story, and the top allocation sites')
+    compact_help = 'Write the JSON without indentation nor spaces'
+    binary_help = 'Write the stories in the binary format instead of JSON'
+    pool_help = 'Move the objects repeated by lines to a constant pool'
+    source_map_help = ('Write the source of the lines to a separate file '
+                       'instead of the compiled stories')
+    stream_help = ('Write the JSON of every story as soon as it is compiled, '
+                   'keeping one story in memory at a time')
+    syntax_only_help = 'Only check the syntax, stopping after parsing'
+    all_errors_help = 'Report the errors of all stories, not only the first'
+    cost_help = ('Report the service calls of every story and function, '
+                 'and the calls made in loops')
+    lint_help = 'Warn about performance issues, like service calls in loops'
 
     @click.group(invoke_without_command=True, cls=ClickAliasedGroup)
     @click.option('--version', '-v', is_flag=True, help=version_help)
@@ -57,7 +168,7 @@ class Cli:
         """
         if version:
             message = 'StoryScript {} - http://storyscript.org'
-            click.echo(message.format(app_version))
+            click.echo(message.format(get_version()))
             exit()
 
         if context.invoked_subcommand is None:
@@ -77,16 +188,27 @@ class Cli:
     def parse(path, debug, ebnf, raw, ignore, lower, preview):
         """
         Parses stories, producing the abstract syntax tree.
+        A running daemon is used when available.
         """
+        from .App import App
         try:
-            trees = App.parse(path, ignored_path=ignore, ebnf=ebnf,
-                              lower=lower, features=preview)
+            trees = None
+            if not (debug or raw):
+                trees = DaemonClient().parse(path, ignored_path=ignore,
+                                             ebnf=ebnf, lower=lower,
+                                             features=preview)
+            if trees is None:
+                trees = App.parse(path, ignored_path=ignore, ebnf=ebnf,
+                                  lower=lower, features=preview)
+                if not raw:
+                    trees = {story: tree.pretty()
+                             for story, tree in trees.items()}
             for story, tree in trees.items():
                 click.echo('File: {}'.format(story))
-                if raw:
-                    click.echo(tree)
-                else:
-                    click.echo(tree.pretty())
+                click.echo(tree)
+        except DaemonError as e:
+            e.echo()
+            exit(1)
         except StoryError as e:
             if debug:
                 raise e.error
@@ -114,25 +236,171 @@ class Cli:
                   help='Specify path of ignored files')
     @click.option('--preview', callback=preview_cb, is_eager=True,
                   multiple=True, help=preview_help)
+    @click.option('--batch', is_flag=True, help=batch_help)
+    @click.option('--workers', '-w', type=int, default=1,
+                  help=batch_workers_help)
+    @click.option('--profile', is_flag=True, help=profile_help)
+    @click.option('--cprofile', default=None, help=cprofile_help)
+    @click.option('--trace', default=None, help=trace_help)
+    @click.option('--memprofile', is_flag=True, help=memprofile_help)
+    @click.option('--stream', is_flag=True, help=stream_help)
+    @click.option('--compact', is_flag=True, help=compact_help)
+    @click.option('--binary', is_flag=True, help=binary_help)
+    @click.option('--pool', is_flag=True, help=pool_help)
+    @click.option('--source-map', default=None, help=source_map_help)
     def compile(path, output, json, silent, debug, ebnf, ignore, concise,
-                first, preview):
+                first, preview, batch, workers, profile, cprofile, trace,
+                memprofile, stream, compact, binary, pool, source_map):
         """
-        Compiles stories and validates syntax
+        Compiles stories and validates syntax.
+        A running daemon is used when available.
         """
+        if batch:
+            from .Batch import Batch
+            stdin = click.get_text_stream('stdin')
+            stdout = click.get_text_stream('stdout')
+            Batch(workers=workers).run(stdin, stdout)
+            return
+        check_stream_options(stream, first=first, binary=binary, pool=pool)
+        sources = {} if source_map else None
         try:
-            results = App.compile(path, ignored_path=ignore,
-                                  ebnf=ebnf, concise=concise, first=first,
-                                  features=preview)
+            if stream:
+                with profiling(profile, cprofile, trace,
+                               memprofile) as profiler:
+                    stream_results(path, output, json=json, silent=silent,
+                                   ignored_path=ignore, ebnf=ebnf,
+                                   concise=concise, features=preview,
+                                   profiler=profiler, compact=compact,
+                                   source_map=sources)
+                if source_map:
+                    write_source_map(source_map, sources, compact=compact)
+                return
+            results = None
+            if not (debug or profile or cprofile or trace or memprofile or
+                    binary or pool or source_map):
+                results = DaemonClient().compile(
+                    path, ignored_path=ignore, ebnf=ebnf, concise=concise,
+                    first=first, features=preview, compact=compact)
+            if results is None:
+                from .App import App
+                with profiling(profile, cprofile, trace,
+                               memprofile) as profiler:
+                    results = App.compile(path, ignored_path=ignore,
+                                          ebnf=ebnf, concise=concise,
+                                          first=first, features=preview,
+                                          profiler=profiler, compact=compact,
+                                          binary=binary, pool=pool,
+                                          source_map=sources)
+            if source_map:
+                write_source_map(source_map, sources, compact=compact)
             if not silent:
-                if json:
-                    if output:
-                        with io.open(output, 'w') as f:
-                            f.write(results)
-                        exit()
-                    click.echo(results)
+                if json or binary:
+                    write_results(results, output, binary=binary)
                 else:
                     msg = 'Script syntax passed!'
                     click.echo(click.style(msg, fg='green'))
+        except DaemonError as e:
+            e.echo()
+            exit(1)
+        except StoryError as e:
+            if debug:
+                raise e.error
+            else:
+                e.echo()
+                exit(1)
+        except Exception as e:
+            if debug:
+                raise e
+            else:
+                StoryError.internal_error(e).echo()
+                exit(1)
+
+    @staticmethod
+    @main.command()
+    @click.argument('path', default=os.getcwd())
+    @click.option('--syntax-only', is_flag=True, help=syntax_only_help)
+    @click.option('--all', 'all_errors', is_flag=True, help=all_errors_help)
+    @click.option('--debug', is_flag=True)
+    @click.option('--ebnf', help=ebnf_help)
+    @click.option('--ignore', default=None,
+                  help='Specify path of ignored files')
+    @click.option('--preview', callback=preview_cb, is_eager=True,
+                  multiple=True, help=preview_help)
+    @click.option('--profile', is_flag=True, help=profile_help)
+    def check(path, syntax_only, all_errors, debug, ebnf, ignore, preview,
+              profile):
+        """
+        Checks stories without compiling them.
+        """
+        from .App import App
+        try:
+            with profiling(profile, None, None) as profiler:
+                errors = App.check(path, ignored_path=ignore, ebnf=ebnf,
+                                   syntax_only=syntax_only,
+                                   all_errors=all_errors, features=preview,
+                                   profiler=profiler)
+            if errors:
+                if debug:
+                    raise errors[0].error
+                for error in errors:
+                    error.echo()
+                exit(1)
+            click.echo(click.style('Script syntax passed!', fg='green'))
+        except StoryError as e:
+            if debug:
+                raise e.error
+            else:
+                e.echo()
+                exit(1)
+        except Exception as e:
+            if debug:
+                raise e
+            else:
+                StoryError.internal_error(e).echo()
+                exit(1)
+
+    @staticmethod
+    @main.command(aliases=['a'])
+    @click.argument('path', default=os.getcwd())
+    @click.option('--cost', is_flag=True, help=cost_help)
+    @click.option('--lint', is_flag=True, help=lint_help)
+    @click.option('--json', '-j', is_flag=True)
+    @click.option('--debug', is_flag=True)
+    @click.option('--ebnf', help=ebnf_help)
+    @click.option('--ignore', default=None,
+                  help='Specify path of ignored files')
+    @click.option('--preview', callback=preview_cb, is_eager=True,
+                  multiple=True, help=preview_help)
+    def analyze(path, cost, lint, json, debug, ebnf, ignore, preview):
+        """
+        Analyzes compiled stories statically.
+        """
+        if not cost and not lint:
+            raise click.UsageError('Choose an analysis, like --cost')
+        if cost and lint:
+            raise click.UsageError('Choose only one analysis')
+        from .App import App
+        from .Serializer import Serializer
+        try:
+            if lint:
+                warnings = App.lint(path, ignored_path=ignore, ebnf=ebnf,
+                                    features=preview)
+                if json:
+                    output = [warning.to_dict() for warning in warnings]
+                    click.echo(Serializer().dumps(output))
+                elif warnings:
+                    for warning in warnings:
+                        warning.echo()
+                else:
+                    click.echo(click.style('No performance issues found',
+                                           fg='green'))
+                return
+            report = App.analyze(path, ignored_path=ignore, ebnf=ebnf,
+                                 features=preview)
+            if json:
+                click.echo(Serializer().dumps(report.output()))
+            else:
+                click.echo(report.text())
         except StoryError as e:
             if debug:
                 raise e.error
@@ -155,14 +423,27 @@ class Cli:
                   multiple=True, help=preview_help)
     def lex(path, ebnf, debug, preview):
         """
-        Shows lexer tokens for given stories
+        Shows lexer tokens for given stories.
+        A running daemon is used when available.
         """
+        from .App import App
         try:
-            results = App.lex(path, ebnf=ebnf, features=preview)
+            results = None
+            if not debug:
+                results = DaemonClient().lex(path, ebnf=ebnf,
+                                             features=preview)
+            if results is None:
+                results = App.lex(path, ebnf=ebnf, features=preview)
+                results = {file: [(token.type, token.value)
+                                  for token in tokens]
+                           for file, tokens in results.items()}
             for file, tokens in results.items():
                 click.echo('File: {}'.format(file))
-                for n, token in enumerate(tokens):
-                    click.echo('{} {} {}'.format(n, token.type, token.value))
+                for n, (kind, value) in enumerate(tokens):
+                    click.echo('{} {} {}'.format(n, kind, value))
+        except DaemonError as e:
+            e.echo()
+            exit(1)
         except StoryError as e:
             if debug:
                 raise e.error
@@ -176,12 +457,35 @@ class Cli:
                 StoryError.internal_error(e).echo()
                 exit(1)
 
+    @staticmethod
+    @main.command(aliases=['d'])
+    @click.option('--socket', default=None, help=socket_help)
+    @click.option('--workers', '-w', type=int, default=None,
+                  help=workers_help)
+    def daemon(socket, workers):
+        """
+        Runs a compiler daemon that keeps the compiler warm
+        """
+        from .Daemon import Daemon
+        daemon = Daemon(path=socket, workers=workers)
+        try:
+            daemon.start()
+        except DaemonError as e:
+            e.echo()
+            exit(1)
+        click.echo(f'Listening on {daemon.path}')
+        try:
+            daemon.serve()
+        except KeyboardInterrupt:
+            pass
+
     @staticmethod
     @main.command(aliases=['g'])
     def grammar():
         """
         Prints the grammar specification
         """
+        from .App import App
         click.echo(App.grammar())
 
     @staticmethod
@@ -191,6 +495,7 @@ class Cli:
         """
         Creates a new project
         """
+        from .Project import Project
         Project.new(name)
 
     @staticmethod
@@ -208,4 +513,4 @@ class Cli:
         """
         Prints the current version
         """
-        click.echo(app_version)
+        click.echo(get_version())
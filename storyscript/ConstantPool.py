@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import json
+from collections import Counter
+
+
+class ConstantPool:
+    """
+    Moves the objects repeated across the lines of a bundle, or of a story,
+    to a pool next to its stories. Lines refer to a pooled object with
+    {'$OBJECT': 'pool', 'index': n}. Objects are only pooled when it makes
+    the output smaller.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.keys = {}
+        self.pool = []
+        self.indices = {}
+
+    @staticmethod
+    def dumps(value):
+        return json.dumps(value, separators=(',', ':'))
+
+    def key(self, value):
+        """
+        Returns the JSON of a value, computing it once for every object.
+        """
+        key = self.keys.get(id(value))
+        if key is None:
+            key = self.dumps(value)
+            self.keys[id(value)] = key
+        return key
+
+    @staticmethod
+    def reference(index):
+        return {'$OBJECT': 'pool', 'index': index}
+
+    @staticmethod
+    def lines(tree):
+        """
+        Returns the lines of a tree, which is a list in the linear layout.
+        """
+        if isinstance(tree, dict):
+            return tree.values()
+        return tree
+
+    @staticmethod
+    def trees(compiled):
+        if 'stories' in compiled:
+            return [story['tree'] for story in compiled['stories'].values()
+                    if story.get('tree')]
+        if compiled.get('tree'):
+            return [compiled['tree']]
+        return []
+
+    def count(self, value):
+        """
+        Counts the objects nested in a value.
+        """
+        if isinstance(value, dict):
+            items = value.values()
+        elif isinstance(value, list):
+            items = value
+        else:
+            return
+        for item in items:
+            if item and isinstance(item, (dict, list)):
+                self.counts[self.key(item)] += 1
+                self.count(item)
+
+    def replace(self, value):
+        """
+        Copies a value, replacing the objects worth pooling in it.
+        """
+        if isinstance(value, dict):
+            return {key: self.replace_item(item)
+                    for key, item in value.items()}
+        return [self.replace_item(item) for item in value]
+
+    def replace_item(self, item):
+        if not item or not isinstance(item, (dict, list)):
+            return item
+        key = self.key(item)
+        count = self.counts[key]
+        if (count - 1) * len(key) > count * self.reference_size:
+            index = self.indices.get(key)
+            if index is None:
+                index = len(self.pool)
+                self.indices[key] = index
+                self.pool.append(item)
+            return self.reference(index)
+        return self.replace(item)
+
+    def apply(self, compiled):
+        """
+        Returns a copy of a bundle or story whose lines use the pool.
+        """
+        trees = self.trees(compiled)
+        for tree in trees:
+            for line in self.lines(tree):
+                self.count(line)
+        # the largest reference that can be made
+        self.reference_size = len(self.dumps(self.reference(len(self.counts))))
+        result = dict(compiled)
+        if 'stories' in compiled:
+            result['stories'] = {
+                path: self.apply_story(story)
+                for path, story in compiled['stories'].items()}
+        else:
+            result = self.apply_story(compiled)
+        result['pool'] = self.pool
+        return result
+
+    def apply_story(self, story):
+        story = dict(story)
+        tree = story.get('tree')
+        if isinstance(tree, dict):
+            story['tree'] = {ln: self.replace(line)
+                             for ln, line in tree.items()}
+        elif tree:
+            story['tree'] = [self.replace(line) for line in tree]
+        return story
+
+    @classmethod
+    def resolve(cls, compiled):
+        """
+        Returns the bundle or story with its references replaced by the
+        pooled objects, which are shared by all lines using them.
+        """
+        pool = compiled['pool']
+        result = {key: value for key, value in compiled.items()
+                  if key != 'pool'}
+        if 'stories' in result:
+            result['stories'] = {
+                path: cls.resolve_story(story, pool)
+                for path, story in result['stories'].items()}
+            return result
+        return cls.resolve_story(result, pool)
+
+    @classmethod
+    def resolve_story(cls, story, pool):
+        story = dict(story)
+        if story.get('tree'):
+            story['tree'] = cls.resolve_value(story['tree'], pool)
+        return story
+
+    @classmethod
+    def resolve_value(cls, value, pool):
+        if isinstance(value, dict):
+            if value.get('$OBJECT') == 'pool':
+                return pool[value['index']]
+            return {key: cls.resolve_value(item, pool)
+                    for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls.resolve_value(item, pool) for item in value]
+        return value
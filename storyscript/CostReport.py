@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+from .SourceMap import SourceMap
+
+
+class CostReport:
+    """
+    Reports the service calls of compiled stories without running them: the
+    most calls that the story and each of its functions make once, counting
+    the largest branch of an if, the most calls made in every iteration of
+    their loops and handlers, which run any number of times, and what the
+    story and functions call. Calls are reported on the line of the story
+    they are written on.
+    """
+    # blocks that run any number of times
+    loops = ('for', 'while', 'when')
+    branches = ('elif', 'else')
+
+    def __init__(self):
+        self.stories = {}
+
+    def analyze(self, bundle):
+        """
+        Analyzes the stories of a compiled bundle.
+        """
+        for path, story in bundle['stories'].items():
+            self.stories[path] = self.story(story)
+        return self.stories
+
+    def story(self, story):
+        """
+        Returns the report of a compiled story.
+        """
+        self.tree = story.get('tree') or {}
+        self.definitions = story.get('functions') or {}
+        self.children = {}
+        for ln, line in self.tree.items():
+            self.children.setdefault(line.get('parent'), []).append(ln)
+        self.functions = {}
+        self.active = set()
+        self.recursive = set()
+        self.looped = []
+        scope = {'name': None, 'targets': set()}
+        calls, looped = self.cost(self.children.get(None, []), scope, 0)
+        for name in self.definitions:
+            self.function(name)
+        sites = sum(1 for line in self.tree.values()
+                    if line['method'] == 'execute')
+        return {'calls': calls, 'looped_calls': looped, 'sites': sites,
+                'targets': sorted(scope['targets']),
+                'functions': self.functions, 'loops': self.looped}
+
+    def cost(self, lines, scope, depth):
+        """
+        Counts the most calls a sequence of lines can make, as the calls
+        made once and the calls made in every iteration of its loops.
+        """
+        total = (0, 0)
+        chain = None
+        for ln in lines:
+            line = self.tree[ln]
+            if line['method'] in self.branches and chain is not None:
+                chain = self.most(chain, self.block(ln, scope, depth))
+                continue
+            if chain is not None:
+                total = self.add(total, chain)
+                chain = None
+            if line['method'] == 'if':
+                chain = self.block(ln, scope, depth)
+            elif line['method'] != 'function':
+                total = self.add(total, self.line(ln, line, scope, depth))
+        if chain is not None:
+            total = self.add(total, chain)
+        return total
+
+    @staticmethod
+    def add(first, second):
+        return (first[0] + second[0], first[1] + second[1])
+
+    @staticmethod
+    def most(first, second):
+        return (max(first[0], second[0]), max(first[1], second[1]))
+
+    def block(self, ln, scope, depth):
+        return self.cost(self.children.get(ln, []), scope, depth)
+
+    def line(self, ln, line, scope, depth):
+        """
+        Counts the most calls a line and its block can make.
+        """
+        method = line['method']
+        if method in self.loops:
+            return (0, sum(self.block(ln, scope, depth + 1)))
+        if method == 'execute':
+            target = '{} {}'.format(line['service'], line['command'])
+            self.call(ln, target, scope, depth, 1)
+            return self.add((1, 0), self.block(ln, scope, depth))
+        if method == 'call':
+            calls = self.function(line['function'])
+            self.call(ln, '{}()'.format(line['function']), scope, depth,
+                      sum(calls))
+            return calls
+        return self.block(ln, scope, depth)
+
+    def call(self, ln, target, scope, depth, calls):
+        """
+        Records a call, and the calls made in loops.
+        """
+        scope['targets'].add(target)
+        if depth and calls:
+            line = SourceMap.source_line(ln)
+            self.looped.append({'line': line, 'target': target,
+                                'function': scope['name'], 'depth': depth,
+                                'calls': calls})
+
+    def function(self, name):
+        """
+        Counts the most calls a function can make, once and in its loops.
+        Recursive calls and functions defined elsewhere count as none.
+        """
+        if name in self.functions:
+            function = self.functions[name]
+            return (function['calls'], function['looped_calls'])
+        if name not in self.definitions:
+            return (0, 0)
+        if name in self.active:
+            self.recursive.add(name)
+            return (0, 0)
+        self.active.add(name)
+        ln = self.definitions[name]
+        scope = {'name': name, 'targets': set()}
+        calls, looped = self.block(ln, scope, 0)
+        self.active.discard(name)
+        self.functions[name] = {'line': ln, 'calls': calls,
+                                'looped_calls': looped,
+                                'targets': sorted(scope['targets']),
+                                'recursive': name in self.recursive}
+        return (calls, looped)
+
+    def output(self):
+        return {'stories': self.stories}
+
+    @staticmethod
+    def plural(count, noun):
+        return '{} {}{}'.format(count, noun, '' if count == 1 else 's')
+
+    @classmethod
+    def calls(cls, report):
+        """
+        Formats the calls of a story or function, the calls made in loops
+        apart since they are unbounded.
+        """
+        calls = '{} at most'.format(cls.plural(report['calls'],
+                                               'service call'))
+        if report['looped_calls']:
+            calls += ' outside loops, {} per loop iteration'.format(
+                report['looped_calls'])
+        return calls
+
+    def text(self):
+        """
+        Formats the report, stories with the most calls first.
+        """
+        lines = []
+        stories = sorted(self.stories.items(),
+                         key=lambda item: (-item[1]['looped_calls'],
+                                           -item[1]['calls'], item[0]))
+        for path, story in stories:
+            lines.append('{}: {}, {}'.format(
+                path, self.calls(story),
+                self.plural(story['sites'], 'call site')))
+            if story['targets']:
+                lines.append('  calls {}'.format(', '.join(story['targets'])))
+            for name, function in story['functions'].items():
+                recursive = ', recursive' if function['recursive'] else ''
+                lines.append('  function {}: {}{}'.format(
+                    name, self.calls(function), recursive))
+                if function['targets']:
+                    lines.append('    calls {}'.format(
+                        ', '.join(function['targets'])))
+            for looped in story['loops']:
+                where = ''
+                if looped['function'] is not None:
+                    where = ' in function {}'.format(looped['function'])
+                lines.append('  line {}{}: {} in {}'.format(
+                    looped['line'], where, looped['target'],
+                    self.plural(looped['depth'], 'loop')))
+        return '\n'.join(lines)
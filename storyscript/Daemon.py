@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socketserver
+from collections import OrderedDict
+
+from .DaemonClient import DaemonClient, DaemonError, socket_path
+from .Version import get_version
+
+
+class StoryCache:
+    """
+    Least-recently-used cache of compiled stories and their warnings, keyed
+    by their source and their features.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(story):
+        return (story.story, str(story.features))
+
+    def get(self, story):
+        """
+        Returns the cached (modules, compiled, warnings) of a story or None.
+        """
+        key = self.key(story)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, story, modules, compiled, warnings=()):
+        self.entries[self.key(story)] = (modules, compiled, list(warnings))
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class Worker:
+    """
+    Serves daemon requests inside a pool process. The parser, the hub
+    mutations and the compiled stories stay warm between requests.
+    """
+    cache = None
+
+    @classmethod
+    def warm(cls, cache_size=1024):
+        """
+        Builds everything that can be shared by all requests: the parser,
+        the mutation table used by every compilation and the story cache.
+        """
+        from .Story import _parser
+        from .compiler.semantics.functions.MutationTable import MutationTable
+        _parser()
+        MutationTable.init()
+        if cls.cache is None:
+            cls.cache = StoryCache(maxsize=cache_size)
+
+    @classmethod
+    def compile(cls, path, ignored_path, ebnf, concise, first, features,
+                compact=False):
+        from .App import App
+        cache = cls.cache
+        if ebnf is not None:
+            cache = None
+        return App.compile(path, ignored_path=ignored_path, ebnf=ebnf,
+                           concise=concise, first=first, features=features,
+                           cache=cache, compact=compact)
+
+    @staticmethod
+    def parse(path, ignored_path, ebnf, lower, features):
+        from .App import App
+        trees = App.parse(path, ignored_path=ignored_path, ebnf=ebnf,
+                          lower=lower, features=features)
+        return {story: tree.pretty() for story, tree in trees.items()}
+
+    @staticmethod
+    def lex(path, ebnf, features):
+        from .App import App
+        results = App.lex(path, ebnf=ebnf, features=features)
+        return {story: [[token.type, token.value] for token in tokens]
+                for story, tokens in results.items()}
+
+    @classmethod
+    def run(cls, request):
+        """
+        Runs a single request in the directory of the client.
+        """
+        from .exceptions import StoryError
+        commands = {'compile': cls.compile, 'parse': cls.parse,
+                    'lex': cls.lex}
+        try:
+            os.chdir(request['cwd'])
+            result = commands[request['command']](**request['args'])
+            return {'result': result}
+        except StoryError as e:
+            return {'error': e.message()}
+        except Exception as e:
+            return {'error': StoryError.internal_error(e).message()}
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """
+    Reads one JSON request per connection and writes back one JSON response.
+    """
+
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode('utf8'))
+        response = self.server.daemon.dispatch(request)
+        self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Daemon:
+    """
+    Long-running compiler that listens on a local Unix socket and serves
+    compile, parse and lex requests from a pool of warm workers.
+    """
+
+    def __init__(self, path=None, workers=None, cache_size=1024):
+        self.path = path or socket_path()
+        self.workers = workers or os.cpu_count()
+        self.cache_size = cache_size
+        self.version = get_version()
+        self.pool = None
+        self.server = None
+
+    def dispatch(self, request):
+        """
+        Hands a request to the worker pool. Requests from a different
+        compiler version are refused, so that clients fall back to
+        in-process compilation.
+        """
+        if request['command'] == 'ping':
+            return {'result': self.version}
+        if request.get('version') != self.version:
+            return {'unavailable': 'version mismatch'}
+        return self.pool.apply(Worker.run, (request,))
+
+    def bind(self):
+        """
+        Creates the socket, readable and writable by the user only, in a
+        private directory. Stale sockets of dead daemons are removed.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(self.path):
+            client = DaemonClient(self.path)
+            if not client.owned():
+                raise DaemonError(f'{self.path} belongs to another user')
+            if client.ping():
+                raise DaemonError(f'A daemon is already running on '
+                                  f'{self.path}')
+            os.unlink(self.path)
+        umask = os.umask(0o177)
+        try:
+            self.server = Server(self.path, Handler)
+        finally:
+            os.umask(umask)
+        self.server.daemon = self
+
+    def start(self):
+        """
+        Binds the socket, warms up the compiler and forks the workers, so
+        that they inherit the warm state.
+        """
+        from multiprocessing import Pool
+        self.bind()
+        Worker.warm(self.cache_size)
+        self.pool = Pool(self.workers, initializer=Worker.warm,
+                         initargs=(self.cache_size,))
+
+    def serve(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
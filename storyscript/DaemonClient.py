@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socket
+import tempfile
+
+from .Version import get_version
+
+
+def socket_path():
+    """
+    Returns the path of the daemon socket. Defaults to a socket in the
+    runtime directory of the user, or in a private directory of the user in
+    the temporary directory, unless STORYSCRIPT_DAEMON_SOCKET is set.
+    """
+    path = os.getenv('STORYSCRIPT_DAEMON_SOCKET')
+    if path:
+        return path
+    directory = os.getenv('XDG_RUNTIME_DIR')
+    if not directory:
+        name = 'storyscript-{}'.format(os.getuid())
+        directory = os.path.join(tempfile.gettempdir(), name)
+    return os.path.join(directory, 'storyscript.sock')
+
+
+class DaemonError(Exception):
+    """
+    An error reported by the daemon, carrying the already rendered message.
+    """
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+    def echo(self):
+        """
+        Prints the message
+        """
+        import click
+        click.echo(self.message)
+
+
+class DaemonClient:
+    """
+    Thin client of the daemon. Every request returns None when no daemon is
+    reachable, so that callers can fall back to in-process compilation.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+
+    def owned(self):
+        """
+        Whether the socket exists and belongs to the user. Sockets of other
+        users are never connected to.
+        """
+        try:
+            return os.stat(self.path).st_uid == os.getuid()
+        except OSError:
+            return False
+
+    def send(self, message):
+        if not self.owned():
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(self.path)
+                s.sendall(json.dumps(message).encode('utf8') + b'\n')
+                data = s.makefile('rb').readline()
+        except OSError:
+            return None
+        if not data:
+            return None
+        return json.loads(data.decode('utf8'))
+
+    def ping(self):
+        """
+        Whether a daemon is listening on the socket.
+        """
+        return self.send({'command': 'ping'}) is not None
+
+    def request(self, command, **args):
+        """
+        Sends a request, returning its result. Errors are raised as
+        DaemonError.
+        """
+        message = {'command': command, 'args': args, 'cwd': os.getcwd(),
+                   'version': get_version()}
+        response = self.send(message)
+        if response is None or 'unavailable' in response:
+            return None
+        if 'error' in response:
+            raise DaemonError(response['error'])
+        return response['result']
+
+    def compile(self, path, ignored_path=None, ebnf=None, concise=False,
+                first=False, features=None, compact=False):
+        return self.request('compile', path=path, ignored_path=ignored_path,
+                            ebnf=ebnf, concise=concise, first=first,
+                            features=features, compact=compact)
+
+    def parse(self, path, ignored_path=None, ebnf=None, lower=False,
+              features=None):
+        return self.request('parse', path=path, ignored_path=ignored_path,
+                            ebnf=ebnf, lower=lower, features=features)
+
+    def lex(self, path, ebnf=None, features=None):
+        return self.request('lex', path=path, ebnf=ebnf, features=features)
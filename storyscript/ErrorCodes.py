@@ -110,6 +110,19 @@ class ErrorCodes:
     invalid_preview_flag = (
         'E0078',
         'Invalid preview flag. `{flag}` is not a valid preview feature.')
+    batch_invalid_request = (
+        'E0079', 'Invalid batch request: {reason}')
+    limit_source_bytes = (
+        'E0080',
+        'The story is {size} bytes long, more than the limit of {limit}')
+    limit_nodes = (
+        'E0081', 'The story has more than {limit} syntax tree nodes')
+    limit_depth = (
+        'E0082', 'The story is nested more than {limit} levels deep')
+    limit_temporaries = (
+        'E0083', 'The story needs more than {limit} temporary variables')
+    limit_deadline = (
+        'E0084', 'The compilation took longer than {limit} seconds')
     type_assignment_different = (
         'E0100', "Can't assign `{source}` to `{target}`")
     var_not_defined = (
@@ -199,6 +212,21 @@ class ErrorCodes:
         'E0128',
         '`{source}` is readonly and can not be returned.'
     )
+    lint_loop_invariant_service = (
+        'W0001',
+        '`{service} {command}` is called with the same arguments in every '
+        'iteration, it could be called once before the loop')
+    lint_repeated_mutation = (
+        'W0002',
+        '`{name}` is computed again on values unchanged since {since}')
+    lint_while_no_exit = (
+        'W0003',
+        'This loop has no break nor service call and its condition never '
+        'changes')
+    lint_string_concat_loop = (
+        'W0004',
+        '`{name}` is built by concatenation in a loop, which copies it in '
+        'every iteration')
 
     @staticmethod
     def is_error(error_name):
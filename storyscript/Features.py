@@ -9,13 +9,29 @@ class Features:
     defaults = {
         'globals': False,  # makes global variables writable
         'debug': False,    # enable debug output
+        'linear': False,   # emits the tree as a list of instructions
+        'fold_constants': False,  # folds and propagates constant values
+        'inline_temporaries': False,  # inlines single-use temporaries
+        'release_hints': False,  # lists the variables dying with each line
+        'parallel_groups': False,  # lists independent consecutive calls
+        'lint': False,  # warns about performance issues
+    }
+
+    # resource limits of a compilation, unlimited when None
+    limits = {
+        'max_source_bytes': None,  # size of a story's source
+        'max_nodes': None,         # tokens and nodes of a story's tree
+        'max_depth': None,         # nesting of blocks, brackets, operators
+        'max_temporaries': None,   # temporary variables made by lowering
+        'deadline': None,          # seconds a compilation may take
     }
 
     def __init__(self, features):
         self.features = self.defaults.copy()
+        self.features.update(self.limits)
         if features is not None:
             for k, v in features.items():
-                assert k in self.defaults, f'{k} is in invalid feature option'
+                assert k in self.features, f'{k} is in invalid feature option'
                 self.features[k] = v
 
     def __str__(self):
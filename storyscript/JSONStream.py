@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import json
+
+from .Serializer import Serializer
+
+
+class JSONStream:
+    """
+    Writes a bundle as JSON one story at a time, producing the same text as
+    the serializer would for the whole bundle. A clean function can drop
+    parts of every story and of the metadata, whose empty values are dropped
+    beforehand, so that no cleaned copy of the bundle is ever made.
+    """
+
+    def __init__(self, output, clean=None, serializer=None):
+        if serializer is None:
+            serializer = Serializer()
+        self.output = output
+        self.clean = clean
+        self.serializer = serializer
+        self.indent = serializer.indent
+        self.colon = ':' if self.indent is None else ': '
+        self.entries = 0
+        self.stories = 0
+
+    def newline(self, level):
+        if self.indent is None:
+            return ''
+        return '\n' + ' ' * self.indent * level
+
+    def dumps(self, value, level):
+        """
+        Dumps a value nested at a level of the bundle. Strings never contain
+        raw newlines, so indenting every line is enough.
+        """
+        text = self.serializer.dumps(value)
+        if self.indent is None:
+            return text
+        return text.replace('\n', self.newline(level))
+
+    def entry(self, key, text):
+        """
+        Writes a key and its dumped value in the bundle object.
+        """
+        self.output.write('{}{}{}{}{}'.format(
+            ',' if self.entries else '{', self.newline(1), json.dumps(key),
+            self.colon, text))
+        self.entries += 1
+
+    def story(self, path, story):
+        """
+        Writes a compiled story.
+        """
+        if self.clean is not None:
+            if not story:
+                return
+            story = self.clean(story)
+        if self.stories == 0:
+            self.output.write('{}{}"stories"{}{{'.format(
+                ',' if self.entries else '{', self.newline(1), self.colon))
+            self.entries += 1
+        else:
+            self.output.write(',')
+        self.output.write('{}{}{}{}'.format(
+            self.newline(2), json.dumps(path), self.colon,
+            self.dumps(story, 2)))
+        self.stories += 1
+
+    def end(self, metadata):
+        """
+        Closes the stories and writes the metadata of the bundle.
+        """
+        if self.stories:
+            self.output.write('{}}}'.format(self.newline(1)))
+        elif self.clean is None:
+            self.entry('stories', '{}')
+        for key, value in metadata.items():
+            if self.clean is not None:
+                if not value:
+                    continue
+                value = self.clean(value)
+            self.entry(key, self.dumps(value, 1))
+        if self.entries:
+            self.output.write(self.newline(0) + '}')
+        else:
+            self.output.write('{}')
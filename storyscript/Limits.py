@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import time
+
+from .Features import Features
+from .exceptions import CompilerError
+
+
+class Limits:
+    """
+    Resource limits of a compilation, configured by the features of the same
+    name. Limits are checked as the compilation progresses, failing fast
+    with a CompilerError. Unset limits are never checked.
+    """
+    # tokens lexed between two checks of the deadline
+    check_every = 256
+    open_types = ('_OP', '_OSB', '_OCB')
+    close_types = ('_CP', '_CSB', '_CCB')
+    # binary and unary operators, each nesting an expression one level deeper
+    operator_types = ('OR', 'AND', 'NOT', 'GREATER', 'GREATER_EQUAL',
+                      'LESSER', 'LESSER_EQUAL', 'NOT_EQUAL', 'EQUAL', 'PLUS',
+                      'DASH', 'MULTIPLIER', 'BSLASH', 'MODULUS', 'POWER')
+
+    def __init__(self, features=None, clock=time.monotonic):
+        if features is None:
+            features = Features(None)
+        self.clock = clock
+        self.max_source_bytes = features.max_source_bytes
+        self.max_nodes = features.max_nodes
+        self.max_depth = features.max_depth
+        self.max_temporaries = features.max_temporaries
+        self.timeout = features.deadline
+        self.deadline = None
+        if self.timeout is not None:
+            self.deadline = clock() + self.timeout
+        self.temporaries = 0
+        self.steps = 0
+
+    def check_deadline(self, token=None, tree=None):
+        """
+        Fails when the compilation has gone past its deadline.
+        """
+        if self.deadline is not None and self.clock() > self.deadline:
+            raise CompilerError('limit_deadline', token=token, tree=tree,
+                                format_args={'limit': self.timeout})
+
+    def step(self, tree=None):
+        """
+        Counts a node visited by a compiler pass, checking the deadline
+        every so often.
+        """
+        self.steps += 1
+        if self.steps % self.check_every == 0:
+            self.check_deadline(tree=tree)
+
+    def check_source(self, source):
+        if self.max_source_bytes is None:
+            return
+        size = len(source.encode('utf-8'))
+        if size > self.max_source_bytes:
+            raise CompilerError('limit_source_bytes', format_args={
+                'size': size, 'limit': self.max_source_bytes})
+
+    def check_nodes(self, tree):
+        """
+        Counts the nodes of a syntax tree, failing as soon as there are too
+        many of them.
+        """
+        if self.max_nodes is None:
+            return
+        count = 0
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            count += 1
+            if count > self.max_nodes:
+                raise CompilerError('limit_nodes',
+                                    format_args={'limit': self.max_nodes})
+            stack.extend(child for child in node.children
+                         if hasattr(child, 'children'))
+
+    def tokens(self, tokens):
+        """
+        Yields from a token stream, checking the number of tokens, the
+        nesting depth of blocks, brackets and operators and, every so often,
+        the deadline. Every token is a node of the parse tree, so the
+        parser stops as soon as a story has too many nodes.
+        """
+        if self.max_nodes is None and self.max_depth is None and \
+                self.deadline is None:
+            return tokens
+        return self.guarded_tokens(tokens)
+
+    def nesting(self, token, depth, operators):
+        """
+        Updates the depth of blocks and brackets and the number of
+        operators in the current statement after a token.
+        """
+        if token.type == '_INDENT' or token.type in self.open_types:
+            return depth + 1, operators
+        if token.type == '_DEDENT' or token.type in self.close_types:
+            return depth - 1, operators
+        if token.type == '_NL':
+            return depth, 0
+        if token.type in self.operator_types:
+            return depth, operators + 1
+        return depth, operators
+
+    def guarded_tokens(self, tokens):
+        max_nodes = self.max_nodes
+        max_depth = self.max_depth
+        depth = 0
+        operators = 0
+        count = 0
+        for token in tokens:
+            count += 1
+            if max_nodes is not None and count > max_nodes:
+                raise CompilerError('limit_nodes', token=token,
+                                    format_args={'limit': max_nodes})
+            depth, operators = self.nesting(token, depth, operators)
+            if max_depth is not None and depth + operators > max_depth:
+                raise CompilerError('limit_depth', token=token,
+                                    format_args={'limit': max_depth})
+            if count % self.check_every == 0:
+                self.check_deadline(token)
+            yield token
+
+    def temporary(self, tree=None):
+        """
+        Counts a temporary variable created by the compiler.
+        """
+        self.temporaries += 1
+        if self.max_temporaries is not None and \
+                self.temporaries > self.max_temporaries:
+            raise CompilerError('limit_temporaries', tree=tree, format_args={
+                'limit': self.max_temporaries})
+        self.check_deadline()
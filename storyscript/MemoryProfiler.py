@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+from .Profiler import Profiler
+
+
+class MemoryProfiler(Profiler):
+    """
+    Profiler that also traces memory with tracemalloc. Every span records
+    its peak above the memory in use when it started, and the memory it
+    left allocated. Stories and their phases are snapshotted, so that
+    allocation sites can be reported by file and line.
+    Peaks per span need tracemalloc.reset_peak (Python 3.9+), otherwise
+    only the overall peak is known and the others are reported as n/a.
+    """
+    # phases whose results are cached for the whole process, rather than
+    # kept alive by the bundle
+    cached = ('parser_init',)
+
+    def __init__(self, top=10, **kwargs):
+        super().__init__(**kwargs)
+        self.top = top
+        self.peaks = {}
+        self.retained = {}
+        self.sites = {}
+        self.peak = 0
+        self.reset_peak = getattr(tracemalloc, 'reset_peak', None)
+
+    def start(self):
+        tracemalloc.start()
+
+    def stop(self):
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    def snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    @staticmethod
+    def snapshotted(span):
+        """
+        Whether a span is snapshotted: stories and their direct phases.
+        """
+        if span.name == 'story' or span.parent is None:
+            return True
+        return span.parent.name == 'story'
+
+    def record_peak(self, stack):
+        """
+        Attributes the peak since the last reset to all open spans.
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        self.peak = max(self.peak, peak)
+        if self.reset_peak is None:
+            return
+        for span in stack:
+            self.peaks[span] = max(self.peaks.get(span, 0), peak)
+        self.reset_peak()
+
+    @contextmanager
+    def span(self, name, story=None):
+        with super().span(name, story=story) as span:
+            stack = self.stack()
+            self.record_peak(stack[:-1])
+            before = None
+            if self.snapshotted(span):
+                before = self.snapshot()
+            start = tracemalloc.get_traced_memory()[0]
+            try:
+                yield span
+            finally:
+                self.record_peak(stack)
+                if span in self.peaks:
+                    self.peaks[span] -= start
+                end = tracemalloc.get_traced_memory()[0]
+                self.retained[span] = end - start
+                if before is not None:
+                    stats = self.snapshot().compare_to(before, 'lineno')
+                    self.sites[span] = [stat for stat in stats
+                                        if stat.size_diff > 0]
+
+    @staticmethod
+    def site(stat):
+        """
+        Names the file and line of an allocation, relative to the current
+        directory or to its entry of sys.path.
+        """
+        frame = stat.traceback[0]
+        filename = frame.filename
+        paths = [os.getcwd()] + [path for path in sys.path if path]
+        for path in sorted(paths, key=len, reverse=True):
+            if filename.startswith(path + os.sep):
+                filename = os.path.relpath(filename, path)
+                break
+        return '{}:{}'.format(filename, frame.lineno)
+
+    def top_sites(self, spans, excluded=()):
+        """
+        Returns the (site, bytes, blocks) left allocated by spans and not
+        by the excluded spans, largest first.
+        """
+        sizes = defaultdict(lambda: [0, 0])
+        for sign, group in ((1, spans), (-1, excluded)):
+            for span in group:
+                for stat in self.sites.get(span, []):
+                    site = sizes[self.site(stat)]
+                    site[0] += sign * stat.size_diff
+                    site[1] += sign * stat.count_diff
+        sites = [(site, size[0], size[1]) for site, size in sizes.items()
+                 if size[0] > 0]
+        sites.sort(key=lambda site: site[1], reverse=True)
+        return sites[:self.top]
+
+    def memory_phases(self):
+        """
+        Returns (name, calls, peak, retained) of every phase, by peak.
+        """
+        phases = defaultdict(lambda: [0, 0, 0])
+        for span in self.spans:
+            if span.name == 'story':
+                continue
+            phase = phases[span.name]
+            phase[0] += 1
+            phase[1] = max(phase[1], self.peaks.get(span, 0))
+            phase[2] += self.retained.get(span, 0)
+        phases = [(name, p[0], p[1], p[2]) for name, p in phases.items()]
+        return sorted(phases, key=lambda phase: (phase[2], phase[3]),
+                      reverse=True)
+
+    def memory_stories(self):
+        """
+        Returns (story, peak, retained, sites) of every story span. The
+        retained memory is what the bundle keeps alive after the story,
+        which excludes the process-wide caches filled by it.
+        """
+        stories = []
+        for span in self.spans:
+            if span.name == 'story':
+                cached = [child for child in self.spans
+                          if child.parent is span and child.name in
+                          self.cached]
+                retained = self.retained.get(span, 0)
+                retained -= sum(self.retained.get(child, 0)
+                                for child in cached)
+                stories.append((span.story, self.peaks.get(span, 0),
+                                retained, self.top_sites([span], cached)))
+        return stories
+
+    def span_peak(self, peak, unit):
+        """
+        Formats the peak of a span in KiB, or n/a when peaks per span are
+        not known.
+        """
+        if self.reset_peak is None:
+            return 'n/a'
+        return '{:.1f}{}'.format(peak / 1024, unit)
+
+    def memory_report(self):
+        """
+        Renders the memory usage of phases and stories, and the top
+        allocation sites, as a human-readable report.
+        """
+        kib = 1024
+        lines = ['Overall peak: {:.1f} KiB'.format(self.peak / kib), '']
+        header = '{:<32} {:>7} {:>12} {:>14}'
+        row = '{:<32} {:>7} {:>12} {:>14.1f}'
+        lines.append(header.format('Phase', 'Calls', 'Peak (KiB)',
+                                   'Retained (KiB)'))
+        for name, calls, peak, retained in self.memory_phases():
+            lines.append(row.format(name, calls, self.span_peak(peak, ''),
+                                    retained / kib))
+        lines.append('')
+        for story, peak, retained, sites in self.memory_stories():
+            lines.append('Story {}: peak {}, the bundle keeps {:.1f} KiB '
+                         'alive'.format(story, self.span_peak(peak, ' KiB'),
+                                        retained / kib))
+            for site, size, blocks in sites[:3]:
+                lines.append('    {:<60} {:>10.1f} KiB {:>8} blocks'.format(
+                    site, size / kib, blocks))
+        lines.append('')
+        lines.append('Top allocation sites left by phases')
+        phases = [span for span in self.spans
+                  if span.name != 'story' and span.name not in self.cached]
+        for site, size, blocks in self.top_sites(phases):
+            lines.append('    {:<60} {:>10.1f} KiB {:>8} blocks'.format(
+                site, size / kib, blocks))
+        return '\n'.join(lines)
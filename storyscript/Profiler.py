@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Span:
+    """
+    A timed section of a compilation. Spans nest: a span belongs to the
+    story of its parent unless it names its own.
+    """
+    __slots__ = ('name', 'story', 'parent', 'pid', 'tid', 'start', 'end')
+
+    def __init__(self, name, story, parent, pid, tid):
+        self.name = name
+        self.story = story
+        self.parent = parent
+        self.pid = pid
+        self.tid = tid
+        self.start = None
+        self.end = None
+
+    def duration(self):
+        return self.end - self.start
+
+
+class NullSpan:
+    """
+    Context manager that does nothing, used when profiling is disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class NullProfiler:
+    """
+    Profiler that records nothing. The compiler uses it by default, so that
+    timing hooks cost next to nothing outside of profiling.
+    """
+    enabled = False
+    null_span = NullSpan()
+
+    def span(self, name, story=None):
+        return self.null_span
+
+    def add(self, name, duration):
+        pass
+
+    def timed(self, name, iterable, counter=None):
+        return iterable
+
+    def count(self, name, value=1):
+        pass
+
+    def stats(self):
+        return None
+
+
+class Profiler:
+    """
+    Records the wall time of the compilation phases of every story, and
+    counters of what they processed.
+    """
+    enabled = True
+    # counters reported by stats, even when nothing was counted
+    counters = ('source_lines', 'tokens', 'nodes', 'lowered_nodes',
+                'temporaries', 'mutations', 'cache_hits', 'cache_misses')
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.spans = []
+        self.timings = []
+        self.counts = defaultdict(int)
+        self.local = threading.local()
+
+    def stack(self):
+        """
+        Returns the stack of the open spans of the current thread.
+        """
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, story=None):
+        """
+        Times the enclosed block as a span nested in the current one.
+        """
+        stack = self.stack()
+        parent = stack[-1] if stack else None
+        if story is None and parent is not None:
+            story = parent.story
+        span = Span(name, story, parent, os.getpid(), threading.get_ident())
+        self.spans.append(span)
+        stack.append(span)
+        span.start = self.clock()
+        try:
+            yield span
+        finally:
+            span.end = self.clock()
+            stack.pop()
+
+    def add(self, name, duration):
+        """
+        Records a phase that has been timed piecewise, e.g. lexing which
+        is interleaved with parsing.
+        """
+        stack = self.stack()
+        story = stack[-1].story if stack else None
+        self.timings.append((name, story, duration))
+
+    def timed(self, name, iterable, counter=None):
+        """
+        Yields from iterable, recording the time spent producing its items
+        as the phase name and their number as the counter, if given.
+        """
+        clock = self.clock
+        iterator = iter(iterable)
+        duration = 0
+        items = 0
+        try:
+            while True:
+                start = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    duration += clock() - start
+                items += 1
+                yield item
+        finally:
+            self.add(name, duration)
+            if counter is not None:
+                self.count(counter, items)
+
+    def count(self, name, value=1):
+        """
+        Adds value to a counter.
+        """
+        self.counts[name] += value
+
+    def phases(self):
+        """
+        Returns (name, seconds, calls) for every phase, most expensive first.
+        Nested phases are included in their parents. Story spans are
+        reported by stories instead.
+        """
+        totals = defaultdict(lambda: [0, 0])
+        for span in self.spans:
+            if span.name != 'story':
+                totals[span.name][0] += span.duration()
+                totals[span.name][1] += 1
+        for name, story, duration in self.timings:
+            totals[name][0] += duration
+            totals[name][1] += 1
+        phases = [(name, t[0], t[1]) for name, t in totals.items()]
+        return sorted(phases, key=lambda phase: phase[1], reverse=True)
+
+    def stats(self):
+        """
+        Returns the counters and the seconds spent in every phase.
+        """
+        stats = dict.fromkeys(self.counters, 0)
+        stats.update(self.counts)
+        stats['phases'] = {name: seconds
+                           for name, seconds, calls in self.phases()}
+        return stats
+
+    def stories(self):
+        """
+        Returns (story, seconds) for every story, most expensive first.
+        Time spent in imported stories isn't counted for the importer.
+        """
+        nested = defaultdict(int)
+        for span in self.spans:
+            if span.parent is not None:
+                nested[id(span.parent)] += span.duration()
+        totals = defaultdict(int)
+        for span in self.spans:
+            if span.story is not None:
+                totals[span.story] += span.duration() - nested[id(span)]
+        return sorted(totals.items(), key=lambda story: story[1],
+                      reverse=True)
+
+    def total(self):
+        """
+        Wall time of all top-level spans.
+        """
+        return sum(span.duration() for span in self.spans
+                   if span.parent is None)
+
+    def trace(self):
+        """
+        Returns the spans as Chrome trace events, which can be loaded by
+        chrome://tracing or Perfetto. Story spans are named after their
+        story, so that imported stories nest in their importer.
+        """
+        origin = min((span.start for span in self.spans), default=0)
+        events = []
+        threads = set()
+        for span in self.spans:
+            threads.add((span.pid, span.tid))
+            name = span.name
+            category = 'phase'
+            if name == 'story':
+                name = span.story
+                category = 'story'
+            events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (span.start - origin) * 1e6,
+                'dur': span.duration() * 1e6,
+                'pid': span.pid,
+                'tid': span.tid,
+                'args': {'story': span.story},
+            })
+        for pid, tid in sorted(threads):
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'tid': tid, 'args': {'name': 'storyscript'}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def report(self):
+        """
+        Renders the phases and stories as a human-readable table.
+        """
+        total = self.total() or 1
+        header = '{:<32} {:>7} {:>11} {:>6}'
+        lines = [header.format('Phase', 'Calls', 'Time (ms)', '%')]
+        for name, seconds, calls in self.phases():
+            lines.append('{:<32} {:>7} {:>11.2f} {:>6.1f}'.format(
+                name, calls, seconds * 1000, seconds * 100 / total))
+        lines.append('')
+        lines.append('{:<40} {:>11} {:>6}'.format('Story', 'Time (ms)', '%'))
+        for story, seconds in self.stories():
+            lines.append('{:<40} {:>11.2f} {:>6.1f}'.format(
+                story, seconds * 1000, seconds * 100 / total))
+        return '\n'.join(lines)
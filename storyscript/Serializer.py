@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class Serializer:
+    """
+    Encodes compiled stories as JSON, using orjson when it is installed and
+    the standard library otherwise. Compact output has no indentation nor
+    whitespace between items.
+
+    Both encoders give the same output, except for infinite and NaN floats,
+    which orjson encodes as null. Compiled stories never hold those, since
+    float literals are finite and constant folding keeps infinite results
+    unfolded.
+    """
+    # a float in exponent notation, which orjson writes without the sign and
+    # leading zero of the exponent that the standard library adds
+    exponent = re.compile(rb'[\[:,\n] *-?\d+(?:\.\d+)?e')
+
+    def __init__(self, compact=False, fast=True):
+        self.compact = compact
+        self.indent = None if compact else 2
+        self.fast = fast and orjson is not None
+        self.option = 0
+        if self.fast:
+            self.option = orjson.OPT_NON_STR_KEYS
+            if not compact:
+                self.option |= orjson.OPT_INDENT_2
+
+    def stdlib(self, value, ensure_ascii=True):
+        if self.compact:
+            return json.dumps(value, separators=(',', ':'),
+                              ensure_ascii=ensure_ascii)
+        return json.dumps(value, indent=self.indent,
+                          ensure_ascii=ensure_ascii)
+
+    def fast_dumps(self, value):
+        """
+        Encodes a value with orjson, returning None for values it does not
+        support, like integers wider than 64 bits, or formats differently,
+        like floats in exponent notation.
+        """
+        try:
+            data = orjson.dumps(value, option=self.option)
+        except TypeError:
+            return None
+        if self.exponent.search(data) is not None:
+            return None
+        return data
+
+    def dumps(self, value):
+        """
+        Encodes a value to the same text as json.dumps, with non-ASCII
+        characters escaped.
+        """
+        if self.fast:
+            data = self.fast_dumps(value)
+            if data is not None:
+                text = data.decode('utf-8')
+                if len(text) == len(data):
+                    return text
+        return self.stdlib(value)
+
+    def dumpb(self, value):
+        """
+        Encodes a value to UTF-8 bytes, without escaping non-ASCII
+        characters.
+        """
+        if self.fast:
+            data = self.fast_dumps(value)
+            if data is not None:
+                return data
+        return self.stdlib(value, ensure_ascii=False).encode('utf-8')
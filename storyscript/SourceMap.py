@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+
+class SourceMap:
+    """
+    Moves the source text of compiled lines to a separate map, so that a
+    bundle doesn't carry a copy of its stories. The map holds the text of
+    every source line of a story, keyed by its number. The source line of a
+    compiled line is the integer part of its number, e.g. 12 for '12.1'.
+    """
+    version = 1
+
+    def __init__(self):
+        self.stories = {}
+
+    @staticmethod
+    def source_line(ln):
+        return ln.split('.', 1)[0]
+
+    def strip_story(self, path, story):
+        """
+        Returns a copy of a compiled story without the source of its lines,
+        which is added to the map.
+        """
+        tree = story.get('tree')
+        if not tree:
+            return story
+        lines = {}
+        story = dict(story)
+        if isinstance(tree, dict):
+            story['tree'] = {ln: self.strip_line(ln, line, lines)
+                             for ln, line in tree.items()}
+        else:
+            story['tree'] = [self.strip_line(line['ln'], line, lines)
+                             for line in tree]
+        self.stories[path] = lines
+        return story
+
+    def strip_line(self, ln, line, lines):
+        line = dict(line)
+        src = line.pop('src', None)
+        if src is not None:
+            lines[self.source_line(ln)] = src
+        return line
+
+    def strip(self, bundle):
+        """
+        Returns a copy of a bundle without the source of its lines.
+        """
+        result = dict(bundle)
+        result['stories'] = {path: self.strip_story(path, story)
+                             for path, story in bundle['stories'].items()}
+        return result
+
+    def output(self):
+        return {'version': self.version, 'stories': self.stories}
+
+    @classmethod
+    def source(cls, source_map, story, ln):
+        """
+        Returns the source of a compiled line from a source map, or None.
+        """
+        lines = source_map['stories'].get(story, {})
+        return lines.get(cls.source_line(ln))
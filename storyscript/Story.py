@@ -6,6 +6,8 @@ from functools import lru_cache
 
 from lark.exceptions import UnexpectedInput, UnexpectedToken
 
+from .Limits import Limits
+from .Profiler import NullProfiler
 from .compiler import Compiler
 from .compiler.lowering import Lowering
 from .exceptions import CompilerError, StoryError, StorySyntaxError
@@ -26,11 +28,20 @@ class Story:
     compiling it.
     """
 
-    def __init__(self, story, features, path=None):
+    def __init__(self, story, features, path=None, profiler=None,
+                 limits=None):
         self.story = story
         self.path = path
         self.lines = story.splitlines(keepends=False)
         self.features = features
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        if limits is None:
+            limits = Limits(features)
+        self.limits = limits
+        # the performance issues found with the lint feature
+        self.warnings = []
 
     @classmethod
     def read(cls, path):
@@ -58,11 +69,11 @@ class Story:
         return Story(cls.read(path), features, path=path)
 
     @classmethod
-    def from_stream(cls, stream, features):
+    def from_stream(cls, stream, features, profiler=None):
         """
         Creates a story from a stream source
         """
-        return Story(stream.read(), features)
+        return Story(stream.read(), features, profiler=profiler)
 
     def error(self, error):
         """
@@ -75,12 +86,18 @@ class Story:
         Parses the story, storing the tree
         """
         if parser is None:
-            parser = self._parser()
+            with self.profiler.span('parser_init'):
+                parser = self._parser()
+        self.profiler.count('source_lines', len(self.lines))
         try:
-            self.tree = parser.parse(self.story)
+            self.limits.check_source(self.story)
+            self.tree = parser.parse(self.story, profiler=self.profiler,
+                                     limits=self.limits)
             if lower:
-                proc = Lowering(parser, features=self.features)
-                self.tree = proc.process(self.tree)
+                proc = Lowering(parser, features=self.features,
+                                profiler=self.profiler, limits=self.limits)
+                with self.profiler.span('lowering'):
+                    self.tree = proc.process(self.tree)
         except (CompilerError, StorySyntaxError) as error:
             raise self.error(error) from error
         except UnexpectedToken as error:
@@ -94,21 +111,66 @@ class Story:
         """
         modules = []
         for module in self.tree.find_data('imports'):
-            path = module.string.child(0).value[1:-1]
+            path = module.string.child(0).value
             if path.endswith('.story') is False:
                 path = '{}.story'.format(path)
             modules.append(path)
         return modules
 
-    def compile(self):
+    def compile(self, errors=None):
         """
-        Compiles the story and stores the result.
+        Compiles the story and stores the result. Given a list, the errors
+        of all independent functions and blocks are added to it, before
+        raising the first one. Warnings are kept in Story.warnings.
         """
+        diagnostics = None if errors is None else []
+        warnings = []
         try:
             self.compiled = Compiler.compile(self.tree, story=self,
-                                             features=self.features)
+                                             features=self.features,
+                                             profiler=self.profiler,
+                                             limits=self.limits,
+                                             errors=diagnostics,
+                                             warnings=warnings)
         except (CompilerError, StorySyntaxError) as error:
-            raise self.error(error) from error
+            raise self.collect(error, diagnostics, errors) from error
+        self.warnings = [self.error(warning) for warning in warnings]
+
+    def collect(self, error, diagnostics, errors):
+        """
+        Wraps an error, and the diagnostics collected with it, adding them
+        to errors. Returns the first of them.
+        """
+        if errors is None:
+            return self.error(error)
+        if error not in diagnostics:
+            diagnostics.append(error)
+        wrapped = [self.error(diagnostic) for diagnostic in diagnostics]
+        errors.extend(wrapped)
+        return wrapped[0]
+
+    def check(self, parser=None, syntax_only=False, errors=None):
+        """
+        Parses and checks the story without compiling it. With
+        syntax_only, only parses it. Errors are collected like compile
+        does.
+        """
+        if parser is None:
+            parser = self._parser()
+        self.parse(parser=parser)
+        if syntax_only:
+            return
+        diagnostics = None if errors is None else []
+        warnings = []
+        try:
+            self.tree = Compiler.generate(self.tree, self.features,
+                                          profiler=self.profiler,
+                                          limits=self.limits,
+                                          errors=diagnostics,
+                                          warnings=warnings)
+        except (CompilerError, StorySyntaxError) as error:
+            raise self.collect(error, diagnostics, errors) from error
+        self.warnings = [self.error(warning) for warning in warnings]
 
     def lex(self, parser):
         """
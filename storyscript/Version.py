@@ -1,25 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import io
+import re
 import subprocess
+import sys
+from functools import lru_cache
 from os import path
-
-import pkg_resources
+from pkgutil import get_data
+from types import ModuleType
 
 root_dir = path.abspath(path.dirname(path.dirname(__file__)))
 
 
-def git_version():
-    return subprocess.run(
-        ['git', 'describe', '--abbrev=0', '--tags'],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
-        universal_newlines=True,
-        check=True,
-        cwd=root_dir,
-    ).stdout.strip()
-
-
 def git_describe():
     return subprocess.run(
         ['git', 'describe', '--dirty', '--tags'],
@@ -37,9 +29,7 @@ def read_version_file():
 
 
 def read_version_package():
-    resource_package = 'storyscript'
-    ver = pkg_resources.resource_string(resource_package, 'VERSION')
-    return ver.decode('utf8').strip()
+    return get_data('storyscript', 'VERSION').decode('utf8').strip()
 
 
 def read_version():
@@ -52,40 +42,59 @@ def read_version():
             return None
 
 
-# The version is a constant which isn't going to change over the program
-# lifetime
-_version = read_version()
+def release(description):
+    """
+    Extracts the tag from a `git describe` output,
+    e.g. 0.9.0-3-gc0ffee-dirty -> 0.9.0
+    """
+    return re.sub(r'(-\d+-g[0-9a-f]+)?(-dirty)?$', '', description)
 
 
-def get_version():
+# The version is a constant which isn't going to change over the program
+# lifetime. It's only resolved when needed, as git might have to be run.
+@lru_cache(maxsize=1)
+def versions():
+    """
+    Returns the (version, release version) pair.
+    """
     # try to read a VERSION file (e.g. for a released storyscript)
-    if _version is not None:
-        return _version
+    version = read_version()
+    if version is not None:
+        return version, version
 
     # detect a git version (for development builds)
     try:
-        return git_describe()
+        description = git_describe()
+        return description, release(description)
     except Exception:
         pass
 
     # soft fallback in case everything fails
-    return '0.0.0'
+    return '0.0.0', '0.0.0'
+
+
+def get_version():
+    return versions()[0]
 
 
 def get_release_version():
-    # try to read a VERSION file (e.g. for a released storyscript)
-    if _version is not None:
-        return _version
+    return versions()[1]
 
-    # detect a git version (for development builds)
-    try:
-        return git_version()
-    except Exception:
-        pass
 
-    # soft fallback in case everything fails
-    return '0.0.0'
+class VersionModule(ModuleType):
+    """
+    Resolves the version constants on their first use.
+    """
+
+    @property
+    def version(self):
+        return get_version()
+
+    @property
+    def release_version(self):
+        return get_release_version()
 
 
-version = get_version()
-release_version = get_release_version()
+# setup.py and the docs run this file on its own, outside of the package
+if __name__ == 'storyscript.Version':
+    sys.modules[__name__].__class__ = VersionModule
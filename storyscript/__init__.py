@@ -1,11 +1,46 @@
 # -*- coding: utf-8 -*-
-from .Api import Api
-from .Version import version
+import sys
+from types import ModuleType
 
 
-__version__ = version = version
+class Storyscript(ModuleType):
+    """
+    Resolves the public attributes of the package on their first use, so
+    that importing storyscript neither loads the compiler nor runs git.
+    """
 
+    @property
+    def Api(self):  # noqa N802
+        from .Api import Api
+        return Api
 
-loads = Api.loads
-load = Api.load
-load_map = Api.load_map
+    @Api.setter
+    def Api(self, value):  # noqa N802
+        # importing the storyscript.Api module sets it here, where the class
+        # is kept instead
+        pass
+
+    @property
+    def loads(self):
+        from .Api import Api
+        return Api.loads
+
+    @property
+    def load(self):
+        from .Api import Api
+        return Api.load
+
+    @property
+    def load_map(self):
+        from .Api import Api
+        return Api.load_map
+
+    @property
+    def version(self):
+        from .Version import get_version
+        return get_version()
+
+    __version__ = version
+
+
+sys.modules[__name__].__class__ = Storyscript
@@ -1,22 +1,79 @@
 # -*- coding: utf-8 -*-
+from storyscript.Profiler import NullProfiler
+from storyscript.compiler.binary.BinaryEncoder import BinaryEncoder
 from storyscript.compiler.json.JSONCompiler import JSONCompiler
 from storyscript.compiler.lowering.Lowering import Lowering
+from storyscript.compiler.optimizer.ConstantFolding import ConstantFolding
+from storyscript.compiler.optimizer.Independence import Independence
+from storyscript.compiler.optimizer.Inlining import Inlining
+from storyscript.compiler.optimizer.Liveness import Liveness
 from storyscript.compiler.semantics.Semantics import Semantics
 
 
 class Compiler:
 
     @classmethod
-    def generate(cls, tree, features):
+    def generate(cls, tree, features, profiler=None, limits=None,
+                 errors=None, warnings=None):
         """
-        Parses an AST and checks it.
+        Parses an AST and checks it. Given a list, all independent semantic
+        errors are added to it before raising the first one. With the lint
+        feature, performance issues are added to warnings.
         """
-        tree = Lowering(parser=tree.parser, features=features).process(tree)
-        return Semantics(features=features).process(tree)
+        if profiler is None:
+            profiler = NullProfiler()
+        if profiler.enabled:
+            profiler.count('nodes', tree.count_nodes())
+        lowering = Lowering(parser=tree.parser, features=features,
+                            profiler=profiler, limits=limits)
+        with profiler.span('lowering'):
+            tree = lowering.process(tree)
+        if profiler.enabled:
+            profiler.count('lowered_nodes', tree.count_nodes())
+        if limits is not None:
+            limits.check_deadline()
+        semantics = Semantics(features=features, profiler=profiler,
+                              errors=errors, warnings=warnings,
+                              limits=limits)
+        with profiler.span('semantics'):
+            return semantics.process(tree)
+
+    @staticmethod
+    def passes(features, profiler):
+        """
+        Lists the optimizer passes enabled by the features.
+        """
+        passes = []
+        if features is not None and features.fold_constants:
+            passes.append(ConstantFolding(profiler=profiler))
+        if features is not None and features.inline_temporaries:
+            passes.append(Inlining(profiler=profiler))
+        if features is not None and features.release_hints:
+            passes.append(Liveness(profiler=profiler))
+        if features is not None and features.parallel_groups:
+            passes.append(Independence(profiler=profiler))
+        return passes
 
     @classmethod
-    def compile(cls, tree, story, features, backend='json'):
-        assert backend == 'json'
+    def compile(cls, tree, story, features, backend='json', profiler=None,
+                limits=None, errors=None, warnings=None):
+        """
+        Compiles an AST to a JSON-like dict or, with the binary backend, to
+        its BinaryEncoder bytes.
+        """
+        assert backend in ('json', 'binary')
+        if profiler is None:
+            profiler = NullProfiler()
         compiler = JSONCompiler(story)
-        tree = cls.generate(tree, features)
-        return compiler.compile(tree)
+        tree = cls.generate(tree, features, profiler=profiler, limits=limits,
+                            errors=errors, warnings=warnings)
+        if limits is not None:
+            limits.check_deadline()
+        linear = features is not None and features.linear
+        passes = cls.passes(features, profiler)
+        with profiler.span('JSONCompiler'):
+            compiled = compiler.compile(tree, linear=linear, passes=passes)
+        if backend == 'binary':
+            with profiler.span('BinaryEncoder'):
+                return BinaryEncoder().encode(compiled)
+        return compiled
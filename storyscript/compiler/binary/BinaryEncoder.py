@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import re
+import struct
+from collections import Counter
+
+
+class BinaryEncoder:
+    """
+    Encodes compiled stories in a compact binary format holding the same
+    values as their JSON. Strings are interned in a table, the most frequent
+    first, and line numbers like '12.1' are written as varints.
+
+    The data starts with the magic bytes and the string table, a varint
+    count followed by the length and UTF-8 bytes of every string. Then comes
+    the value, made of a tag byte followed by its payload.
+    """
+    magic = b'SSB\x01'
+    null = 0
+    false = 1
+    true = 2
+    int = 3
+    float = 4
+    string = 5
+    list = 6
+    dict = 7
+    line = 8
+    line_number = re.compile(r'(0|[1-9][0-9]*)(\.(0|[1-9][0-9]*))*\Z')
+    double = struct.Struct('>d')
+
+    def __init__(self):
+        self.strings = Counter()
+        self.indices = {}
+
+    @staticmethod
+    def varint(data, number):
+        """
+        Writes an unsigned integer, seven bits at a time.
+        """
+        while number > 0x7f:
+            data.append(number & 0x7f | 0x80)
+            number >>= 7
+        data.append(number)
+
+    def is_line(self, string):
+        return self.line_number.match(string) is not None
+
+    def collect(self, value):
+        """
+        Counts the strings of a value, except line numbers.
+        """
+        if isinstance(value, str):
+            if not self.is_line(value):
+                self.strings[value] += 1
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self.collect(key)
+                self.collect(item)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self.collect(item)
+
+    def write(self, data, value):
+        if value is None:
+            data.append(self.null)
+        elif value is False:
+            data.append(self.false)
+        elif value is True:
+            data.append(self.true)
+        elif isinstance(value, int):
+            data.append(self.int)
+            # zigzag encoding keeps small negative numbers short
+            self.varint(data, value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            data.append(self.float)
+            data += self.double.pack(value)
+        elif isinstance(value, str):
+            index = self.indices.get(value)
+            if index is None:
+                data.append(self.line)
+                parts = value.split('.')
+                self.varint(data, len(parts))
+                for part in parts:
+                    self.varint(data, int(part))
+            else:
+                data.append(self.string)
+                self.varint(data, index)
+        elif isinstance(value, dict):
+            data.append(self.dict)
+            self.varint(data, len(value))
+            for key, item in value.items():
+                self.write(data, key)
+                self.write(data, item)
+        elif isinstance(value, (list, tuple)):
+            data.append(self.list)
+            self.varint(data, len(value))
+            for item in value:
+                self.write(data, item)
+        else:
+            raise TypeError('Object of type {} is not serializable'.format(
+                type(value).__name__))
+
+    def encode(self, value):
+        """
+        Encodes a compiled story or bundle to bytes.
+        """
+        self.strings = Counter()
+        self.collect(value)
+        strings = [string for string, count in self.strings.most_common()]
+        self.indices = {string: index for index, string in enumerate(strings)}
+        data = bytearray(self.magic)
+        self.varint(data, len(strings))
+        for string in strings:
+            encoded = string.encode('utf-8')
+            self.varint(data, len(encoded))
+            data += encoded
+        self.write(data, value)
+        return bytes(data)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from .BinaryEncoder import BinaryEncoder
+
+
+class BinaryLoader:
+    """
+    Loads compiled stories encoded by the BinaryEncoder, returning the same
+    values as loading their JSON. Malformed data raises a ValueError.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+        self.strings = []
+
+    @classmethod
+    def load(cls, data):
+        return cls(data).value()
+
+    def varint(self):
+        data = self.data
+        number = 0
+        shift = 0
+        while True:
+            byte = data[self.position]
+            self.position += 1
+            number |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return number
+            shift += 7
+
+    def read_strings(self):
+        magic = BinaryEncoder.magic
+        if self.data[:len(magic)] != magic:
+            raise ValueError('Not a compiled story')
+        self.position = len(magic)
+        strings = []
+        for _ in range(self.varint()):
+            length = self.varint()
+            end = self.position + length
+            strings.append(self.data[self.position:end].decode('utf-8'))
+            self.position = end
+        self.strings = strings
+
+    def read(self):
+        tag = self.data[self.position]
+        self.position += 1
+        if tag == BinaryEncoder.string:
+            return self.strings[self.varint()]
+        elif tag == BinaryEncoder.dict:
+            value = {}
+            for _ in range(self.varint()):
+                key = self.read()
+                value[key] = self.read()
+            return value
+        elif tag == BinaryEncoder.line:
+            return '.'.join(str(self.varint()) for _ in range(self.varint()))
+        elif tag == BinaryEncoder.null:
+            return None
+        elif tag == BinaryEncoder.list:
+            return [self.read() for _ in range(self.varint())]
+        elif tag == BinaryEncoder.int:
+            number = self.varint()
+            if number & 1:
+                return -(number >> 1) - 1
+            return number >> 1
+        elif tag == BinaryEncoder.true:
+            return True
+        elif tag == BinaryEncoder.false:
+            return False
+        elif tag == BinaryEncoder.float:
+            end = self.position + 8
+            number, = BinaryEncoder.double.unpack(self.data[self.position:end])
+            self.position = end
+            return number
+        raise ValueError('Unknown tag {} at byte {}'.format(
+            tag, self.position - 1))
+
+    def value(self):
+        """
+        Reads the string table and the value.
+        """
+        try:
+            self.read_strings()
+            value = self.read()
+        except IndexError:
+            raise ValueError('Truncated compiled story')
+        if self.position != len(self.data):
+            raise ValueError('Extra data after byte {}'.format(self.position))
+        return value
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+from storyscript.compiler.binary.BinaryEncoder import BinaryEncoder
+from storyscript.compiler.binary.BinaryLoader import BinaryLoader
+
+__all__ = ['BinaryEncoder', 'BinaryLoader']
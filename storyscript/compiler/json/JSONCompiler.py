@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from storyscript.Version import version
+from storyscript.Version import get_version
 from storyscript.exceptions import StorySyntaxError
 from storyscript.exceptions import internal_assert
 from storyscript.parser import Tree
@@ -59,7 +59,7 @@ class JSONCompiler:
         Compiles an import rule
         """
         module = tree.child(1).value
-        self.lines.modules[module] = tree.string.child(0).value[1:-1]
+        self.lines.modules[module] = tree.string.child(0).value
 
     def absolute_expression(self, tree, parent):
         """
@@ -426,12 +426,33 @@ class JSONCompiler:
             assert isinstance(item, Tree)
             self.subtree(item, parent=parent)
 
-    def compile(self, tree, debug=False):
+    @staticmethod
+    def linear(lines, output):
+        """
+        Lays the tree out as a list of instructions referring to each other
+        by their index, with a `lines` index from line numbers to
+        instructions.
+        """
+        instructions, index = lines.instructions()
+        output['tree'] = instructions
+        output['lines'] = index
+        if output['entrypoint'] is not None:
+            output['entrypoint'] = index[output['entrypoint']]
+        output['functions'] = {name: index[line]
+                               for name, line in output['functions'].items()}
+        return output
+
+    def compile(self, tree, debug=False, linear=False, passes=()):
         """
-        Compile an AST to JSON
+        Compile an AST to JSON, running the optimizer passes on its lines
         """
         self.parse_tree(tree)
         lines = self.lines
-        return {'tree': lines.lines, 'services': lines.get_services(),
-                'entrypoint': lines.entrypoint(), 'modules': lines.modules,
-                'functions': lines.functions, 'version': version}
+        for optimizer in passes:
+            optimizer.process(lines)
+        output = {'tree': lines.lines, 'services': lines.get_services(),
+                  'entrypoint': lines.entrypoint(), 'modules': lines.modules,
+                  'functions': lines.functions, 'version': get_version()}
+        if linear:
+            return self.linear(lines, output)
+        return output
@@ -26,6 +26,44 @@ class Lines:
             return None
         return self._lines[0]
 
+    def instructions(self):
+        """
+        Returns the lines as a list in their order, where next, enter, exit,
+        parent and parallel lines are list indices, and the index of every
+        line number.
+        """
+        index = {line: position for position, line in enumerate(self._lines)}
+        instructions = []
+        for line in self._lines:
+            instruction = dict(self.lines[line])
+            for key in ('next', 'enter', 'exit', 'parent'):
+                target = instruction.get(key)
+                if target is not None:
+                    instruction[key] = index[target]
+            if instruction.get('parallel'):
+                instruction['parallel'] = [index[target] for target in
+                                           instruction['parallel']]
+            instructions.append(instruction)
+        return instructions, index
+
+    def remove(self, replacements):
+        """
+        Removes lines, given as a mapping to the lines that take their place
+        in next, enter and exit references.
+        """
+        if not replacements:
+            return
+        for line in replacements:
+            del self.lines[line]
+        self._lines = [line for line in self._lines
+                       if line not in replacements]
+        for line in self.lines.values():
+            for key in ('next', 'enter', 'exit'):
+                target = line.get(key)
+                while target in replacements:
+                    target = replacements[target]
+                    line[key] = target
+
     def first(self):
         """
         Gets the first line.
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from lark.lexer import Token
 
+from storyscript.Profiler import NullProfiler
 from storyscript.parser import Tree
 
 
@@ -11,8 +12,12 @@ class FakeTree:
     """
     Creates fake trees that are not in the original story source.
     """
-    def __init__(self, block):
+    def __init__(self, block, limits=None, profiler=None):
         self.block = block
+        self.limits = limits
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
         self.original_line = str(block.line())
         self.new_lines = {}
         self._check_existing_fake_lines(block)
@@ -111,6 +116,9 @@ class FakeTree:
         Returns a fake path reference to this assignment
         """
         assert len(self.block.children) >= 1
+        self.profiler.count('temporaries')
+        if self.limits is not None:
+            self.limits.temporary(value)
 
         insert_pos = self.find_insert_pos(original_line)
         assignment = self.assignment(value)
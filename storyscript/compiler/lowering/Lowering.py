@@ -3,6 +3,7 @@ from enum import Enum
 
 from lark.lexer import Token
 
+from storyscript.Profiler import NullProfiler
 from storyscript.compiler.lowering.Faketree import FakeTree
 from storyscript.compiler.lowering.utils import service_to_mutation, \
         unicode_escape
@@ -22,20 +23,24 @@ class Lowering:
     too complicated for the Transformer, before the tree is compiled.
     """
 
-    def __init__(self, parser, features):
+    def __init__(self, parser, features, profiler=None, limits=None):
         """
         Saves the used parser as it might be used again for re-evaluation
         of new statements (e.g. for string interpolation)
         """
         self.parser = parser
         self.features = features
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        self.limits = limits
 
-    @staticmethod
-    def fake_tree(block):
+    def fake_tree(self, block):
         """
         Get a fake tree
         """
-        return FakeTree(block)
+        return FakeTree(block, limits=self.limits,
+                        profiler=self.profiler)
 
     @classmethod
     def replace_expression(cls, node, fake_tree, insert_point):
@@ -63,15 +68,16 @@ class Lowering:
         # Replace the inline expression with a fake_path reference
         insert_point.replace(0, fake_path.child(0))
 
-    @classmethod
-    def visit(cls, node, block, entity, pred, fun, parent):
+    def visit(self, node, block, entity, pred, fun, parent):
         if not hasattr(node, 'children') or len(node.children) == 0:
             return
+        if self.limits is not None:
+            self.limits.step(node)
 
         if node.data == 'block':
             # only generate a fake_block once for every line
             # node: block in which the fake assignments should be inserted
-            block = cls.fake_tree(node)
+            block = self.fake_tree(node)
         elif node.data == 'entity' or node.data == 'key_value':
             # set the parent where the inline_expression path should be
             # inserted
@@ -91,14 +97,14 @@ class Lowering:
             node.children = [Tree('path', node.children)]
 
         for c in node.children:
-            cls.visit(c, block, entity, pred, fun, parent=node)
+            self.visit(c, block, entity, pred, fun, parent=node)
 
         if pred(node):
             assert entity is not None
             assert block is not None
             fake_tree = block
             if not isinstance(fake_tree, FakeTree):
-                fake_tree = cls.fake_tree(block)
+                fake_tree = self.fake_tree(block)
 
             # Evaluate from leaf to the top
             fun(node, fake_tree, entity.path)
@@ -719,14 +725,23 @@ class Lowering:
         Applies several preprocessing steps to the existing AST.
         """
         pred = Lowering.is_inline_expression
-        self.visit_concise_when(tree)
-        self.visit_cmp_expr(tree)
-        self.visit_as_expr(tree, block=None)
-        self.visit_arguments(tree)
-        self.visit_assignment(tree, block=None, parent=None)
-        self.visit_string_templates(tree, block=None, parent=None,
-                                    cmp_expr=None)
-        self.visit_function_dot(tree, block=None)
-        self.visit(tree, None, None, pred,
-                   self.replace_expression, parent=None)
+        span = self.profiler.span
+        with span('lowering.concise_when'):
+            self.visit_concise_when(tree)
+        with span('lowering.cmp_expr'):
+            self.visit_cmp_expr(tree)
+        with span('lowering.as_expr'):
+            self.visit_as_expr(tree, block=None)
+        with span('lowering.arguments'):
+            self.visit_arguments(tree)
+        with span('lowering.assignment'):
+            self.visit_assignment(tree, block=None, parent=None)
+        with span('lowering.string_templates'):
+            self.visit_string_templates(tree, block=None, parent=None,
+                                        cmp_expr=None)
+        with span('lowering.function_dot'):
+            self.visit_function_dot(tree, block=None)
+        with span('lowering.inline_expressions'):
+            self.visit(tree, None, None, pred,
+                       self.replace_expression, parent=None)
         return tree
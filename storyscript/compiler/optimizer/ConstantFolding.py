@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import math
+import operator
+
+from storyscript.Profiler import NullProfiler
+
+
+class ConstantFolding:
+    """
+    Folds the expressions of compiled lines whose values are all literals,
+    and propagates the variables that are assigned a literal once. Only
+    operations whose result the engine computes the same way are folded,
+    e.g. divisions are left alone.
+    """
+    literals = ('int', 'float', 'string', 'boolean')
+    numbers = ('int', 'float')
+    # width of the signed integers of the engine, in bits. Integer results
+    # that don't fit are left unfolded, for the engine to handle.
+    max_bits = 64
+
+    operations = {
+        'sum': (('int', 'float', 'string'), operator.add),
+        'subtraction': (numbers, operator.sub),
+        'multiplication': (numbers, operator.mul),
+        'and': (('boolean',), operator.and_),
+        'or': (('boolean',), operator.or_),
+    }
+    comparisons = {
+        'equal': (literals, operator.eq),
+        'less': (('int', 'float', 'string'), operator.lt),
+        'less_equal': (('int', 'float', 'string'), operator.le),
+    }
+    casts = {
+        ('int', 'int'): int,
+        ('int', 'float'): float,
+        ('int', 'string'): str,
+        ('float', 'float'): float,
+        ('string', 'string'): str,
+        ('boolean', 'boolean'): bool,
+    }
+
+    def __init__(self, profiler=None):
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        self.constants = {}
+        self.folded = 0
+
+    @staticmethod
+    def literal(kind, value):
+        return {'$OBJECT': kind, kind: value}
+
+    @classmethod
+    def fits(cls, kind, value):
+        """
+        Checks whether a result can be folded, which integers only can when
+        they fit in max_bits.
+        """
+        if kind != 'int':
+            return True
+        limit = 1 << (cls.max_bits - 1)
+        return -limit <= value < limit
+
+    @classmethod
+    def is_literal(cls, value):
+        return isinstance(value, dict) and value.get('$OBJECT') in \
+            cls.literals
+
+    @staticmethod
+    def assignments(lines):
+        """
+        Counts how many times every variable is defined, be it by an
+        assignment, as an output or as a function argument.
+        """
+        counts = {}
+        for line in lines.values():
+            names = list(line.get('output') or [])
+            if line.get('name'):
+                names.append(line['name'][0])
+            if line['method'] == 'function':
+                names.extend(arg['name'] for arg in line.get('args') or [])
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def operation(self, name, values):
+        """
+        Computes an operation on literals, returning None when it can't be
+        folded.
+        """
+        kinds = {value['$OBJECT'] for value in values}
+        if len(kinds) != 1:
+            return None
+        kind = kinds.pop()
+        operands = [value[kind] for value in values]
+        if name == 'not':
+            if kind == 'boolean' and len(operands) == 1:
+                return self.literal(kind, not operands[0])
+            return None
+        if name in self.comparisons:
+            allowed, compare = self.comparisons[name]
+            if kind in allowed and len(operands) == 2:
+                return self.literal('boolean', compare(*operands))
+            return None
+        if name == 'modulus':
+            return self.modulus(kind, operands)
+        if name == 'exponential':
+            return self.exponential(kind, operands)
+        if name not in self.operations:
+            return None
+        allowed, function = self.operations[name]
+        if kind not in allowed:
+            return None
+        result = operands[0]
+        for operand in operands[1:]:
+            result = function(result, operand)
+        if kind == 'float' and not math.isfinite(result):
+            return None
+        if not self.fits(kind, result):
+            return None
+        return self.literal(kind, result)
+
+    def modulus(self, kind, operands):
+        if kind != 'int' or len(operands) != 2:
+            return None
+        left, right = operands
+        # languages disagree on the sign of negative modulos
+        if left < 0 or right <= 0:
+            return None
+        return self.literal(kind, left % right)
+
+    def exponential(self, kind, operands):
+        if kind != 'int' or len(operands) != 2:
+            return None
+        base, exponent = operands
+        # avoids computing powers far too large to fit
+        if exponent < 0 or abs(base).bit_length() * exponent > self.max_bits:
+            return None
+        result = base ** exponent
+        if not self.fits(kind, result):
+            return None
+        return self.literal(kind, result)
+
+    def cast(self, value, type):
+        kind = value['$OBJECT']
+        function = self.casts.get((kind, type.get('type')))
+        if function is None:
+            return None
+        return self.literal(type['type'], function(value[kind]))
+
+    def fold(self, value):
+        """
+        Returns a value with its constant subexpressions folded.
+        """
+        if isinstance(value, list):
+            return [self.fold(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        kind = value.get('$OBJECT')
+        if kind == 'path':
+            paths = value['paths']
+            if len(paths) == 1 and paths[0] in self.constants:
+                self.folded += 1
+                return dict(self.constants[paths[0]])
+            return value
+        value = {key: self.fold(item) for key, item in value.items()}
+        result = None
+        if kind == 'expression':
+            if all(self.is_literal(item) for item in value['values']):
+                result = self.operation(value['expression'], value['values'])
+        elif kind == 'type_cast':
+            if self.is_literal(value['value']):
+                result = self.cast(value['value'], value['type'])
+        if result is None:
+            return value
+        self.folded += 1
+        return result
+
+    def process(self, lines):
+        """
+        Folds the lines in order, so that variables are propagated to the
+        lines after their assignment.
+        """
+        with self.profiler.span('constant_folding'):
+            counts = self.assignments(lines.lines)
+            for line in lines.lines.values():
+                if not line.get('args'):
+                    continue
+                line['args'] = self.fold(line['args'])
+                name = line.get('name')
+                if line['method'] == 'expression' and name and \
+                        len(name) == 1 and counts.get(name[0]) == 1 and \
+                        self.is_literal(line['args'][0]):
+                    self.constants[name[0]] = line['args'][0]
+            self.profiler.count('folded_constants', self.folded)
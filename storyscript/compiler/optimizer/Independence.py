@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from storyscript.Profiler import NullProfiler
+from storyscript.compiler.optimizer.Inlining import Inlining
+
+
+class Independence:
+    """
+    Finds runs of consecutive service calls in a block that don't depend on
+    each other and lists them in the parallel key of the first call, so
+    that engines can run them concurrently. Two calls are independent when
+    neither writes a variable that the other reads or writes.
+    """
+
+    def __init__(self, profiler=None):
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        self.groups = 0
+
+    @staticmethod
+    def reads(line):
+        """
+        Returns the variables that a line reads.
+        """
+        names = {path['paths'][0] for path in Inlining.paths(line.get('args'))}
+        name = line.get('name')
+        if name and len(name) > 1:
+            names.add(name[0])
+            # the indexes of an assigned item
+            names.update(path['paths'][0] for path in Inlining.paths(name[1:]))
+        return names
+
+    @staticmethod
+    def writes(line, variables):
+        """
+        Returns the variables that a line writes. Calls to a service that
+        is a variable, like the output of a service block, write it too, as
+        their order matters.
+        """
+        names = set(line.get('output') or [])
+        name = line.get('name')
+        if name:
+            names.add(name[0])
+        if line.get('service') in variables:
+            names.add(line['service'])
+        return names
+
+    @staticmethod
+    def is_call(line):
+        return line['method'] == 'execute' and line.get('enter') is None
+
+    @staticmethod
+    def variables(lines):
+        """
+        Returns the variables that lines define.
+        """
+        names = set()
+        for line in lines.values():
+            names.update(line.get('output') or [])
+            if line.get('name'):
+                names.add(line['name'][0])
+        return names
+
+    def runs(self, lines, variables):
+        """
+        Yields the runs of independent calls, as lists of line numbers.
+        """
+        run = []
+        reads = set()
+        writes = set()
+        for ln in lines._lines:
+            line = lines.lines[ln]
+            if not self.is_call(line):
+                if len(run) > 1:
+                    yield run
+                run = []
+                continue
+            line_reads = self.reads(line)
+            line_writes = self.writes(line, variables)
+            previous = lines.lines[run[-1]] if run else None
+            if previous is None or previous.get('next') != ln or \
+                    previous.get('parent') != line.get('parent') or \
+                    line_reads & writes or line_writes & (reads | writes):
+                if len(run) > 1:
+                    yield run
+                run = []
+                reads = set()
+                writes = set()
+            run.append(ln)
+            reads |= line_reads
+            writes |= line_writes
+        if len(run) > 1:
+            yield run
+
+    def process(self, lines):
+        """
+        Adds the parallel list to the first line of every run.
+        """
+        with self.profiler.span('independence'):
+            variables = self.variables(lines.lines)
+            for run in self.runs(lines, variables):
+                lines.lines[run[0]]['parallel'] = run
+                self.groups += 1
+            self.profiler.count('parallel_groups', self.groups)
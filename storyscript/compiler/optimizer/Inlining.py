@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+from storyscript.Profiler import NullProfiler
+from storyscript.compiler.lowering.Faketree import FakeTree
+
+
+class Inlining:
+    """
+    Folds the temporaries made by lowering back into the line using them.
+    A temporary is inlined when it is pure, used exactly once and by the
+    line right after it. Expressions are inlined where they are used, while
+    mutations take the place of the line copying them to a variable.
+    Services and function calls always stay separate lines.
+    """
+    pure = ('expression', 'mutation')
+    # lines whose arguments are evaluated more than once
+    loops = ('while',)
+
+    def __init__(self, profiler=None):
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        self.uses = {}
+        self.inlined = 0
+
+    @staticmethod
+    def temporary(line):
+        """
+        Returns the name of the temporary assigned by a line or None.
+        """
+        name = line.get('name')
+        if name and len(name) == 1 and name[0].startswith(FakeTree.prefix):
+            return name[0]
+        return None
+
+    @classmethod
+    def paths(cls, value):
+        """
+        Yields the path objects in a value.
+        """
+        if isinstance(value, list):
+            for item in value:
+                yield from cls.paths(item)
+        elif isinstance(value, dict):
+            if value.get('$OBJECT') == 'path':
+                yield value
+            for item in value.values():
+                yield from cls.paths(item)
+
+    def count(self, line, value):
+        """
+        Counts the lines using temporaries in a value. Temporaries that are
+        indexed can't be inlined, which is counted as a use by no line.
+        """
+        for path in self.paths(value):
+            name = path['paths'][0]
+            if isinstance(name, str) and name.startswith(FakeTree.prefix):
+                user = line if len(path['paths']) == 1 else None
+                self.uses.setdefault(name, []).append(user)
+
+    @classmethod
+    def replace(cls, value, name, replacement):
+        """
+        Replaces the path of a temporary in a value.
+        """
+        if isinstance(value, list):
+            return [cls.replace(item, name, replacement) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if value.get('$OBJECT') == 'path' and value['paths'] == [name]:
+            return replacement
+        return {key: cls.replace(item, name, replacement)
+                for key, item in value.items()}
+
+    @staticmethod
+    def is_copy(line, name):
+        return line['method'] == 'expression' and \
+            line['args'] == [{'$OBJECT': 'path', 'paths': [name]}]
+
+    def inline(self, line, user, name):
+        """
+        Moves a temporary into the line using it, returning whether it
+        could be.
+        """
+        if self.is_copy(user, name):
+            user['method'] = line['method']
+            user['args'] = line['args']
+        elif line['method'] == 'expression' and len(line['args']) == 1:
+            user['args'] = self.replace(user['args'], name, line['args'][0])
+        else:
+            return False
+        for used in set(self.uses_in(line['args'])):
+            self.uses[used] = [user['ln'] if ln == line['ln'] else ln
+                               for ln in self.uses[used]]
+        return True
+
+    def uses_in(self, value):
+        for path in self.paths(value):
+            name = path['paths'][0]
+            if name in self.uses:
+                yield name
+
+    def removable(self, lines, line):
+        """
+        Checks whether a line assigns a temporary that can be removed,
+        inlining it in the line using it. Unused expressions are removed
+        as they are.
+        """
+        name = self.temporary(line)
+        if name is None or line['method'] not in self.pure:
+            return False
+        user = lines.get(line.get('next'))
+        if user is None or user.get('parent') != line.get('parent'):
+            return False
+        uses = self.uses.get(name, [])
+        if not uses:
+            return line['method'] == 'expression'
+        if uses != [user['ln']] or user['method'] in self.loops:
+            return False
+        return self.inline(line, user, name)
+
+    def process(self, lines):
+        """
+        Inlines the temporaries in line order, so that chains of temporaries
+        are inlined one after the other.
+        """
+        with self.profiler.span('inlining'):
+            for ln, line in lines.lines.items():
+                self.count(ln, line.get('args'))
+            replacements = {}
+            for ln in list(lines._lines):
+                line = lines.lines[ln]
+                if self.removable(lines.lines, line):
+                    replacements[ln] = line.get('next')
+            lines.remove(replacements)
+            self.inlined = len(replacements)
+            self.profiler.count('inlined_temporaries', self.inlined)
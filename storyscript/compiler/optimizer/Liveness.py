@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from storyscript.Profiler import NullProfiler
+from storyscript.compiler.optimizer.Inlining import Inlining
+
+
+class Liveness:
+    """
+    Computes which variables are live after every compiled line and adds
+    the variables that die with a line to its release list, so that engines
+    can free them early. Successors are over-approximated, which only keeps
+    variables alive for longer.
+    """
+    # blocks whose lines may be followed by their header again
+    repeated = ('for', 'while', 'when')
+    # blocks whose lines may throw, jumping to the catch or finally after
+    guarded = ('try', 'catch')
+    # blocks that run at any time later, whose variables are never released
+    handlers = ('when',)
+
+    def __init__(self, profiler=None):
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        self.released = 0
+
+    @staticmethod
+    def defines(line):
+        """
+        Returns the variables that a line assigns.
+        """
+        if line['method'] == 'function':
+            return {arg['name'] for arg in line.get('args') or []}
+        names = set(line.get('output') or [])
+        name = line.get('name')
+        if name and len(name) == 1:
+            names.add(name[0])
+        return names
+
+    @staticmethod
+    def reads(line, variables):
+        """
+        Returns the variables that a line reads.
+        """
+        names = set()
+        for path in Inlining.paths(line.get('args')):
+            names.add(path['paths'][0])
+        name = line.get('name')
+        if name and len(name) > 1:
+            names.add(name[0])
+            # the indexes of an assigned item
+            for path in Inlining.paths(name[1:]):
+                names.add(path['paths'][0])
+        if line.get('service') in variables:
+            names.add(line['service'])
+        return names & variables
+
+    def block(self, lines, line, methods):
+        """
+        Finds the closest block of a line made by one of the methods.
+        """
+        parent = line.get('parent')
+        while parent is not None:
+            if lines[parent]['method'] in methods:
+                return parent
+            parent = lines[parent].get('parent')
+        return None
+
+    def successors(self, lines, line):
+        successors = {line.get(key) for key in ('next', 'enter', 'exit')}
+        successors.add(self.block(lines, line, self.repeated))
+        parent = line.get('parent')
+        while parent is not None:
+            if lines[parent]['method'] in self.guarded:
+                successors.add(lines[parent].get('exit'))
+            parent = lines[parent].get('parent')
+        successors.discard(None)
+        return successors
+
+    def live(self, lines, reads, defines):
+        """
+        Solves the variables live after every line, visiting lines again
+        until nothing changes.
+        """
+        successors = {}
+        predecessors = {ln: set() for ln in lines}
+        for ln, line in lines.items():
+            successors[ln] = self.successors(lines, line)
+            for successor in successors[ln]:
+                predecessors[successor].add(ln)
+        live_in = {ln: set() for ln in lines}
+        live_out = {ln: set() for ln in lines}
+        pending = list(lines)
+        queued = set(pending)
+        while pending:
+            ln = pending.pop()
+            queued.discard(ln)
+            out = set()
+            for successor in successors[ln]:
+                out |= live_in[successor]
+            live_out[ln] = out
+            new = reads[ln] | (out - defines[ln])
+            if new != live_in[ln]:
+                live_in[ln] = new
+                for predecessor in predecessors[ln]:
+                    if predecessor not in queued:
+                        queued.add(predecessor)
+                        pending.append(predecessor)
+        return live_out
+
+    def process(self, lines):
+        """
+        Adds the release list to every line after which variables die.
+        """
+        with self.profiler.span('liveness'):
+            lines = lines.lines
+            defines = {ln: self.defines(line) for ln, line in lines.items()}
+            variables = set().union(*defines.values())
+            reads = {ln: self.reads(line, variables)
+                     for ln, line in lines.items()}
+            pinned = set()
+            for ln, line in lines.items():
+                if line['method'] in self.handlers or \
+                        self.block(lines, line, self.handlers) is not None:
+                    pinned |= reads[ln]
+            live_out = self.live(lines, reads, defines)
+            for ln, line in lines.items():
+                dead = (reads[ln] | defines[ln]) - live_out[ln] - pinned
+                if dead:
+                    line['release'] = sorted(dead)
+                    self.released += len(dead)
+            self.profiler.count('released_variables', self.released)
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from storyscript.compiler.optimizer.ConstantFolding import ConstantFolding
+from storyscript.compiler.optimizer.Independence import Independence
+from storyscript.compiler.optimizer.Inlining import Inlining
+from storyscript.compiler.optimizer.Liveness import Liveness
+
+__all__ = ['ConstantFolding', 'Independence', 'Inlining', 'Liveness']
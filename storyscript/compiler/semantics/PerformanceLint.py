@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+from storyscript.compiler.lowering.Faketree import FakeTree
+from storyscript.compiler.semantics.types.Types import StringType
+from storyscript.exceptions import CompilerError
+from storyscript.parser import Tree
+
+from .Visitors import BaseVisitor
+
+
+class PerformanceLint(BaseVisitor):
+    """
+    Finds performance issues in a checked tree, adding them to warnings as
+    CompilerErrors: service calls in loops with the same arguments every
+    time, mutations computed again on unchanged variables, while loops that
+    never end and strings built by concatenation in loops.
+    """
+    loops = ('foreach_block', 'while_block')
+    # nodes that may end a while loop, or change its condition
+    exits = ('return_statement', 'throw_statement', 'service',
+             'call_expression')
+
+    def __init__(self, warnings=None, **kwargs):
+        super().__init__(**kwargs)
+        if warnings is None:
+            warnings = []
+        self.warnings = warnings
+        # the values of the temporaries created by the lowering
+        self.temporaries = {}
+        self.keys = {}
+
+    def warn(self, error, tree, **format_args):
+        self.warnings.append(CompilerError(error, tree=tree,
+                                           format_args=format_args))
+
+    @staticmethod
+    def direct(tree, data):
+        """
+        Finds the nodes of a tree, without looking in them nor in nested
+        blocks.
+        """
+        for child in tree.children:
+            if not isinstance(child, Tree) or child.data == 'nested_block':
+                continue
+            if child.data == data:
+                yield child
+            else:
+                yield from PerformanceLint.direct(child, data)
+
+    @staticmethod
+    def name(path):
+        return path.child(0).value
+
+    @classmethod
+    def assigned(cls, tree):
+        """
+        Finds the variables assigned in a tree, including outputs.
+        """
+        names = {cls.name(assignment.path)
+                 for assignment in tree.find_data('assignment')}
+        for output in tree.find_data('output'):
+            names.update(child.value for child in output.children)
+        return names
+
+    def sources(self, tree):
+        """
+        Yields a tree and the values of the temporaries it uses.
+        """
+        trees = [tree]
+        visited = set()
+        while trees:
+            tree = trees.pop()
+            yield tree
+            for path in tree.find_data('path'):
+                name = self.name(path)
+                if name in self.temporaries and name not in visited:
+                    visited.add(name)
+                    trees.append(self.temporaries[name])
+
+    def reads(self, tree):
+        """
+        Finds the variables read by a tree, through its temporaries.
+        """
+        return {self.name(path) for source in self.sources(tree)
+                for path in source.find_data('path')
+                if self.name(path) not in self.temporaries}
+
+    def key(self, tree):
+        """
+        Identifies the value of a tree, replacing temporaries by their keys.
+        """
+        return tuple(self.keys.get(value, str(value))
+                     for value in tree.scan_values(lambda value: True))
+
+    def define(self, assignment):
+        """
+        Remembers the value of a temporary.
+        """
+        name = self.name(assignment.path)
+        if name.startswith(FakeTree.prefix):
+            value = assignment.assignment_fragment.base_expression
+            self.temporaries[name] = value
+            self.keys[name] = self.key(value)
+
+    def visit(self, tree):
+        self.sequence(tree, tree.scope, None, {})
+
+    def sequence(self, tree, scope, loop, seen):
+        """
+        Lints the blocks of a tree in order. Seen maps the keys of the
+        mutations computed before to their reads and line.
+        """
+        for block in tree.children:
+            if isinstance(block, Tree):
+                self.block(block, scope, loop, seen)
+
+    def block(self, block, scope, loop, seen):
+        self.step(block)
+        targets = {}
+        for assignment in self.direct(block, 'assignment'):
+            self.define(assignment)
+            value = assignment.assignment_fragment.base_expression
+            if value.mutation is not None:
+                targets[id(value.mutation)] = self.name(assignment.path)
+            if loop is not None:
+                self.assignment(assignment, scope, loop)
+        self.mutations(block, targets, loop, seen)
+        for child in block.children:
+            if isinstance(child, Tree):
+                self.compound(child, scope, loop, seen)
+        assigned = self.assigned(block)
+        for key in [key for key, (reads, line) in seen.items()
+                    if reads & assigned]:
+            del seen[key]
+
+    def compound(self, tree, scope, loop, seen):
+        """
+        Lints the nested blocks of a block statement.
+        """
+        if tree.data == 'nested_block':
+            return
+        if tree.scope is not None:
+            scope = tree.scope
+        if tree.data == 'function_block':
+            loop, seen = None, {}
+        elif tree.data in self.loops:
+            loop = (tree.data, self.assigned(tree))
+            seen = {key: value for key, value in seen.items()
+                    if not value[0] & loop[1]}
+            if tree.data == 'while_block':
+                self.while_block(tree, loop)
+        for child in tree.children:
+            if not isinstance(child, Tree):
+                continue
+            if child.data == 'nested_block':
+                self.sequence(child, scope, loop, dict(seen))
+            else:
+                self.compound(child, scope, loop, seen)
+
+    def mutations(self, block, targets, loop, seen):
+        """
+        Warns about mutations computed again on unchanged variables, either
+        in every iteration of a loop or after an earlier line. Only the
+        last mutation of a chain is reported.
+        """
+        found = []
+        for mutation in self.direct(block, 'mutation'):
+            reads = self.reads(mutation)
+            if not reads:
+                continue
+            key = self.key(mutation)
+            if loop is not None and not reads & loop[1]:
+                found.append((mutation, 'the previous iteration'))
+            elif key in seen:
+                found.append((mutation, 'line {}'.format(seen[key][1])))
+            else:
+                line = str(mutation.line()).split('.')[0]
+                seen[key] = (reads, line)
+        chained = set()
+        for mutation, since in found:
+            for path in mutation.find_data('path'):
+                chained.add(self.name(path))
+        for mutation, since in found:
+            if targets.get(id(mutation)) not in chained:
+                name = mutation.mutation_fragment.child(0)
+                self.warn('lint_repeated_mutation', mutation, name=name,
+                          since=since)
+
+    def assignment(self, assignment, scope, loop):
+        """
+        Warns about service calls with the same arguments in every
+        iteration and strings built by concatenation in a loop.
+        """
+        target = self.name(assignment.path)
+        value = assignment.assignment_fragment.base_expression
+        service = value.service
+        if service is not None and loop[0] == 'foreach_block':
+            if not self.reads(service) & loop[1]:
+                command = service.service_fragment.command.child(0)
+                self.warn('lint_loop_invariant_service', service,
+                          service=self.name(service.path), command=command)
+        for expression in value.find_data('arith_expression'):
+            if expression.arith_operator is None or \
+                    expression.arith_operator.child(0) != '+':
+                continue
+            names = {self.name(path)
+                     for path in expression.find_data('path')}
+            if target in names and self.is_string(scope, target):
+                self.warn('lint_string_concat_loop', assignment, name=target)
+                return
+
+    @staticmethod
+    def is_string(scope, name):
+        symbol = scope.resolve(name)
+        return symbol is not None and isinstance(symbol.type(), StringType)
+
+    def while_block(self, tree, loop):
+        """
+        Warns about a while loop that can't end, because its body has no
+        break, return, throw nor call and its condition never changes.
+        """
+        sources = list(self.sources(tree.while_statement))
+        for source in sources + [tree.nested_block]:
+            for data in self.exits:
+                if any(source.find_data(data)):
+                    return
+        if self.breaks(tree.nested_block):
+            return
+        if self.reads(tree.while_statement) & loop[1]:
+            return
+        self.warn('lint_while_no_exit', tree.while_statement)
+
+    @classmethod
+    def breaks(cls, tree):
+        """
+        Checks whether a tree breaks out of the loop it's in.
+        """
+        for child in tree.children:
+            if not isinstance(child, Tree) or child.data in cls.loops:
+                continue
+            if child.data == 'break_statement' or cls.breaks(child):
+                return True
+        return False
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
+from storyscript.Profiler import NullProfiler
 
 from .FunctionResolver import FunctionResolver
+from .PerformanceLint import PerformanceLint
 from .TypeResolver import TypeResolver
 from .functions.FunctionTable import FunctionTable
 from .functions.MutationTable import MutationTable
@@ -11,8 +13,15 @@ class Semantics:
     Performs semantic analysis on the AST
     """
 
-    def __init__(self, features):
+    def __init__(self, features, profiler=None, errors=None, warnings=None,
+                 limits=None):
         self.features = features
+        if profiler is None:
+            profiler = NullProfiler()
+        self.profiler = profiler
+        self.errors = errors
+        self.warnings = warnings
+        self.limits = limits
 
     visitors = [FunctionResolver, TypeResolver]
 
@@ -22,6 +31,26 @@ class Semantics:
         for visitor in self.visitors:
             v = visitor(function_table=self.function_table,
                         mutation_table=self.mutation_table,
-                        features=self.features)
-            v.visit(tree)
+                        features=self.features, errors=self.errors,
+                        limits=self.limits)
+            with self.profiler.span(visitor.__name__):
+                v.visit(tree)
+        self.profiler.count('mutations', self.mutation_table.resolved)
+        if self.errors:
+            raise self.errors[0]
+        if self.features is not None and self.features.lint:
+            self.lint(tree)
         return tree
+
+    def lint(self, tree):
+        """
+        Adds the performance issues of a checked tree to the warnings.
+        """
+        lint = PerformanceLint(function_table=self.function_table,
+                               mutation_table=self.mutation_table,
+                               features=self.features,
+                               warnings=self.warnings, limits=self.limits)
+        start = len(lint.warnings)
+        with self.profiler.span('PerformanceLint'):
+            lint.visit(tree)
+        self.profiler.count('lint_warnings', len(lint.warnings) - start)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from storyscript.compiler.semantics.types.Types import NoneType, ObjectType
+from storyscript.exceptions import CompilerError
 from storyscript.parser import Tree
 
 from .ExpressionResolver import ExpressionResolver
@@ -296,8 +297,38 @@ class TypeResolver(ScopeSelectiveVisitor):
     def create_scope(self, scope, storage_class=None):
         return ScopeBlock(self, scope, storage_class)
 
+    @staticmethod
+    def independent(block):
+        """
+        Whether a top-level block leaves the root scope untouched, so that
+        its errors can't affect the blocks after it: functions and compound
+        blocks have their own scope, unlike assignments.
+        """
+        return block.rules is None or block.rules.assignment is None
+
+    def visit_isolated(self, block, scope):
+        """
+        Visits a top-level block, collecting its error if it is
+        independent.
+        """
+        in_service_block = self.in_service_block
+        in_when_block = self.in_when_block
+        try:
+            self.visit(block, scope)
+        except CompilerError as error:
+            if not self.independent(block):
+                raise
+            self.errors.append(error)
+            self.in_service_block = in_service_block
+            self.in_when_block = in_when_block
+
     def start(self, tree, scope=None):
         # create the root scope
         tree.scope = Scope.root()
         self.update_scope(tree.scope)
-        self.visit_children(tree, scope=tree.scope)
+        if self.errors is None:
+            self.visit_children(tree, scope=tree.scope)
+            return
+        for c in tree.children:
+            if isinstance(c, Tree):
+                self.visit_isolated(c, tree.scope)
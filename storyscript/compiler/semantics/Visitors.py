@@ -4,10 +4,24 @@ from storyscript.parser import Tree
 
 
 class BaseVisitor:
-    def __init__(self, function_table, mutation_table, features):
+    limits = None
+
+    def __init__(self, function_table, mutation_table, features,
+                 errors=None, limits=None):
         self.function_table = function_table
         self.mutation_table = mutation_table
         self.features = features
+        # when a list, errors that don't affect the rest of the story are
+        # collected rather than raised
+        self.errors = errors
+        self.limits = limits
+
+    def step(self, tree):
+        """
+        Counts a visited node against the deadline of the limits.
+        """
+        if self.limits is not None:
+            self.limits.step(tree)
 
 
 class SelectiveVisitor(BaseVisitor):
@@ -16,6 +30,7 @@ class SelectiveVisitor(BaseVisitor):
     visit_children must be called explicitly.
     """
     def visit(self, tree):
+        self.step(tree)
         if hasattr(self, tree.data):
             return getattr(self, tree.data)(tree)
 
@@ -31,6 +46,7 @@ class ScopeSelectiveVisitor(BaseVisitor):
     visit_children must be called explicitly.
     """
     def visit(self, tree, scope=None):
+        self.step(tree)
         if hasattr(self, tree.data):
             return getattr(self, tree.data)(tree, scope)
 
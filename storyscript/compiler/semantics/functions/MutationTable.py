@@ -75,8 +75,12 @@ class MutationTable:
     """
     A table of all available mutation inside a story.
     """
+    # the indexed mutations of the Hub, built by the first table
+    hub_mutations = None
+
     def __init__(self):
         self.mutations = {}
+        self.resolved = 0
 
     def insert(self, mutation):
         """
@@ -123,6 +127,7 @@ class MutationTable:
             return None
 
         if type_ == AnyType.instance():
+            self.resolved += 1
             return self._resolve_any(muts, name)
 
         t = self.type_key(type(type_))
@@ -132,14 +137,21 @@ class MutationTable:
 
         mo = MutationOverloads(name, type_)
         mo.add_overloads(overloads)
+        self.resolved += 1
         return mo
 
     @classmethod
     def init(cls):
         """
-        Builds a list of all mutations of the Hub.
+        Returns a table of all mutations of the Hub. The mutations are only
+        indexed once and then shared by all tables, which count their
+        resolutions separately.
         """
+        if cls.hub_mutations is None:
+            table = cls()
+            for m in hub.mutations():
+                table.insert(m)
+            cls.hub_mutations = table.mutations
         mi = cls()
-        for m in hub.mutations():
-            mi.insert(m)
+        mi.mutations = cls.hub_mutations
         return mi
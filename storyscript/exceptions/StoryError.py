@@ -3,8 +3,6 @@ import os
 
 import click
 
-from lark.exceptions import UnexpectedCharacters, UnexpectedToken
-
 from .CompilerError import CompilerError
 from .ProcessingError import ProcessingError
 from ..ErrorCodes import ErrorCodes
@@ -60,18 +58,28 @@ class StoryError(SyntaxError):
         name = self.name()
         if self.with_color:
             name = click.style(self.name(), bold=True)
-        text = f'Error: syntax error in {name} at line {self.int_line()}'
+        kind = 'Error: syntax error'
+        if self.is_warning():
+            kind = 'Warning: performance issue'
+        text = f'{kind} in {name} at line {self.int_line()}'
         if self.error.column != 'None':
             text += f', column {self.error.column}'
         return text
 
+    def is_warning(self):
+        """
+        Whether the error is a warning, which doesn't stop the compilation.
+        """
+        return self.error_tuple is not None and \
+            self.error_tuple[0].startswith('W')
+
     def symbols(self, line):
         """
         Creates the repeated symbols that mark the error.
         """
         if self.error.column != 'None':
             end_column = int(self.error.column) + 1
-            if hasattr(self.error, 'end_column'):
+            if getattr(self.error, 'end_column', None) not in (None, 'None'):
                 end_column = int(self.error.end_column)
             start_column = int(self.error.column)
         else:
@@ -192,6 +200,7 @@ class StoryError(SyntaxError):
         """
         Identifies the error.
         """
+        from lark.exceptions import UnexpectedCharacters, UnexpectedToken
         if hasattr(self.error, 'error'):
             if not isinstance(self.error.error, str):
                 return ErrorCodes.unidentified_error
@@ -237,6 +246,27 @@ class StoryError(SyntaxError):
         """
         click.echo(self.message())
 
+    @staticmethod
+    def _position(value):
+        if value is None or value == 'None':
+            return None
+        return int(value)
+
+    def to_dict(self):
+        """
+        Returns the error as a JSON-serializable dictionary
+        """
+        self.process()
+        data = {'code': self.error_code(), 'hint': self.hint(),
+                'path': self.path, 'line': None, 'column': None,
+                'end_column': None}
+        if hasattr(self.error, 'line'):
+            data['line'] = self.int_line()
+            data['column'] = self._position(self.error.column)
+            end_column = getattr(self.error, 'end_column', None)
+            data['end_column'] = self._position(end_column)
+        return data
+
     @staticmethod
     def create_error(error_code, **kwargs):
         """
@@ -7,6 +7,7 @@ from .Grammar import Grammar
 from .Indenter import CustomIndenter
 from .Transformer import Transformer
 from .Tree import Tree
+from ..Profiler import NullProfiler
 
 
 class Parser:
@@ -45,19 +46,44 @@ class Parser:
         """
         return Lark(self.grammar(), parser=self.algo, postlex=self.indenter())
 
-    def parse(self, source):
+    def parse(self, source, profiler=None, limits=None):
         """
-        Parses the source string.
+        Parses the source string, checking the limits if given.
         """
         if source == '':
             return Tree('empty', [])
         source = '{}\n'.format(source)
-        lark = self.lark
-        tree = lark.parse(source)
-        result = self.transformer().transform(tree)
+        if profiler is None:
+            profiler = NullProfiler()
+        with profiler.span('parse'):
+            if profiler.enabled or limits is not None:
+                tree = self.stream_parse(source, profiler, limits)
+            else:
+                tree = self.lark.parse(source)
+        if limits is not None:
+            limits.check_nodes(tree)
+            limits.check_deadline()
+        with profiler.span('transform'):
+            result = self.transformer().transform(tree)
         result.parser = self
         return result
 
+    def stream_parse(self, source, profiler, limits=None):
+        """
+        Parses the source string like lark does, timing the lexer which
+        runs interleaved with the LALR parser and guarding its tokens with
+        the limits.
+        """
+        frontend = self.lark.parser
+        tokens = frontend.lex(source)
+        if limits is not None:
+            tokens = limits.tokens(tokens)
+        tokens = profiler.timed('lex', tokens, counter='tokens')
+        set_state = frontend.lexer.set_parser_state
+        if set_state is NotImplemented:
+            return frontend.parser.parse(tokens)
+        return frontend.parser.parse(tokens, set_state)
+
     def lex(self, source):
         """
         Lexes the source string
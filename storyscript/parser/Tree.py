@@ -52,6 +52,19 @@ class Tree(LarkTree):
         assert len(self.children) > index
         return self.children[index]
 
+    def count_nodes(self):
+        """
+        Counts the subtrees of this tree, including itself.
+        """
+        count = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(child for child in node.children
+                         if isinstance(child, LarkTree))
+        return count
+
     def find(self, path):
         """
         Wraps LarkTree.find_data, making it easier to use.
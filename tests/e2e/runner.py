@@ -11,6 +11,7 @@ from pytest import mark
 
 from storyscript.Api import Api
 from storyscript.App import _clean_dict
+from storyscript.compiler.binary import BinaryEncoder, BinaryLoader
 
 from utils import parse_features
 
@@ -26,6 +27,9 @@ features = {'globals': True}
 def run_test_story(source, expected_story, features):
     s = Api.loads(source, features)
     s.check_success()
+    # the binary backend must load back to the same story
+    encoded = BinaryEncoder().encode(s.result())
+    assert BinaryLoader.load(encoded) == s.result()
     result = _clean_dict(s.result())
     del result['version']
     assert expected_story == result
@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 from unittest.mock import patch
 
-from pytest import raises
+from pytest import mark, raises
 
 from storyscript.Api import Api
 from storyscript.Bundle import Bundle
+from storyscript.Daemon import StoryCache
+from storyscript.Features import Features
 from storyscript.Story import Story
 from storyscript.exceptions import StoryError
 
@@ -100,3 +102,125 @@ def test_compiler_only_comments():
     result = api_result['stories']['a.story']
     assert result['tree'] == {}
     assert result['entrypoint'] is None
+
+
+@mark.parametrize('features, code', [
+    ({'max_source_bytes': 10}, 'E0080'),
+    ({'max_nodes': 20}, 'E0081'),
+    ({'max_depth': 3}, 'E0082'),
+    ({'max_temporaries': 1}, 'E0083'),
+    ({'deadline': -1}, 'E0084'),
+])
+def test_api_loads_limits(features, code):
+    """
+    Ensures the compilation stops when going over a limit
+    """
+    source = 'a = [[[[1 + 2]]]]\nb = "x{a}" + "y{a}"\n'
+    assert Api.loads(source).errors() == []
+    errors = Api.loads(source, features=features).errors()
+    assert errors[0].short_message().startswith(code)
+
+
+def test_api_load_map_limits_per_story():
+    """
+    Ensures every story of a bundle has its own limits
+    """
+    source = 'a = "x{1}" + "y{2}"\n'
+    features = {'max_temporaries': 4}
+    assert Api.loads(source, features=features).errors() == []
+    files = {'a.story': source, 'b.story': source}
+    assert Api.load_map(files, features=features).errors() == []
+
+
+@mark.parametrize('source, features, code', [
+    ('a = {}\n'.format(' + '.join(['1'] * 5000)), {'max_depth': 64},
+     'E0082'),
+    ('a = [{}]\n'.format(', '.join(['1'] * 5000)), {'max_nodes': 100},
+     'E0081'),
+])
+def test_api_loads_limits_large(source, features, code):
+    """
+    Ensures large expressions are stopped while they are parsed
+    """
+    errors = Api.loads(source, features=features).errors()
+    assert errors[0].short_message().startswith(code)
+
+
+def test_api_loads_stats():
+    """
+    Ensures Api.loads reports what the compilation processed
+    """
+    source = 'a = [1, 2]\nb = a.length()\nc = "x{a}" + "y{b}"\n'
+    stats = Api.loads(source, stats=True).stats()
+    assert stats['source_lines'] == 3
+    assert stats['tokens'] > 0
+    assert stats['lowered_nodes'] > stats['nodes'] > 0
+    assert stats['temporaries'] == 3
+    assert stats['mutations'] == 1
+    assert stats['cache_hits'] == stats['cache_misses'] == 0
+    assert set(stats['phases']) >= {'parse', 'lowering', 'JSONCompiler'}
+
+
+def test_api_loads_no_stats():
+    """
+    Ensures statistics are only collected when requested
+    """
+    assert Api.loads('a = 1').stats() is None
+
+
+def test_api_load_map_stats():
+    files = {'a.story': "import 'b' as b", 'b.story': 'x = 0\ny = 1'}
+    stats = Api.load_map(files, stats=True).stats()
+    # b.story is compiled as a module of a.story and on its own
+    assert stats['source_lines'] == 5
+
+
+def test_api_check():
+    """
+    Ensures Api.check finds semantic errors, and all of them with all_errors
+    """
+    files = {'a.story': "import 'b' as b\nx = y", 'b.story': 'y ='}
+    errors = Api.check(files).errors()
+    assert [e.short_message()[:5] for e in errors] == ['E0101']
+    errors = Api.check(files, all_errors=True).errors()
+    assert [e.short_message()[:5] for e in errors] == ['E0101', 'E0007']
+    errors = Api.check(files, syntax_only=True, all_errors=True).errors()
+    assert [e.short_message()[:5] for e in errors] == ['E0007']
+    assert Api.check({'a.story': 'x = 1'}).result() == ['a.story']
+
+
+def test_api_load_map_all_errors():
+    """
+    Ensures Api.load_map reports the errors of all stories, and of all
+    independent functions and blocks in them
+    """
+    files = {
+        'a.story': "import 'b' as b\n"
+                   'function f returns int\n  return "s"\n'
+                   'if true\n  q = w\n'
+                   'x = y\n'
+                   'z = x',
+        'b.story': 'y =',
+    }
+    errors = Api.load_map(files, all_errors=True).errors()
+    assert [(e.path, e.short_message()[:5]) for e in errors] == [
+        ('b.story', 'E0007'), ('a.story', 'E0102'), ('a.story', 'E0101'),
+        ('a.story', 'E0101'),
+    ]
+    assert len(Api.load_map(files).errors()) == 1
+
+
+def test_api_load_map_cached_warnings():
+    """
+    Ensures the warnings of a story are kept when it comes from the cache
+    """
+    cache = StoryCache()
+    files = {'a.story': 'while true\n  a = 1\n'}
+    features = Features({'globals': True, 'lint': True})
+    for _ in range(2):
+        bundle = Bundle(story_files=files, features=features, cache=cache)
+        bundle.bundle()
+        assert [warning.short_message()[:5]
+                for warning in bundle.warnings] == ['W0003']
+        assert bundle.warnings[0].path == 'a.story'
+    assert cache.hits == 1
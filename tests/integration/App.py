@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from pytest import mark
+
+from storyscript.App import App
+from storyscript.ConstantPool import ConstantPool
+from storyscript.SourceMap import SourceMap
+
+
+@mark.parametrize('concise', [False, True])
+def test_app_stream(tmpdir, concise):
+    """
+    Ensures streaming a bundle writes the same JSON as compiling it
+    """
+    tmpdir.join('a.story').write("import 'lib/b' as b\nx = 1\nalpine echo")
+    tmpdir.mkdir('lib').join('b.story').write(
+        'function f returns int\n  return 1\n')
+    tmpdir.join('c.story').write('y = [1, 2]\nz = y.length()')
+    with tmpdir.as_cwd():
+        expected = App.compile('.', concise=concise)
+        output = io.StringIO()
+        App.stream('.', output, concise=concise)
+    assert output.getvalue() == expected
+
+
+def test_app_stream_empty(tmpdir):
+    with tmpdir.as_cwd():
+        expected = App.compile('.')
+        output = io.StringIO()
+        App.stream('.', output)
+    assert output.getvalue() == expected
+
+
+def test_app_compile_pool(tmpdir):
+    """
+    Ensures pooled bundles resolve to the compiled bundle
+    """
+    source = 'a_long_variable = 1\nb = a_long_variable + a_long_variable\n'
+    tmpdir.join('a.story').write(source)
+    tmpdir.join('b.story').write(source + 'c = a_long_variable * 2\n')
+    with tmpdir.as_cwd():
+        expected = App.compile('.', compact=True)
+        result = App.compile('.', compact=True, pool=True)
+    assert len(result) < len(expected)
+    path = {'$OBJECT': 'path', 'paths': ['a_long_variable']}
+    assert path in json.loads(result)['pool']
+    assert ConstantPool.resolve(json.loads(result)) == json.loads(expected)
+
+
+@mark.parametrize('stream', [False, True])
+def test_app_compile_source_map(tmpdir, stream):
+    """
+    Ensures the source map holds the source dropped from the lines
+    """
+    tmpdir.join('a.story').write('x = [1]\ny = x.length() + 1\nalpine echo')
+    source_map = {}
+    with tmpdir.as_cwd():
+        expected = json.loads(App.compile('.'))
+        if stream:
+            output = io.StringIO()
+            App.stream('.', output, source_map=source_map)
+            result = json.loads(output.getvalue())
+        else:
+            result = json.loads(App.compile('.', source_map=source_map))
+    for ln, line in expected['stories']['a.story']['tree'].items():
+        assert SourceMap.source(source_map, 'a.story', ln) == \
+            expected['stories']['a.story']['tree'][ln.split('.')[0]]['src']
+        del line['src']
+    assert result == expected
+
+
+def test_app_analyze(tmpdir):
+    """
+    Ensures the cost report counts the worst case of every story
+    """
+    tmpdir.join('a.story').write(
+        'function f returns int\n  foreach [1] as i\n    log info\n'
+        '  return 1\nif true\n  alpine echo\n  alpine echo\nelse\n'
+        '  alpine echo\nx = f()\n')
+    tmpdir.join('b.story').write('x = 1\n')
+    with tmpdir.as_cwd():
+        report = App.analyze('.', features={'linear': True})
+    story = report.stories['a.story']
+    assert story['calls'] == 2
+    assert story['looped_calls'] == 1
+    assert story['sites'] == 4
+    assert story['targets'] == ['alpine echo', 'f()']
+    assert story['functions']['f']['calls'] == 0
+    assert story['functions']['f']['looped_calls'] == 1
+    assert story['loops'][0]['target'] == 'log info'
+    assert report.stories['b.story']['calls'] == 0
+    assert report.text().startswith(
+        'a.story: 2 service calls at most outside loops, '
+        '1 per loop iteration')
+
+
+def test_app_lint(tmpdir):
+    """
+    Ensures the performance issues of every story are found
+    """
+    tmpdir.join('a.story').write(
+        'foreach [1, 2] as i\n  x = http fetch url: "u"\nwhile true\n'
+        '  y = 1\n')
+    tmpdir.join('b.story').write('x = 1\n')
+    with tmpdir.as_cwd():
+        warnings = App.lint('.', features={'globals': True})
+    codes = [(warning.path, warning.int_line(), warning.short_message()[:5])
+             for warning in warnings]
+    assert codes == [('a.story', 2, 'W0001'), ('a.story', 3, 'W0003')]
+    warnings[0].with_color = False
+    assert warnings[0].message().startswith(
+        'Warning: performance issue in a.story at line 2')
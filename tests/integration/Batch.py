@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from pytest import mark
+
+from storyscript.Batch import Batch
+
+
+def requests():
+    return [
+        json.dumps({'id': 'a', 'source': 'a = 1 + 2'}),
+        json.dumps({'id': 'b', 'path': 'b.story', 'source': 'b = c'}),
+        json.dumps({'id': 'c', 'source': 'c = 1',
+                    'features': {'unknown': True}}),
+    ]
+
+
+@mark.parametrize('workers', [1, 2])
+def test_batch_run(workers):
+    """
+    Ensures a batch compiles all requests, one result per line
+    """
+    output = io.StringIO()
+    Batch(workers=workers).run(requests(), output)
+    lines = output.getvalue().splitlines()
+    results = {r['id']: r for r in map(json.loads, lines)}
+    assert len(lines) == 3
+    assert results['a']['success'] is True
+    assert results['a']['result']['tree']['1']['name'] == ['a']
+    assert results['a']['errors'] == []
+    assert results['b']['success'] is False
+    assert results['b']['errors'] == [{
+        'code': 'E0101', 'hint': 'Variable `c` has not been defined.',
+        'path': 'b.story', 'line': 1, 'column': 5, 'end_column': 6
+    }]
+    assert results['c']['errors'][0]['code'] == 'E0079'
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import stat
+import threading
+
+from pytest import fixture, raises
+
+from storyscript.Daemon import Daemon, Worker
+from storyscript.DaemonClient import DaemonClient, DaemonError
+
+
+@fixture
+def daemon(tmpdir):
+    daemon = Daemon(path=str(tmpdir.join('daemon.sock')), workers=1)
+    daemon.start()
+    thread = threading.Thread(target=daemon.serve)
+    thread.start()
+    yield daemon
+    daemon.server.shutdown()
+    thread.join()
+    Worker.cache = None
+
+
+def test_daemon_compile(daemon, tmpdir):
+    """
+    Ensures a running daemon compiles stories in the client's directory
+    """
+    tmpdir.join('hello.story').write('a = 1 + 2')
+    with tmpdir.as_cwd():
+        client = DaemonClient(daemon.path)
+        assert client.ping()
+        result = json.loads(client.compile('hello.story'))
+        second = json.loads(client.compile('hello.story'))
+    assert list(result['stories']) == ['hello.story']
+    assert result['stories']['hello.story']['tree']['1']['name'] == ['a']
+    assert second == result
+
+
+def test_daemon_socket_private(daemon):
+    """
+    Ensures only the user can connect to the socket of a daemon
+    """
+    assert stat.S_IMODE(os.stat(daemon.path).st_mode) == 0o600
+
+
+def test_daemon_socket_directory(tmpdir):
+    """
+    Ensures a missing socket directory is created for the user only
+    """
+    directory = tmpdir.join('run')
+    daemon = Daemon(path=str(directory.join('daemon.sock')), workers=1)
+    daemon.bind()
+    daemon.stop()
+    assert stat.S_IMODE(os.stat(str(directory)).st_mode) == 0o700
+
+
+def test_daemon_lex(daemon, tmpdir):
+    tmpdir.join('hello.story').write('a = 1')
+    with tmpdir.as_cwd():
+        result = DaemonClient(daemon.path).lex('hello.story')
+    assert result['hello.story'][0] == ['NAME', 'a']
+
+
+def test_daemon_parse(daemon, tmpdir):
+    tmpdir.join('hello.story').write('a = 1')
+    with tmpdir.as_cwd():
+        result = DaemonClient(daemon.path).parse('hello.story')
+    assert result['hello.story'].startswith('start')
+
+
+def test_daemon_compile_error(daemon, tmpdir):
+    tmpdir.join('hello.story').write('foo =')
+    with tmpdir.as_cwd():
+        with raises(DaemonError) as e:
+            DaemonClient(daemon.path).compile('hello.story')
+    assert 'E0007: Missing value after `=`' in e.value.message
+
+
+def test_daemon_not_running(tmpdir):
+    client = DaemonClient(str(tmpdir.join('daemon.sock')))
+    assert client.ping() is False
+    assert client.compile('hello.story') is None
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import json
+
+from storyscript.App import App
+from storyscript.MemoryProfiler import MemoryProfiler
+from storyscript.Profiler import Profiler
+
+
+def test_profiler_compile(tmpdir):
+    """
+    Ensures profiling a compilation times every phase of every story,
+    without changing the compiled output.
+    """
+    tmpdir.join('a.story').write('a = 1 + 2\nb = "{a}"\nc = a > 2\n')
+    profiler = Profiler()
+    with tmpdir.as_cwd():
+        result = App.compile('a.story', profiler=profiler)
+        assert result == App.compile('a.story')
+    phases = {name for name, seconds, calls in profiler.phases()}
+    expected = {'read', 'parser_init', 'lex', 'parse', 'transform',
+                'lowering', 'lowering.string_templates', 'semantics',
+                'FunctionResolver', 'TypeResolver', 'JSONCompiler',
+                'serialize'}
+    assert expected <= phases
+    assert [story for story, seconds in profiler.stories()] == ['a.story']
+
+
+def test_profiler_trace(tmpdir):
+    """
+    Ensures the trace of a compilation can be serialized and nests the
+    phases of a story in its span.
+    """
+    tmpdir.join('a.story').write('a = 1 + 2\n')
+    profiler = Profiler()
+    with tmpdir.as_cwd():
+        App.compile('a.story', profiler=profiler)
+    events = json.loads(json.dumps(profiler.trace()))['traceEvents']
+    spans = {event['name']: event for event in events if event['ph'] == 'X'}
+    story = spans['a.story']
+    parse = spans['parse']
+    assert story['ts'] <= parse['ts']
+    assert parse['ts'] + parse['dur'] <= story['ts'] + story['dur']
+    assert parse['args'] == {'story': 'a.story'}
+
+
+def test_memory_profiler_compile(tmpdir):
+    """
+    Ensures memory profiling a compilation reports every story and the
+    sites which allocated what the compiled story keeps alive.
+    """
+    tmpdir.join('a.story').write('a = 1 + 2\nb = "{a}"\n')
+    profiler = MemoryProfiler()
+    profiler.start()
+    try:
+        with tmpdir.as_cwd():
+            App.compile('a.story', profiler=profiler)
+    finally:
+        profiler.stop()
+    phases = {phase[0] for phase in profiler.memory_phases()}
+    assert {'parse', 'lowering', 'JSONCompiler', 'serialize'} <= phases
+    stories = profiler.memory_stories()
+    assert [story[0] for story in stories] == ['a.story']
+    assert profiler.peak > 0
+    assert 'Story a.story' in profiler.memory_report()
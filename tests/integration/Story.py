@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from io import StringIO
 
+from storyscript.Features import Features
 from storyscript.Story import Story
 
 
@@ -8,3 +9,14 @@ def test_story_from_stream():
     stream = StringIO('x = 0')
     story = Story.from_stream(stream, features=None)
     assert story.story == 'x = 0'
+
+
+def test_story_imports():
+    """
+    Ensures import paths keep their text, so that imported stories are found
+    """
+    story = Story('import "foo" as bar\n', features=Features(None))
+    story.parse(parser=story._parser())
+    assert story.modules() == ['foo.story']
+    story.compile()
+    assert story.compiled['modules'] == {'bar': 'foo'}
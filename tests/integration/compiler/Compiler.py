@@ -27,6 +27,138 @@ def test_compiler_empty_files():
     assert result['entrypoint'] is None
 
 
+def test_compiler_linear():
+    """
+    Ensures the linear layout refers to instructions by their index
+    """
+    source = ('if true\n  alpine echo\nelse\n  alpine echo\n'
+              'foreach [1] as x\n  y = x\nb = 3\n')
+    tree = Api.loads(source).result()['tree']
+    result = Api.loads(source, features={'linear': True}).result()
+    instructions = result['tree']
+    assert [i['ln'] for i in instructions] == list(tree)
+    assert result['lines'] == {ln: i for i, ln in enumerate(tree)}
+    assert result['entrypoint'] == 0
+    for instruction in instructions:
+        line = tree[instruction['ln']]
+        for key in ('next', 'enter', 'exit', 'parent'):
+            if line.get(key) is None:
+                assert instruction.get(key) is None
+            else:
+                assert instructions[instruction[key]]['ln'] == line[key]
+
+
+def test_compiler_fold_constants():
+    """
+    Ensures constants are folded and propagated to the lines reading them
+    """
+    source = ('a = 1 + 2 * 3\nb = "x{a}y"\nc = a / 2\n'
+              'alpine echo msg:b\nd = a\nd = d + 1\ne = d + 1\n')
+    result = Api.loads(source, features={'globals': True,
+                                         'fold_constants': True},
+                       stats=True)
+    tree = result.result()['tree']
+    assert tree['1']['args'] == [{'$OBJECT': 'int', 'int': 7}]
+    assert tree['2']['args'] == [{'$OBJECT': 'string', 'string': 'x7y'}]
+    assert tree['3']['args'][0]['expression'] == 'division'
+    assert tree['4']['args'][0]['arg'] == {'$OBJECT': 'string',
+                                           'string': 'x7y'}
+    assert tree['7']['args'][0]['values'][0] == path('d')
+    assert result.stats()['folded_constants'] > 0
+
+
+def test_compiler_inline_temporaries():
+    """
+    Ensures pure temporaries are inlined, while service calls are kept
+    """
+    source = ('a = [1, 2]\nb = "x{a.length()}"\nc = (alpine echo) + "y"\n'
+              'while a.length() > 1\n  a = a.append(item: 1)\n')
+    tree = Api.loads(source, features={'globals': True}).result()['tree']
+    result = Api.loads(source, features={'globals': True,
+                                         'inline_temporaries': True},
+                       stats=True)
+    inlined = result.result()['tree']
+    assert list(tree) == ['1', '2.2', '2.1', '2', '3.1', '3', '4.1', '4',
+                          '5.1', '5']
+    assert list(inlined) == ['1', '2.1', '2', '3.1', '3', '4.1', '4', '5']
+    assert inlined['2.1']['method'] == 'mutation'
+    assert inlined['3.1']['method'] == 'execute'
+    assert inlined['4']['enter'] == '5'
+    assert inlined['5']['method'] == 'mutation'
+    assert inlined['5']['name'] == ['a']
+    assert result.stats()['inlined_temporaries'] == 2
+
+
+def test_compiler_release_hints():
+    """
+    Ensures variables are released after their last use, and kept alive
+    through loops using them
+    """
+    source = ('a = alpine echo\nb = a.length()\nn = 0\n'
+              'while n < 3\n  n = n + b\nalpine echo msg:"{n}"\n')
+    result = Api.loads(source, features={'globals': True,
+                                         'release_hints': True},
+                       stats=True)
+    tree = result.result()['tree']
+    assert tree['2.1']['release'] == ['a']
+    assert 'release' not in tree['5']
+    assert tree['6']['release'] == ['n']
+    assert result.stats()['released_variables'] > 0
+
+
+def test_compiler_release_hints_index():
+    """
+    Ensures variables used as the index of an assigned item are kept alive
+    until that assignment
+    """
+    source = 'k = 1\nj = k\nm = {}\nm[j] = 3\nlog info msg: "{m}"\n'
+    result = Api.loads(source, features={'globals': True,
+                                         'release_hints': True})
+    tree = result.result()['tree']
+    assert tree['2']['release'] == ['k']
+    assert tree['4']['release'] == ['j']
+
+
+def test_compiler_release_hints_catch():
+    """
+    Ensures variables read in a finally block are kept alive through the
+    catch block, which may throw before reaching its end
+    """
+    source = ('x = 1\ntry\n  a = http fetch url: "u"\ncatch as e\n'
+              '  log info msg: "{x}"\n  b = http fetch url: "v"\n  x = 2\n'
+              'finally\n  log info msg: "{x}"\n')
+    result = Api.loads(source, features={'globals': True,
+                                         'release_hints': True})
+    tree = result.result()['tree']
+    assert 'release' not in tree['5']
+    assert tree['9']['release'] == ['x']
+
+
+def test_compiler_parallel_groups():
+    """
+    Ensures consecutive independent service calls are grouped
+    """
+    source = ('a = http fetch url:"x"\nb = http fetch url:"y"\n'
+              'log info msg:"hi"\nc = http fetch url:"{a}"\n')
+    features = {'parallel_groups': True, 'linear': True}
+    result = Api.loads(source, features=features).result()
+    tree = result['tree']
+    assert tree[0]['parallel'] == [0, 1, 2]
+    assert 'parallel' not in tree[3]
+
+
+def test_compiler_parallel_groups_index():
+    """
+    Ensures a call assigning an item isn't grouped with the call giving its
+    index
+    """
+    source = ('m = {}\nk = http fetch url: "a"\n'
+              'm[k] = http fetch url: "b"\n')
+    features = {'globals': True, 'parallel_groups': True}
+    result = Api.loads(source, features=features).result()
+    assert 'parallel' not in result['tree']['2']
+
+
 def path(name):
     """
     Generate a path object
@@ -6,6 +6,8 @@ from pytest import raises
 from storyscript.Api import Api
 from storyscript.Bundle import Bundle
 from storyscript.Features import Features
+from storyscript.Profiler import NullProfiler, Profiler
+from storyscript.Serializer import Serializer
 from storyscript.Story import Story
 from storyscript.exceptions import StoryError
 
@@ -17,13 +19,26 @@ def test_api_loads(patch):
     patch.init(Story)
     patch.init(Features)
     patch.object(Story, 'process')
+    patch.object(Story, 'warnings', [], create=True)
     result = Api.loads('string').result()
-    Story.__init__.assert_called_with('string', ANY)
+    Story.__init__.assert_called_with('string', ANY, path=None,
+                                      profiler=ANY)
     assert isinstance(Story.__init__.call_args[0][1], Features)
     Story.process.assert_called_with()
     assert result == Story.process()
 
 
+def test_api_loads_path(patch):
+    """
+    Ensures Api.loads passes the story path
+    """
+    patch.init(Story)
+    patch.object(Story, 'process')
+    Api.loads('string', path='hello.story')
+    Story.__init__.assert_called_with('string', ANY, path='hello.story',
+                                      profiler=ANY)
+
+
 def test_api_load(patch, magic):
     """
     Ensures Api.load can compile stories from a file stream
@@ -32,7 +47,7 @@ def test_api_load(patch, magic):
     patch.object(Story, 'from_stream')
     stream = magic()
     result = Api.load(stream).result()
-    Story.from_stream.assert_called_with(stream, ANY)
+    Story.from_stream.assert_called_with(stream, ANY, profiler=ANY)
     assert isinstance(Story.from_stream.call_args[0][1], Features)
     Story.from_stream().process.assert_called()
     story = Story.from_stream().process()
@@ -46,14 +61,79 @@ def test_api_load_map(patch, magic):
     patch.init(Bundle)
     patch.init(Features)
     patch.object(Bundle, 'bundle')
+    patch.object(Bundle, 'errors', None, create=True)
+    patch.object(Bundle, 'warnings', [], create=True)
     files = {'a.story': "import 'b' as b", 'b.story': 'x = 0'}
     result = Api.load_map(files).result()
-    Bundle.__init__.assert_called_with(story_files=files, features=ANY)
+    Bundle.__init__.assert_called_with(story_files=files, features=ANY,
+                                       profiler=ANY)
     assert isinstance(Bundle.__init__.call_args[1]['features'], Features)
     Bundle.bundle.assert_called()
     assert result == Bundle.bundle()
 
 
+def test_api_loads_stats(patch):
+    """
+    Ensures Api.loads collects the statistics of the compilation
+    """
+    patch.init(Story)
+    patch.object(Story, 'process')
+    patch.object(Profiler, 'stats')
+    result = Api.loads('string', stats=True)
+    assert isinstance(Story.__init__.call_args[1]['profiler'], Profiler)
+    assert result.stats() == Profiler.stats()
+
+
+def test_api_loads_no_stats(patch):
+    """
+    Ensures Api.loads only profiles the compilation when asked to
+    """
+    patch.init(Story)
+    patch.object(Story, 'process')
+    result = Api.loads('string')
+    profiler = Story.__init__.call_args[1]['profiler']
+    assert isinstance(profiler, NullProfiler)
+    assert result.stats() is None
+
+
+def test_api_loads_encoded(patch):
+    """
+    Ensures the result of Api.loads can be encoded to JSON bytes
+    """
+    patch.init(Story)
+    patch.object(Story, 'process')
+    patch.object(Story, 'warnings', [], create=True)
+    patch.init(Serializer)
+    patch.object(Serializer, 'dumpb')
+    encoded = Api.loads('string').encoded(compact=True)
+    Serializer.__init__.assert_called_with(compact=True)
+    Serializer.dumpb.assert_called_with(Story.process())
+    assert encoded == Serializer.dumpb()
+
+
+def test_api_loads_stats_error(patch):
+    """
+    Ensures statistics are available when the compilation fails
+    """
+    patch.init(Story)
+    patch.object(Story, 'process', side_effect=StoryError(None, None))
+    patch.object(Profiler, 'stats')
+    assert Api.loads('string', stats=True).stats() == Profiler.stats()
+
+
+def test_api_load_map_all_errors(patch):
+    """
+    Ensures Api.load_map reports all errors collected by the bundle
+    """
+    patch.init(Bundle)
+    patch.object(Bundle, 'bundle')
+    patch.object(Bundle, 'errors', ['e1', 'e2'], create=True)
+    result = Api.load_map({}, all_errors=True)
+    Bundle.bundle.assert_called_with(all_errors=True)
+    assert result.errors() == ['e1', 'e2']
+    assert result.success() is False
+
+
 def test_api_loads_internal_error(patch):
     """
     Ensures Api.loads handles unknown errors
@@ -158,3 +238,37 @@ def test_api_load_map_internal_error_debug(patch):
         Api.load_map({}, features={'debug': True}).check_success()
 
     assert str(e.value) == 'An unknown error.'
+
+
+def test_api_check(patch):
+    """
+    Ensures Api.check checks stories without compiling them
+    """
+    patch.init(Bundle)
+    patch.object(Bundle, 'check', return_value=(['a.story'], []))
+    patch.object(Bundle, 'bundle')
+    patch.object(Bundle, 'warnings', [], create=True)
+    result = Api.check({'a.story': 'x = 0'}, syntax_only=True)
+    Bundle.__init__.assert_called_with(story_files={'a.story': 'x = 0'},
+                                       features=ANY, profiler=ANY)
+    Bundle.check.assert_called_with(syntax_only=True, all_errors=False)
+    Bundle.bundle.assert_not_called()
+    assert result.success()
+    assert result.result() == ['a.story']
+
+
+def test_api_check_errors(patch):
+    patch.init(Bundle)
+    patch.object(Bundle, 'check', return_value=([], ['e1', 'e2']))
+    result = Api.check({}, all_errors=True)
+    Bundle.check.assert_called_with(syntax_only=False, all_errors=True)
+    assert result.success() is False
+    assert result.errors() == ['e1', 'e2']
+
+
+def test_api_check_internal_error(patch):
+    patch.init(Bundle)
+    patch.object(Bundle, 'check', side_effect=Exception('error'))
+    patch.object(StoryError, 'internal_error',
+                 return_value=Exception('ICE'))
+    assert str(Api.check({}).errors()[0]) == 'ICE'
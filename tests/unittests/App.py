@@ -1,18 +1,26 @@
 # -*- coding: utf-8 -*-
 import json
+from unittest.mock import ANY
 
 from pytest import fixture, raises
 
 import storyscript.App as AppModule
 from storyscript.App import App
 from storyscript.Bundle import Bundle
+from storyscript.ConstantPool import ConstantPool
+from storyscript.CostReport import CostReport
+from storyscript.JSONStream import JSONStream
+from storyscript.Serializer import Serializer
+from storyscript.SourceMap import SourceMap
+from storyscript.compiler.binary import BinaryEncoder
 from storyscript.exceptions import StoryError
 from storyscript.parser import Grammar
 
 
 @fixture
 def bundle(patch):
-    patch.many(Bundle, ['from_path', 'bundle_trees', 'bundle', 'lex'])
+    patch.many(Bundle, ['from_path', 'bundle_trees', 'bundle', 'lex',
+                        'check', 'stream'])
 
 
 def test_app_parse(bundle):
@@ -56,40 +64,197 @@ def test_app_parse_lower(patch, bundle, magic):
     assert result == Bundle.from_path().bundle_trees(story)
 
 
+def test_app_stream(patch, bundle):
+    patch.init(JSONStream)
+    patch.many(JSONStream, ['story', 'end'])
+    Bundle.from_path().stream.return_value = 'metadata'
+    App.stream('path', 'output')
+    Bundle.from_path.assert_called_with('path', ignored_path=None,
+                                        features=None, profiler=None,
+                                        lazy=True)
+    assert JSONStream.__init__.call_args[0] == ('output',)
+    assert JSONStream.__init__.call_args[1]['clean'] is None
+    sink = Bundle.from_path().stream.call_args[0][0]
+    assert Bundle.from_path().stream.call_args[1] == {'ebnf': None}
+    sink('a.story', 'story')
+    JSONStream.story.assert_called_with('a.story', 'story')
+    JSONStream.end.assert_called_with('metadata')
+
+
+def test_app_stream_source_map(patch, bundle):
+    patch.init(JSONStream)
+    patch.many(JSONStream, ['story', 'end'])
+    patch.object(SourceMap, 'strip_story')
+    patch.object(SourceMap, 'output', return_value={'version': 1})
+    source_map = {}
+    App.stream('path', 'output', source_map=source_map)
+    sink = Bundle.from_path().stream.call_args[0][0]
+    sink('a.story', 'story')
+    SourceMap.strip_story.assert_called_with('a.story', 'story')
+    JSONStream.story.assert_called_with('a.story', SourceMap.strip_story())
+    assert source_map == {'version': 1}
+
+
+def test_app_stream_concise(patch, bundle):
+    patch.init(JSONStream)
+    patch.many(JSONStream, ['story', 'end'])
+    App.stream('path', 'output', concise=True)
+    clean = JSONStream.__init__.call_args[1]['clean']
+    assert clean == AppModule._clean_dict
+
+
+def test_app_stream_compact(patch, bundle):
+    patch.init(Serializer)
+    patch.init(JSONStream)
+    patch.many(JSONStream, ['story', 'end'])
+    App.stream('path', 'output', compact=True)
+    Serializer.__init__.assert_called_with(compact=True)
+    serializer = JSONStream.__init__.call_args[1]['serializer']
+    assert isinstance(serializer, Serializer)
+
+
+def test_app_check(bundle):
+    Bundle.from_path().check.return_value = (['a.story'], ['error'])
+    result = App.check('path', syntax_only=True)
+    Bundle.from_path.assert_called_with('path', ignored_path=None,
+                                        features=None, profiler=None)
+    Bundle.from_path().check.assert_called_with(ebnf=None, syntax_only=True,
+                                                all_errors=False)
+    assert result == ['error']
+
+
+def test_app_analyze(patch, bundle):
+    patch.object(CostReport, 'analyze')
+    result = App.analyze('path', features={'globals': True, 'linear': True})
+    Bundle.from_path.assert_called_with(
+        'path', ignored_path=None, features={'globals': True, 'linear': False},
+        profiler=None)
+    Bundle.from_path().bundle.assert_called_with(ebnf=None)
+    CostReport.analyze.assert_called_with(Bundle.from_path().bundle())
+    assert isinstance(result, CostReport)
+
+
+def test_app_lint(patch, bundle):
+    Bundle.from_path().check.return_value = (['a.story'], [])
+    result = App.lint('path', features={'globals': True})
+    Bundle.from_path.assert_called_with(
+        'path', ignored_path=None, features={'globals': True, 'lint': True},
+        profiler=None)
+    Bundle.from_path().check.assert_called_with(ebnf=None)
+    assert result == Bundle.from_path().warnings
+
+
+def test_app_lint_error(patch, bundle):
+    error = StoryError(None, None)
+    Bundle.from_path().check.return_value = (['a.story'], [error])
+    with raises(StoryError):
+        App.lint('path')
+
+
+def bundled():
+    return {'stories': {'a.story': {'tree': {'1': {'method': 'execute'}},
+                                    'services': []}},
+            'services': [], 'entrypoint': ['a.story']}
+
+
 def test_app_compile(patch, bundle):
-    patch.object(json, 'dumps')
+    Bundle.from_path().bundle.return_value = bundled()
     result = App.compile('path')
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None,
+                                        profiler=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
-    json.dumps.assert_called_with(Bundle.from_path().bundle(), indent=2)
-    assert result == json.dumps()
+    assert result == json.dumps(bundled(), indent=2)
 
 
 def test_app_compile_concise(patch, bundle):
-    patch.object(json, 'dumps')
-    patch.object(AppModule, '_clean_dict')
+    Bundle.from_path().bundle.return_value = bundled()
     result = App.compile('path', concise=True)
-    Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
-    Bundle.from_path().bundle.assert_called_with(ebnf=None)
-    AppModule._clean_dict.assert_called_with(Bundle.from_path().bundle())
-    json.dumps.assert_called_with(AppModule._clean_dict(), indent=2)
-    assert result == json.dumps()
+    assert result == json.dumps(AppModule._clean_dict(bundled()), indent=2)
+
+
+def test_app_compile_compact(patch, bundle):
+    Bundle.from_path().bundle.return_value = bundled()
+    result = App.compile('path', compact=True)
+    assert result == json.dumps(bundled(), separators=(',', ':'))
+
+
+def test_app_compile_binary(patch, bundle):
+    patch.object(BinaryEncoder, 'encode')
+    Bundle.from_path().bundle.return_value = bundled()
+    result = App.compile('path', binary=True)
+    BinaryEncoder.encode.assert_called_with(bundled())
+    assert result == BinaryEncoder.encode()
+
+
+def test_app_compile_binary_first(patch, bundle):
+    patch.object(BinaryEncoder, 'encode')
+    Bundle.from_path().bundle.return_value = bundled()
+    App.compile('path', binary=True, first=True, concise=True)
+    story = AppModule._clean_dict(bundled()['stories']['a.story'])
+    BinaryEncoder.encode.assert_called_with(story)
+
+
+def test_app_compile_pool(patch, bundle):
+    patch.object(ConstantPool, 'apply', return_value={'pool': []})
+    Bundle.from_path().bundle.return_value = bundled()
+    result = App.compile('path', pool=True, concise=True)
+    ConstantPool.apply.assert_called_with(AppModule._clean_dict(bundled()))
+    assert result == json.dumps({'pool': []}, indent=2)
+
+
+def test_app_compile_source_map(patch, bundle):
+    compiled = bundled()
+    compiled['stories']['a.story']['tree']['1']['src'] = 'alpine echo'
+    Bundle.from_path().bundle.return_value = compiled
+    source_map = {}
+    result = App.compile('path', source_map=source_map)
+    assert result == json.dumps(bundled(), indent=2)
+    assert source_map == {'version': 1,
+                          'stories': {'a.story': {'1': 'alpine echo'}}}
+
+
+def test_app_compile_serializer(patch, bundle):
+    """
+    Ensures App.compile writes the stories with the serializer
+    """
+    patch.init(Serializer)
+    patch.init(JSONStream)
+    patch.many(JSONStream, ['story', 'end'])
+    Bundle.from_path().bundle.return_value = bundled()
+    App.compile('path', concise=True, compact=True)
+    Serializer.__init__.assert_called_with(compact=True)
+    assert JSONStream.__init__.call_args[1] == {
+        'clean': AppModule._clean_dict, 'serializer': ANY}
+    JSONStream.story.assert_called_with('a.story',
+                                        bundled()['stories']['a.story'])
+    JSONStream.end.assert_called_with({'services': [],
+                                       'entrypoint': ['a.story']})
 
 
 def test_app_compile_ignored_path(patch, bundle):
-    patch.object(json, 'dumps')
+    Bundle.from_path().bundle.return_value = bundled()
     App.compile('path', ignored_path='ignored')
     Bundle.from_path.assert_called_with('path', ignored_path='ignored',
-                                        features=None)
+                                        features=None, cache=None,
+                                        profiler=None)
+
+
+def test_app_compile_profiler(patch, bundle):
+    """
+    Ensures App.compile times the serialization with the bundle profiler
+    """
+    Bundle.from_path().bundle.return_value = bundled()
+    App.compile('path', profiler='profiler')
+    assert Bundle.from_path.call_args[1]['profiler'] == 'profiler'
+    Bundle.from_path().profiler.span.assert_called_with('serialize')
 
 
 def test_app_compile_ebnf(patch, bundle):
     """
     Ensures App.compile supports specifying an ebnf file
     """
-    patch.object(json, 'dumps')
+    Bundle.from_path().bundle.return_value = bundled()
     App.compile('path', ebnf='ebnf')
     Bundle.from_path().bundle.assert_called_with(ebnf='ebnf')
 
@@ -99,13 +264,14 @@ def test_app_compile_first(patch, bundle):
     Ensures that the App only returns the first story
     """
     Bundle.from_path().bundle.return_value = {'stories': {'my_story': 42}}
-    patch.object(json, 'dumps')
+    patch.object(Serializer, 'dumps')
     result = App.compile('path', first=True)
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None,
+                                        profiler=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
-    json.dumps.assert_called_with(42, indent=2)
-    assert result == json.dumps()
+    Serializer.dumps.assert_called_with(42)
+    assert result == Serializer.dumps()
 
 
 def test_app_compile_first_error(patch, bundle):
@@ -115,14 +281,14 @@ def test_app_compile_first_error(patch, bundle):
     Bundle.from_path().bundle.return_value = {'stories': {
         'my_story': 42, 'another_story': 43,
     }}
-    patch.object(json, 'dumps')
     with raises(StoryError) as e:
         App.compile('path', first=True)
     assert e.value.message() == \
         'E0055: The option `--first`/-`f` can only be used ' \
         'if one story is complied.'
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None,
+                                        profiler=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
 
 
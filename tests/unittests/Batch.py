@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from storyscript.Api import Api
+from storyscript.Batch import Batch
+from storyscript.Story import Story
+from storyscript.exceptions import StoryError
+
+
+def test_batch_init():
+    assert Batch().workers == 1
+    assert Batch(workers=4).workers == 4
+
+
+def test_batch_result(magic):
+    error = magic()
+    compilation = magic()
+    compilation.errors.return_value = [error]
+    result = Batch.result('1', compilation)
+    assert result == {'id': '1', 'success': compilation.success(),
+                      'result': compilation.result(),
+                      'errors': [error.to_dict()]}
+
+
+def test_batch_compile(patch):
+    patch.object(Api, 'loads')
+    patch.object(Batch, 'result')
+    request = {'id': 1, 'path': 'a.story', 'source': 'a = 1',
+               'features': {'globals': True}}
+    result = Batch.compile(json.dumps(request))
+    Api.loads.assert_called_with('a = 1', features={'globals': True},
+                                 path='a.story')
+    Batch.result.assert_called_with(1, Api.loads())
+    assert result == Batch.result()
+
+
+def test_batch_compile_path(patch):
+    patch.object(Api, 'loads')
+    patch.object(Story, 'read')
+    Batch.compile(json.dumps({'id': 1, 'path': 'a.story'}))
+    Story.read.assert_called_with('a.story')
+    Api.loads.assert_called_with(Story.read(), features=None,
+                                 path='a.story')
+
+
+def test_batch_compile_path_not_found(patch):
+    patch.object(Story, 'read')
+    Story.read.side_effect = StoryError.create_error(
+        'file_not_found', path='a.story', abspath='/a.story')
+    result = Batch.compile(json.dumps({'id': 1, 'path': 'a.story'}))
+    assert result['success'] is False
+    assert result['errors'][0]['code'] == 'E0047'
+
+
+def test_batch_compile_invalid_json():
+    result = Batch.compile('{')
+    assert result['id'] is None
+    assert result['success'] is False
+    assert result['errors'][0]['code'] == 'E0079'
+
+
+def test_batch_compile_no_source():
+    result = Batch.compile(json.dumps({'id': 1}))
+    assert result['id'] == 1
+    assert result['errors'][0]['code'] == 'E0079'
+
+
+def test_batch_compile_invalid_features(patch):
+    patch.object(Api, 'loads')
+    line = json.dumps({'id': 1, 'source': 'a = 1', 'features': ['globals']})
+    result = Batch.compile(line)
+    assert result['id'] == 1
+    assert result['errors'][0]['code'] == 'E0079'
+    assert '`features` must be an object' in result['errors'][0]['hint']
+    Api.loads.assert_not_called()
+
+
+def test_batch_compile_unknown_features(patch):
+    patch.object(Api, 'loads')
+    line = json.dumps({'id': 1, 'source': 'a = 1',
+                       'features': {'globals': True, 'foo': True}})
+    result = Batch.compile(line)
+    assert result['errors'][0]['code'] == 'E0079'
+    assert '`foo` is not a feature' in result['errors'][0]['hint']
+    Api.loads.assert_not_called()
+
+
+def test_batch_invalid_features():
+    assert Batch.invalid_features(None) is None
+    assert Batch.invalid_features({'globals': True, 'deadline': 1}) is None
+
+
+def test_batch_compile_path_directory(tmpdir):
+    result = Batch.compile(json.dumps({'id': 1, 'path': str(tmpdir)}))
+    assert result['id'] == 1
+    assert result['errors'][0]['code'] == 'E0079'
+
+
+def test_batch_compile_path_not_utf8(tmpdir):
+    story = tmpdir.join('a.story')
+    story.write_binary(b'a = "\xff"')
+    result = Batch.compile(json.dumps({'id': 1, 'path': str(story)}))
+    assert result['errors'][0]['code'] == 'E0079'
+
+
+def test_batch_run(patch):
+    patch.object(Batch, 'compile', return_value={'id': 1})
+    output = io.StringIO()
+    Batch().run(['{"id": 1}\n', '\n'], output)
+    Batch.compile.assert_called_once_with('{"id": 1}\n')
+    assert output.getvalue() == '{"id": 1}\n'
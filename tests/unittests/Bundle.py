@@ -3,11 +3,13 @@ import os
 import subprocess
 from unittest.mock import ANY
 
-from pytest import fixture
+from pytest import fixture, raises
 
 from storyscript.Bundle import Bundle
 from storyscript.Features import Features
+from storyscript.Limits import Limits
 from storyscript.Story import Story
+from storyscript.exceptions import StoryError
 from storyscript.parser import Parser
 
 
@@ -19,6 +21,9 @@ def bundle(patch):
 def test_bundle_init(bundle):
     assert bundle.stories == {}
     assert bundle.story_files == {}
+    assert bundle.cache is None
+    assert bundle.profiler.enabled is False
+    assert bundle.warnings == []
 
 
 def test_bundle_init_files():
@@ -123,6 +128,26 @@ def test_bundle_from_path(patch):
     assert isinstance(result, Bundle)
 
 
+def test_bundle_from_path_lazy(patch):
+    """
+    Ensures Bundle.from_path can defer reading stories
+    """
+    patch.object(os.path, 'isdir', return_value=False)
+    patch.many(Bundle, ['load_story', 'defer_story'])
+    Bundle.from_path('path', lazy=True)
+    Bundle.defer_story.assert_called_with('path')
+    Bundle.load_story.assert_not_called()
+
+
+def test_bundle_defer_story(patch, bundle):
+    patch.object(Story, 'read', return_value='x = 1')
+    bundle.defer_story('one.story')
+    assert bundle.story_files == {'one.story': None}
+    bundle.load_story('one.story')
+    Story.read.assert_called_with('one.story')
+    assert bundle.story_files == {'one.story': 'x = 1'}
+
+
 def test_bundle_from_path_directory(patch):
     """
     Ensures Bundle.from_path can create a Bundle from a directory path
@@ -147,6 +172,18 @@ def test_bundle_from_path_directory_ignored(patch):
     Bundle.parse_directory.assert_called_with('path', ignored_path='ignored')
 
 
+def test_bundle_from_path_cache(patch):
+    """
+    Ensures Bundle.from_path passes the cache to the bundle
+    """
+    patch.object(os.path, 'isdir', return_value=False)
+    patch.init(Bundle)
+    patch.object(Bundle, 'load_story')
+    Bundle.from_path('path', cache='cache')
+    Bundle.__init__.assert_called_with(features=None, cache='cache',
+                                       profiler=None)
+
+
 def test_bundle_load_story(patch, bundle):
     """
     Ensures Bundle.load_story can load a story
@@ -155,8 +192,13 @@ def test_bundle_load_story(patch, bundle):
     patch.init(Features)
     bundle.story_files['one.story'] = 'hello'
     result = bundle.load_story('one.story')
-    Story.__init__.assert_called_with('hello', features=ANY)
+    Story.__init__.assert_called_with('hello', features=ANY,
+                                      profiler=bundle.profiler, limits=ANY)
     assert isinstance(Story.__init__.call_args[1]['features'], Features)
+    limits = Story.__init__.call_args[1]['limits']
+    assert isinstance(limits, Limits)
+    bundle.load_story('one.story')
+    assert Story.__init__.call_args[1]['limits'] is not limits
     assert isinstance(result, Story)
 
 
@@ -216,6 +258,138 @@ def test_bundle_compile(mocker, patch, bundle):
     assert bundle.stories['one.story'] == story.compiled
 
 
+def test_bundle_compile_profiler(patch, magic, bundle):
+    """
+    Ensures Bundle.compile opens a span for every story
+    """
+    patch.object(Bundle, 'compile_story')
+    bundle.profiler = magic()
+    bundle.compile(['one.story'], parser=None)
+    bundle.profiler.span.assert_called_with('story', story='one.story')
+    Bundle.compile_story.assert_called_with('one.story', None)
+
+
+def test_bundle_compile_cache_miss(patch, magic, bundle):
+    compile = bundle.compile
+    patch.many(Bundle, ['compile', 'load_story'])
+    bundle.cache = magic()
+    bundle.cache.get.return_value = None
+    compile(['one.story'], parser=None)
+    story = Bundle.load_story()
+    bundle.cache.get.assert_called_with(story)
+    story.parse.assert_called_with(parser=None)
+    bundle.cache.put.assert_called_with(story, story.modules(),
+                                        story.compiled,
+                                        warnings=story.warnings)
+    assert bundle.stories['one.story'] == story.compiled
+
+
+def test_bundle_compile_cache_counts(patch, magic, bundle):
+    compile = bundle.compile
+    patch.many(Bundle, ['compile', 'load_story'])
+    bundle.cache = magic()
+    bundle.profiler = magic()
+    bundle.cache.get.return_value = None
+    compile(['one.story'], parser=None)
+    bundle.profiler.count.assert_called_with('cache_misses')
+    bundle.cache.get.return_value = (['two.story'], 'compiled', [])
+    compile(['one.story'], parser=None)
+    bundle.profiler.count.assert_called_with('cache_hits')
+
+
+def test_bundle_compile_cache_hit(patch, magic, bundle):
+    compile = bundle.compile
+    patch.many(Bundle, ['compile', 'load_story'])
+    bundle.cache = magic()
+    bundle.cache.get.return_value = (['two.story'], 'compiled', [])
+    compile(['one.story'], parser=None)
+    story = Bundle.load_story()
+    story.parse.assert_not_called()
+    story.compile.assert_not_called()
+    Bundle.compile.assert_called_with(['two.story'], parser=None)
+    assert bundle.stories['one.story'] == 'compiled'
+
+
+def test_bundle_compile_cache_hit_warnings(patch, magic, bundle):
+    compile = bundle.compile
+    patch.many(Bundle, ['compile', 'load_story'])
+    warning = magic()
+    bundle.cache = magic()
+    bundle.cache.get.return_value = (['two.story'], 'compiled', [warning])
+    story = Bundle.load_story()
+    story.error.return_value = StoryError(warning.error, story)
+    compile(['one.story'], parser=None)
+    story.error.assert_called_with(warning.error)
+    assert bundle.warnings == [story.error()]
+    assert bundle.warnings[0].path == 'one.story'
+
+
+def test_bundle_compile_errors(patch, bundle):
+    """
+    Ensures Bundle.compile collects the errors of failing stories, naming
+    their story, and skips them afterwards
+    """
+    error = StoryError(None, None)
+    patch.object(Bundle, 'compile_story', side_effect=error)
+    bundle.errors = []
+    bundle.compile(['one.story', 'one.story'], parser=None)
+    assert bundle.errors == [error]
+    assert error.path == 'one.story'
+    assert bundle.failed == {'one.story'}
+    assert Bundle.compile_story.call_count == 1
+
+
+def test_bundle_compile_error(patch, bundle):
+    patch.object(Bundle, 'compile_story',
+                 side_effect=StoryError(None, None))
+    with raises(StoryError):
+        bundle.compile(['one.story'], parser=None)
+
+
+def test_bundle_bundle_all_errors(patch, bundle):
+    patch.many(Bundle, ['find_stories', 'services', 'compile', 'parser'])
+    bundle.bundle(all_errors=True)
+    assert bundle.errors == []
+
+
+def test_bundle_store(bundle):
+    bundle.store('one.story', 'compiled')
+    assert bundle.stories == {'one.story': 'compiled'}
+
+
+def test_bundle_store_sink(magic, bundle):
+    """
+    Ensures a streamed story is passed to the sink and released
+    """
+    bundle.sink = magic()
+    bundle.story_files['one.story'] = 'source'
+    bundle.store('one.story', {'services': ['alpine']})
+    bundle.sink.assert_called_with('one.story', {'services': ['alpine']})
+    assert bundle.stories == {}
+    assert bundle.story_files['one.story'] is None
+    assert bundle.streamed == {'one.story'}
+    assert bundle.streamed_services == {'alpine'}
+
+
+def test_bundle_compile_streamed(patch, bundle):
+    patch.object(Bundle, 'compile_story')
+    bundle.streamed.add('one.story')
+    bundle.compile(['one.story'], parser=None)
+    Bundle.compile_story.assert_not_called()
+
+
+def test_bundle_stream(patch, bundle):
+    patch.many(Bundle, ['find_stories', 'compile', 'parser'])
+    bundle.streamed_services.update(['b', 'a'])
+    result = bundle.stream('sink', ebnf='ebnf')
+    Bundle.parser.assert_called_with('ebnf')
+    Bundle.compile.assert_called_with(Bundle.find_stories(),
+                                      parser=Bundle.parser())
+    assert bundle.sink == 'sink'
+    assert result == {'services': ['a', 'b'],
+                      'entrypoint': Bundle.find_stories()}
+
+
 def test_bundle_bundle(patch, bundle):
     patch.many(Bundle, ['find_stories', 'services', 'compile', 'parser'])
     result = bundle.bundle()
@@ -235,6 +409,54 @@ def test_bundle_bundle_ebnf(patch, bundle):
                                       parser=Bundle.parser())
 
 
+def test_bundle_check(patch, bundle):
+    patch.many(Bundle, ['find_stories', 'parser', 'load_story'])
+    Bundle.find_stories.return_value = ['one.story']
+    Bundle.load_story().modules.side_effect = [['two.story', 'one.story'],
+                                               []]
+    result = bundle.check()
+    Bundle.parser.assert_called_with(None)
+    Bundle.load_story().check.assert_called_with(parser=Bundle.parser(),
+                                                 syntax_only=False,
+                                                 errors=None)
+    assert Bundle.load_story().check.call_count == 2
+    assert result == (['one.story', 'two.story'], [])
+
+
+def test_bundle_check_error(patch, bundle):
+    patch.many(Bundle, ['find_stories', 'parser', 'load_story'])
+    Bundle.find_stories.return_value = ['one.story', 'two.story']
+    Bundle.load_story().modules.return_value = []
+    error = StoryError(None, None)
+    Bundle.load_story().check.side_effect = error
+    assert bundle.check(syntax_only=True) == (['one.story'], [error])
+    Bundle.load_story().check.assert_called_with(parser=Bundle.parser(),
+                                                 syntax_only=True,
+                                                 errors=None)
+
+
+def test_bundle_check_all_errors(patch, bundle):
+    patch.many(Bundle, ['find_stories', 'parser', 'load_story'])
+    Bundle.find_stories.return_value = ['one.story', 'two.story']
+    errors = [StoryError(None, None), StoryError(None, None)]
+    Bundle.load_story().check.side_effect = errors
+    result = bundle.check(all_errors=True)
+    assert result == (['one.story', 'two.story'], errors)
+    assert Bundle.load_story().check.call_args[1]['errors'] == errors
+    assert [error.path for error in errors] == ['one.story', 'two.story']
+
+
+def test_bundle_check_warnings(patch, magic, bundle):
+    patch.many(Bundle, ['find_stories', 'parser', 'load_story'])
+    Bundle.find_stories.return_value = ['one.story']
+    warning = StoryError(None, None)
+    Bundle.load_story().modules.return_value = []
+    Bundle.load_story().warnings = [warning]
+    bundle.check()
+    assert bundle.warnings == [warning]
+    assert warning.path == 'one.story'
+
+
 def test_bundle_bundle_trees(patch, bundle):
     patch.many(Bundle, ['find_stories', 'parse', 'parser'])
     result = bundle.bundle_trees()
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import cProfile
 import io
 import os
 
@@ -8,9 +9,14 @@ from click.testing import CliRunner
 from pytest import fixture, mark
 
 from storyscript.App import App
+from storyscript.Batch import Batch
 from storyscript.Cli import Cli
+from storyscript.Daemon import Daemon
+from storyscript.DaemonClient import DaemonClient, DaemonError
+from storyscript.MemoryProfiler import MemoryProfiler
+from storyscript.Profiler import Profiler
 from storyscript.Project import Project
-from storyscript.Version import version
+from storyscript.Version import get_version
 from storyscript.exceptions.CompilerError import CompilerError
 from storyscript.exceptions.StoryError import StoryError
 
@@ -31,6 +37,17 @@ def app(patch):
     return App
 
 
+@fixture(autouse=True)
+def daemon_client(patch):
+    """
+    Makes sure that a running daemon doesn't interfere with the tests
+    """
+    patch.many(DaemonClient, ['compile', 'parse', 'lex'])
+    DaemonClient.compile.return_value = None
+    DaemonClient.parse.return_value = None
+    DaemonClient.lex.return_value = None
+
+
 def test_cli(runner, echo):
     runner.invoke(Cli.main, [])
     # NOTE(vesuvium): I didn't find how to get the context in testing
@@ -59,6 +76,18 @@ def test_cli_alias_grammar(runner, app, patch):
     assert app.grammar.call_count == 1
 
 
+def test_cli_alias_analyze(patch, runner, echo):
+    patch.object(App, 'analyze')
+    runner.invoke(Cli.main, ['a', '--cost'])
+    assert App.analyze.call_count == 1
+
+
+def test_cli_alias_daemon(patch, runner):
+    patch.many(Daemon, ['start', 'serve'])
+    runner.invoke(Cli.main, ['d'])
+    assert Daemon.serve.call_count == 1
+
+
 def test_cli_alias_new(patch, runner):
     patch.object(Project, 'new')
     runner.invoke(Cli.main, ['n', 'project'])
@@ -72,12 +101,12 @@ def test_cli_alias_help(runner, echo):
 
 def test_cli_alias_version(runner, echo):
     runner.invoke(Cli.main, 'v')
-    click.echo.assert_called_with(version)
+    click.echo.assert_called_with(get_version())
 
 
 def test_cli_alias_version_flag(runner, echo):
     runner.invoke(Cli.main, '-v')
-    message = 'StoryScript {} - http://storyscript.org'.format(version)
+    message = 'StoryScript {} - http://storyscript.org'.format(get_version())
     click.echo.assert_called_with(message)
 
 
@@ -86,7 +115,7 @@ def test_cli_version_flag(runner, echo):
     Ensures --version outputs the version
     """
     runner.invoke(Cli.main, ['--version'])
-    message = 'StoryScript {} - http://storyscript.org'.format(version)
+    message = 'StoryScript {} - http://storyscript.org'.format(get_version())
     click.echo.assert_called_with(message)
 
 
@@ -98,7 +127,9 @@ def test_cli_compile_with_ignore_option(runner, app):
                                 '--ignore', 'path/sub_dir/my_fake.story'])
     App.compile.assert_called_with('path/fake.story', ebnf=None,
                                    ignored_path='path/sub_dir/my_fake.story',
-                                   concise=False, first=False, features={})
+                                   concise=False, first=False, features={},
+                                   profiler=None, compact=False, binary=False,
+                                   pool=False, source_map=None)
 
 
 def test_cli_parse_with_ignore_option(runner, app):
@@ -132,6 +163,38 @@ def test_cli_parse_raw(runner, echo, app, tree):
     click.echo.assert_called_with(tree)
 
 
+def test_cli_parse_daemon(runner, echo, app):
+    """
+    Ensures the parse command uses a running daemon
+    """
+    DaemonClient.parse.return_value = {'path': 'pretty tree'}
+    runner.invoke(Cli.parse, [])
+    DaemonClient.parse.assert_called_with(os.getcwd(), ignored_path=None,
+                                          ebnf=None, lower=False,
+                                          features={})
+    App.parse.assert_not_called()
+    click.echo.assert_called_with('pretty tree')
+
+
+def test_cli_parse_daemon_raw(runner, echo, app, tree):
+    """
+    Ensures the parse command doesn't use the daemon for raw trees
+    """
+    App.parse.return_value = {'path': tree}
+    runner.invoke(Cli.parse, ['--raw'])
+    DaemonClient.parse.assert_not_called()
+
+
+def test_cli_parse_daemon_error(runner, echo, app):
+    """
+    Ensures the parse command prints the errors of the daemon
+    """
+    DaemonClient.parse.side_effect = DaemonError('E0007')
+    e = runner.invoke(Cli.parse, [])
+    assert e.exit_code == 1
+    click.echo.assert_called_with('E0007')
+
+
 def test_cli_parse_path(runner, echo, app):
     """
     Ensures the parse command supports specifying a path.
@@ -268,7 +331,9 @@ def test_cli_compile(patch, runner, echo, app):
     runner.invoke(Cli.compile, [])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
     click.style.assert_called_with('Script syntax passed!', fg='green')
     click.echo.assert_called_with(click.style())
 
@@ -280,7 +345,9 @@ def test_cli_compile_path(patch, runner, app):
     runner.invoke(Cli.compile, ['/path'])
     App.compile.assert_called_with('/path', ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
 
 
 def test_cli_compile_output_file(patch, runner, app):
@@ -301,7 +368,9 @@ def test_cli_compile_silent(runner, echo, app, option):
     result = runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
     assert result.output == ''
     assert click.echo.call_count == 0
 
@@ -314,7 +383,9 @@ def test_cli_compile_concise(runner, echo, app, option):
     runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=True,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
 
 
 @mark.parametrize('option', ['--first', '-f'])
@@ -325,21 +396,27 @@ def test_cli_compile_first(runner, echo, app, option):
     runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=True, features={})
+                                   first=True, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
 
 
 def test_cli_compile_debug(runner, echo, app):
     runner.invoke(Cli.compile, ['--debug'])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
 
 
 def test_cli_compile_features(runner, echo, app):
     runner.invoke(Cli.compile, ['--preview=globals'])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={'globals': True})
+                                   first=False, features={'globals': True},
+                                   profiler=None, compact=False, binary=False,
+                                   pool=False, source_map=None)
 
 
 @mark.parametrize('option', ['--json', '-j'])
@@ -350,7 +427,9 @@ def test_cli_compile_json(runner, echo, app, option):
     runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
     click.echo.assert_called_with(App.compile())
 
 
@@ -358,7 +437,9 @@ def test_cli_compile_ebnf(runner, echo, app):
     runner.invoke(Cli.compile, ['--ebnf', 'test.ebnf'])
     App.compile.assert_called_with(os.getcwd(), ebnf='test.ebnf',
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, profiler=None,
+                                   compact=False, binary=False, pool=False,
+                                   source_map=None)
 
 
 def test_cli_compile_ice(runner, echo, app):
@@ -407,6 +488,339 @@ def test_cli_compile_not_found_debug(runner, echo, app):
     assert e.exception.message() == 'Unknown compiler error'
 
 
+def test_cli_compile_profile(patch, runner, app, echo):
+    """
+    Ensures --profile compiles in-process and prints the profile
+    """
+    patch.object(Profiler, 'report')
+    runner.invoke(Cli.compile, ['--profile'])
+    DaemonClient.compile.assert_not_called()
+    profiler = App.compile.call_args[1]['profiler']
+    assert isinstance(profiler, Profiler)
+    click.echo.assert_any_call(Profiler.report(), err=True)
+
+
+def test_cli_compile_cprofile(patch, runner, app):
+    """
+    Ensures --cprofile writes a cProfile profile
+    """
+    patch.object(cProfile.Profile, 'dump_stats')
+    runner.invoke(Cli.compile, ['--cprofile', 'out.prof'])
+    DaemonClient.compile.assert_not_called()
+    assert App.compile.call_args[1]['profiler'] is None
+    cProfile.Profile.dump_stats.assert_called_with('out.prof')
+
+
+def test_cli_compile_trace(patch, runner, app):
+    """
+    Ensures --trace writes the Chrome trace of the compilation
+    """
+    patch.object(Profiler, 'trace', return_value={'traceEvents': []})
+    with runner.isolated_filesystem():
+        runner.invoke(Cli.compile, ['--trace', 'trace.json'])
+        with io.open('trace.json') as f:
+            assert f.read() == '{"traceEvents": []}'
+    DaemonClient.compile.assert_not_called()
+    assert isinstance(App.compile.call_args[1]['profiler'], Profiler)
+
+
+def test_cli_compile_memprofile(patch, runner, app, echo):
+    """
+    Ensures --memprofile traces memory and prints the memory report
+    """
+    patch.many(MemoryProfiler, ['start', 'stop', 'memory_report'])
+    runner.invoke(Cli.compile, ['--memprofile'])
+    DaemonClient.compile.assert_not_called()
+    profiler = App.compile.call_args[1]['profiler']
+    assert isinstance(profiler, MemoryProfiler)
+    MemoryProfiler.start.assert_called_with()
+    MemoryProfiler.stop.assert_called_with()
+    click.echo.assert_any_call(MemoryProfiler.memory_report(), err=True)
+
+
+@mark.parametrize('option', ['-w', '--workers'])
+def test_cli_compile_batch(patch, runner, app, option):
+    """
+    Ensures --batch compiles requests from stdin
+    """
+    patch.init(Batch)
+    patch.object(Batch, 'run')
+    runner.invoke(Cli.compile, ['--batch', option, '4'], input='{}')
+    Batch.__init__.assert_called_with(workers=4)
+    assert Batch.run.call_count == 1
+    App.compile.assert_not_called()
+
+
+def test_cli_compile_daemon(runner, echo, app):
+    """
+    Ensures the compile command uses a running daemon
+    """
+    DaemonClient.compile.return_value = '{}'
+    runner.invoke(Cli.compile, ['-j'])
+    DaemonClient.compile.assert_called_with(os.getcwd(), ebnf=None,
+                                            ignored_path=None, concise=False,
+                                            first=False, features={},
+                                            compact=False)
+    App.compile.assert_not_called()
+    click.echo.assert_called_with('{}')
+
+
+def test_cli_compile_daemon_debug(runner, echo, app):
+    """
+    Ensures the compile command doesn't use the daemon with debug=True
+    """
+    runner.invoke(Cli.compile, ['--debug'])
+    DaemonClient.compile.assert_not_called()
+    assert App.compile.call_count == 1
+
+
+def test_cli_compile_daemon_error(runner, echo, app):
+    """
+    Ensures the compile command prints errors reported by the daemon
+    """
+    DaemonClient.compile.side_effect = DaemonError('E0007: error')
+    e = runner.invoke(Cli.compile, [])
+    assert e.exit_code == 1
+    App.compile.assert_not_called()
+    click.echo.assert_called_with('E0007: error')
+
+
+def test_cli_compile_stream(patch, runner, app):
+    """
+    Ensures --stream compiles in-process, writing stories as they compile
+    """
+    patch.object(App, 'stream')
+    e = runner.invoke(Cli.compile, ['--stream'])
+    DaemonClient.compile.assert_not_called()
+    App.compile.assert_not_called()
+    assert App.stream.call_args[0][0] == os.getcwd()
+    assert App.stream.call_args[1] == {'ignored_path': None, 'ebnf': None,
+                                       'concise': False, 'features': {},
+                                       'profiler': None, 'compact': False,
+                                       'source_map': None}
+    assert e.exit_code == 0
+
+
+def test_cli_compile_compact(runner, echo, app):
+    """
+    Ensures --compact writes the JSON without whitespace
+    """
+    runner.invoke(Cli.compile, ['--compact', '-j'])
+    assert App.compile.call_args[1]['compact'] is True
+
+
+def test_cli_compile_binary(patch, runner, app):
+    """
+    Ensures --binary compiles in-process, writing the bytes to stdout
+    """
+    patch.object(click, 'get_binary_stream')
+    runner.invoke(Cli.compile, ['--binary'])
+    DaemonClient.compile.assert_not_called()
+    assert App.compile.call_args[1]['binary'] is True
+    click.get_binary_stream.assert_called_with('stdout')
+    click.get_binary_stream().write.assert_called_with(App.compile())
+
+
+def test_cli_compile_binary_output_file(patch, runner, app):
+    patch.object(io, 'open')
+    runner.invoke(Cli.compile, ['--binary', '/path', 'hello.ssb'])
+    io.open.assert_called_with('hello.ssb', 'wb')
+    io.open().__enter__().write.assert_called_with(App.compile())
+
+
+def test_cli_compile_pool(runner, echo, app):
+    """
+    Ensures --pool compiles in-process, pooling repeated objects
+    """
+    runner.invoke(Cli.compile, ['--pool', '-j'])
+    DaemonClient.compile.assert_not_called()
+    assert App.compile.call_args[1]['pool'] is True
+    click.echo.assert_called_with(App.compile())
+
+
+@mark.parametrize('option', ['--first', '--binary', '--pool'])
+def test_cli_compile_stream_conflicts(patch, runner, app, option):
+    """
+    Ensures --stream refuses the options it doesn't support
+    """
+    patch.object(App, 'stream')
+    e = runner.invoke(Cli.compile, ['--stream', option])
+    assert e.exit_code == 2
+    assert f'{option} cannot be used with --stream' in e.output
+    App.stream.assert_not_called()
+    App.compile.assert_not_called()
+
+
+def test_cli_compile_stream_compact(patch, runner, app):
+    patch.object(App, 'stream')
+    runner.invoke(Cli.compile, ['--stream', '--compact'])
+    assert App.stream.call_args[1]['compact'] is True
+
+
+def test_cli_compile_source_map(patch, runner, app):
+    """
+    Ensures --source-map writes the source of the lines to a file
+    """
+    patch.object(io, 'open')
+
+    def compile(*args, source_map, **kwargs):
+        source_map['version'] = 1
+        return '{}'
+
+    App.compile.side_effect = compile
+    runner.invoke(Cli.compile, ['--source-map', 'map.json', '--compact'])
+    DaemonClient.compile.assert_not_called()
+    io.open.assert_called_with('map.json', 'w')
+    io.open().__enter__().write.assert_called_with('{"version":1}')
+
+
+def test_cli_compile_stream_source_map(patch, runner, app):
+    patch.object(App, 'stream')
+    patch.object(io, 'open')
+    runner.invoke(Cli.compile, ['--stream', '--source-map', 'map.json'])
+    assert App.stream.call_args[1]['source_map'] == {}
+    io.open.assert_called_with('map.json', 'w')
+    io.open().__enter__().write.assert_called_with('{}')
+
+
+def test_cli_compile_stream_output(patch, runner, app):
+    patch.object(App, 'stream')
+    patch.object(io, 'open')
+    runner.invoke(Cli.compile, ['--stream', '-j', '/path', 'hello.json'])
+    io.open.assert_called_with('hello.json', 'w')
+    file = io.open().__enter__()
+    assert App.stream.call_args[0] == ('/path', file)
+
+
+def test_cli_compile_stream_no_json(patch, runner, echo, app):
+    """
+    Ensures --stream without --json checks the stories without writing them
+    """
+    patch.object(App, 'stream')
+    patch.object(io, 'open')
+    patch.object(click, 'style')
+    runner.invoke(Cli.compile, ['--stream', '/path', 'hello.json'])
+    io.open.assert_called_with(os.devnull, 'w')
+    assert App.stream.call_args[0] == ('/path', io.open().__enter__())
+    click.style.assert_called_with('Script syntax passed!', fg='green')
+    click.echo.assert_called_with(click.style())
+
+
+def test_cli_compile_stream_silent(patch, runner, echo, app):
+    """
+    Ensures --stream --silent writes nothing
+    """
+    patch.object(App, 'stream')
+    patch.object(io, 'open')
+    runner.invoke(Cli.compile, ['--stream', '-j', '--silent'])
+    io.open.assert_called_with(os.devnull, 'w')
+    click.echo.assert_not_called()
+
+
+def test_cli_check(patch, runner, echo):
+    """
+    Ensures the check command checks stories without compiling them
+    """
+    patch.object(App, 'check', return_value=[])
+    patch.object(App, 'compile')
+    patch.object(click, 'style')
+    e = runner.invoke(Cli.check, [])
+    App.check.assert_called_with(os.getcwd(), ignored_path=None, ebnf=None,
+                                 syntax_only=False, all_errors=False,
+                                 features={}, profiler=None)
+    App.compile.assert_not_called()
+    click.echo.assert_called_with(click.style())
+    assert e.exit_code == 0
+
+
+def test_cli_check_options(patch, runner, echo):
+    patch.object(App, 'check', return_value=[])
+    runner.invoke(Cli.check, ['--syntax-only', '--all', '/path'])
+    App.check.assert_called_with('/path', ignored_path=None, ebnf=None,
+                                 syntax_only=True, all_errors=True,
+                                 features={}, profiler=None)
+
+
+def test_cli_check_errors(patch, magic, runner, echo):
+    """
+    Ensures the check command prints all errors found
+    """
+    errors = [magic(), magic()]
+    patch.object(App, 'check', return_value=errors)
+    e = runner.invoke(Cli.check, ['--all'])
+    errors[0].echo.assert_called()
+    errors[1].echo.assert_called()
+    assert e.exit_code == 1
+
+
+def test_cli_analyze(patch, runner, echo):
+    """
+    Ensures the analyze command prints the cost report
+    """
+    patch.object(App, 'analyze')
+    e = runner.invoke(Cli.analyze, ['--cost'])
+    App.analyze.assert_called_with(os.getcwd(), ignored_path=None, ebnf=None,
+                                   features={})
+    click.echo.assert_called_with(App.analyze().text())
+    assert e.exit_code == 0
+
+
+def test_cli_analyze_json(patch, runner, echo):
+    patch.object(App, 'analyze')
+    App.analyze().output.return_value = {'stories': {}}
+    runner.invoke(Cli.analyze, ['--cost', '--json', '/path'])
+    click.echo.assert_called_with('{\n  "stories": {}\n}')
+
+
+def test_cli_analyze_no_analysis(patch, runner):
+    patch.object(App, 'analyze')
+    e = runner.invoke(Cli.analyze, [])
+    assert e.exit_code == 2
+    App.analyze.assert_not_called()
+
+
+def test_cli_analyze_lint(patch, magic, runner, echo):
+    warnings = [magic(), magic()]
+    patch.object(App, 'lint', return_value=warnings)
+    e = runner.invoke(Cli.analyze, ['--lint'])
+    App.lint.assert_called_with(os.getcwd(), ignored_path=None, ebnf=None,
+                                features={})
+    warnings[0].echo.assert_called()
+    warnings[1].echo.assert_called()
+    assert e.exit_code == 0
+
+
+def test_cli_analyze_lint_none(patch, runner, echo):
+    patch.object(App, 'lint', return_value=[])
+    runner.invoke(Cli.analyze, ['--lint'])
+    click.echo.assert_called_with(
+        click.style('No performance issues found', fg='green'))
+
+
+def test_cli_analyze_lint_json(patch, magic, runner, echo):
+    warning = magic()
+    warning.to_dict.return_value = {'code': 'W0001'}
+    patch.object(App, 'lint', return_value=[warning])
+    runner.invoke(Cli.analyze, ['--lint', '--json'])
+    click.echo.assert_called_with('[\n  {\n    "code": "W0001"\n  }\n]')
+
+
+def test_cli_analyze_both(patch, runner):
+    patch.many(App, ['analyze', 'lint'])
+    e = runner.invoke(Cli.analyze, ['--cost', '--lint'])
+    assert e.exit_code == 2
+    App.lint.assert_not_called()
+
+
+def test_cli_analyze_error(patch, runner):
+    patch.object(StoryError, 'echo')
+    patch.object(App, 'analyze',
+                 side_effect=StoryError(CompilerError(None), None))
+    e = runner.invoke(Cli.analyze, ['--cost'])
+    StoryError.echo.assert_called()
+    assert e.exit_code == 1
+
+
 def test_cli_lex(patch, magic, runner, app, echo):
     """
     Ensures the lex command outputs lexer tokens
@@ -419,6 +833,28 @@ def test_cli_lex(patch, magic, runner, app, echo):
     assert click.echo.call_count == 2
 
 
+def test_cli_lex_daemon(patch, runner, echo):
+    """
+    Ensures the lex command uses a running daemon
+    """
+    patch.object(App, 'lex')
+    DaemonClient.lex.return_value = {'one.story': [['token', 'value']]}
+    runner.invoke(Cli.lex, [])
+    DaemonClient.lex.assert_called_with(os.getcwd(), ebnf=None, features={})
+    App.lex.assert_not_called()
+    click.echo.assert_called_with('0 token value')
+
+
+def test_cli_lex_daemon_debug(patch, runner):
+    """
+    Ensures the lex command doesn't use the daemon with debug=True
+    """
+    patch.object(App, 'lex', return_value={})
+    runner.invoke(Cli.lex, ['--debug'])
+    DaemonClient.lex.assert_not_called()
+    App.lex.assert_called_with(os.getcwd(), ebnf=None, features={})
+
+
 def test_cli_lex_path(patch, magic, runner, app):
     """
     Ensures the lex command path defaults to cwd
@@ -496,6 +932,29 @@ def test_cli_lex_not_found_debug(patch, runner, echo, app):
     assert e.exception.message() == 'Unknown compiler error'
 
 
+def test_cli_daemon(patch, runner, echo):
+    """
+    Ensures the daemon command starts and serves a daemon
+    """
+    patch.many(Daemon, ['start', 'serve'])
+    runner.invoke(Cli.daemon, ['--socket', 'my.sock', '--workers', '2'])
+    assert Daemon.start.call_count == 1
+    assert Daemon.serve.call_count == 1
+    click.echo.assert_called_with('Listening on my.sock')
+
+
+def test_cli_daemon_running(patch, runner, echo):
+    """
+    Ensures the daemon command exits when another daemon is running
+    """
+    patch.many(Daemon, ['start', 'serve'])
+    Daemon.start.side_effect = DaemonError('running')
+    e = runner.invoke(Cli.daemon, [])
+    assert e.exit_code == 1
+    Daemon.serve.assert_not_called()
+    click.echo.assert_called_with('running')
+
+
 def test_cli_grammar(patch, runner, app, echo):
     patch.object(App, 'grammar')
     runner.invoke(Cli.grammar, [])
@@ -521,4 +980,4 @@ def test_cli_help(patch, runner, echo):
 
 def test_cli_version(patch, runner, echo):
     runner.invoke(Cli.version, [])
-    click.echo.assert_called_with(version)
+    click.echo.assert_called_with(get_version())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from storyscript.ConstantPool import ConstantPool
+
+
+path = {'$OBJECT': 'path', 'paths': ['a_long_variable_name', 'and_a_key']}
+
+
+def line(ln, args):
+    return {'method': 'execute', 'ln': ln, 'args': args, 'next': None}
+
+
+def bundle():
+    return {'stories': {
+        'a.story': {'tree': {'1': line('1', [path, 1]),
+                             '2': line('2', [path, 2])}},
+        'b.story': {'tree': {'1': line('1', [path, {'a': [1]}]),
+                             '2': line('2', [{'a': [1]}])}},
+        'c.story': {'tree': None}
+    }, 'services': [], 'entrypoint': ['a.story']}
+
+
+def test_constant_pool_apply():
+    result = ConstantPool().apply(bundle())
+    assert result['pool'] == [path]
+    reference = {'$OBJECT': 'pool', 'index': 0}
+    tree = result['stories']['a.story']['tree']
+    assert tree['1'] == line('1', [reference, 1])
+    assert tree['2'] == line('2', [reference, 2])
+    tree = result['stories']['b.story']['tree']
+    assert tree['1'] == line('1', [reference, {'a': [1]}])
+    assert tree['2'] == line('2', [{'a': [1]}])
+    assert result['services'] == []
+    assert result['entrypoint'] == ['a.story']
+
+
+def test_constant_pool_apply_copies():
+    compiled = bundle()
+    ConstantPool().apply(compiled)
+    assert compiled == bundle()
+
+
+def test_constant_pool_apply_story():
+    story = bundle()['stories']['a.story']
+    result = ConstantPool().apply(story)
+    assert result['pool'] == [path]
+    assert result['tree']['1']['args'][0] == {'$OBJECT': 'pool', 'index': 0}
+
+
+def test_constant_pool_apply_empty():
+    assert ConstantPool().apply({'tree': {}}) == {'tree': {}, 'pool': []}
+
+
+def test_constant_pool_resolve():
+    result = ConstantPool.resolve(ConstantPool().apply(bundle()))
+    assert result == bundle()
+    first = result['stories']['a.story']['tree']['1']['args'][0]
+    second = result['stories']['b.story']['tree']['1']['args'][0]
+    assert first is second
+
+
+def test_constant_pool_resolve_story():
+    story = bundle()['stories']['a.story']
+    assert ConstantPool.resolve(ConstantPool().apply(story)) == story
+
+
+def test_constant_pool_apply_linear():
+    story = bundle()['stories']['a.story']
+    story['tree'] = list(story['tree'].values())
+    result = ConstantPool().apply(story)
+    assert result['pool'] == [path]
+    assert result['tree'][1]['args'][0] == {'$OBJECT': 'pool', 'index': 0}
+    assert ConstantPool.resolve(result) == story
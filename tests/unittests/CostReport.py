@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture
+
+from storyscript.CostReport import CostReport
+
+
+@fixture
+def report():
+    return CostReport()
+
+
+def execute(parent=None, service='http', command='fetch', **options):
+    line = {'method': 'execute', 'service': service, 'command': command,
+            'parent': parent}
+    line.update(options)
+    return line
+
+
+def block(method, parent=None):
+    return {'method': method, 'parent': parent}
+
+
+def call(function, parent=None):
+    return {'method': 'call', 'function': function, 'parent': parent}
+
+
+def test_costreport_init(report):
+    assert report.stories == {}
+
+
+def test_costreport_analyze(patch, report):
+    patch.object(CostReport, 'story')
+    bundle = {'stories': {'a.story': {'tree': {}}}}
+    result = report.analyze(bundle)
+    CostReport.story.assert_called_with({'tree': {}})
+    assert result == {'a.story': CostReport.story()}
+    assert report.output() == {'stories': result}
+
+
+def test_costreport_story(report):
+    tree = {'1': execute(), '2': execute(service='log', command='info')}
+    result = report.story({'tree': tree, 'functions': {}})
+    assert result == {'calls': 2, 'looped_calls': 0, 'sites': 2,
+                      'targets': ['http fetch', 'log info'],
+                      'functions': {}, 'loops': []}
+
+
+def test_costreport_story_empty(report):
+    result = report.story({'tree': None, 'functions': None})
+    assert result['calls'] == 0
+    assert result['sites'] == 0
+
+
+def test_costreport_story_branches(report):
+    tree = {'1': block('if'), '2': execute('1'),
+            '3': block('elif'), '4': execute('3'), '5': execute('3'),
+            '6': block('else'), '7': execute('6'),
+            '8': execute(),
+            '9': block('if'), '10': execute('9')}
+    assert report.story({'tree': tree})['calls'] == 4
+
+
+def test_costreport_story_loops(report):
+    tree = {'1': block('for'), '2': execute('1'), '3': block('while', '1'),
+            '4': execute('3', service='log', command='info')}
+    result = report.story({'tree': tree})
+    assert result['calls'] == 0
+    assert result['looped_calls'] == 2
+    assert result['loops'] == [
+        {'line': '2', 'target': 'http fetch', 'function': None, 'depth': 1,
+         'calls': 1},
+        {'line': '4', 'target': 'log info', 'function': None, 'depth': 2,
+         'calls': 1}]
+
+
+def test_costreport_story_loops_lowered(report):
+    tree = {'1': block('for'), '2.1': execute('1'), '2': call('f', '1')}
+    result = report.story({'tree': tree})
+    assert [looped['line'] for looped in result['loops']] == ['2']
+
+
+def test_costreport_story_handlers(report):
+    tree = {'1': execute(output=['s'], command='server'),
+            '2': {'method': 'when', 'service': 's', 'parent': '1'},
+            '3': execute('2', service='r', command='write')}
+    result = report.story({'tree': tree})
+    assert result['calls'] == 1
+    assert result['looped_calls'] == 1
+    assert result['loops'][0]['target'] == 'r write'
+
+
+def test_costreport_story_functions(report):
+    tree = {'1': block('function'), '2': execute('1'),
+            '3': block('function'), '4': call('g', '3'),
+            '5': block('for'), '6': call('f', '5'), '7': call('h')}
+    result = report.story({'tree': tree, 'functions': {'f': '1', 'g': '3'}})
+    assert result['calls'] == 0
+    assert result['looped_calls'] == 1
+    assert result['targets'] == ['f()', 'h()']
+    assert result['functions'] == {
+        'f': {'line': '1', 'calls': 1, 'looped_calls': 0,
+              'targets': ['http fetch'], 'recursive': False},
+        'g': {'line': '3', 'calls': 0, 'looped_calls': 0,
+              'targets': ['g()'], 'recursive': True}}
+    assert result['loops'] == [{'line': '6', 'target': 'f()',
+                                'function': None, 'depth': 1, 'calls': 1}]
+
+
+def test_costreport_story_loops_branches(report):
+    tree = {'1': block('if'), '2': block('for', '1'), '3': execute('2'),
+            '4': execute('2'), '5': block('else'), '6': execute('5'),
+            '7': block('for', '5'), '8': execute('7'),
+            '9': block('while'), '10': execute('9')}
+    result = report.story({'tree': tree})
+    assert result['calls'] == 1
+    assert result['looped_calls'] == 3
+
+
+def test_costreport_story_functions_loops(report):
+    tree = {'1': block('function'), '2': execute('1'), '3': block('for', '1'),
+            '4': execute('3'), '5': call('f')}
+    result = report.story({'tree': tree, 'functions': {'f': '1'}})
+    assert result['calls'] == 1
+    assert result['looped_calls'] == 1
+    assert result['functions']['f']['looped_calls'] == 1
+
+
+def test_costreport_plural():
+    assert CostReport.plural(1, 'loop') == '1 loop'
+    assert CostReport.plural(2, 'loop') == '2 loops'
+
+
+def test_costreport_text(report):
+    report.stories = {
+        'a.story': {'calls': 1, 'looped_calls': 0, 'sites': 1,
+                    'targets': ['f()'],
+                    'functions': {'f': {'calls': 1, 'looped_calls': 0,
+                                        'targets': ['log info'],
+                                        'recursive': True}},
+                    'loops': [{'line': '2', 'target': 'log info',
+                               'function': 'f', 'depth': 2}]},
+        'b.story': {'calls': 2, 'looped_calls': 0, 'sites': 2,
+                    'targets': ['http fetch'], 'functions': {}, 'loops': []}}
+    assert report.text().split('\n') == [
+        'b.story: 2 service calls at most, 2 call sites',
+        '  calls http fetch',
+        'a.story: 1 service call at most, 1 call site',
+        '  calls f()',
+        '  function f: 1 service call at most, recursive',
+        '    calls log info',
+        '  line 2 in function f: log info in 2 loops']
+
+
+def test_costreport_text_looped(report):
+    report.stories = {
+        'a.story': {'calls': 9, 'looped_calls': 0, 'sites': 9,
+                    'targets': [], 'functions': {}, 'loops': []},
+        'b.story': {'calls': 1, 'looped_calls': 6, 'sites': 3,
+                    'targets': [],
+                    'functions': {'f': {'calls': 0, 'looped_calls': 2,
+                                        'targets': [], 'recursive': False}},
+                    'loops': []}}
+    assert report.text().split('\n') == [
+        'b.story: 1 service call at most outside loops, '
+        '6 per loop iteration, 3 call sites',
+        '  function f: 0 service calls at most outside loops, '
+        '2 per loop iteration',
+        'a.story: 9 service calls at most, 9 call sites']
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+import os
+
+from pytest import fixture, raises
+
+from storyscript import DaemonClient as DaemonClientModule
+from storyscript.App import App
+from storyscript.Daemon import Daemon, StoryCache, Worker
+from storyscript.DaemonClient import DaemonClient, DaemonError
+from storyscript.compiler.semantics.functions.MutationTable import \
+    MutationTable
+from storyscript.exceptions import CompilerError, StoryError
+
+
+@fixture
+def story(magic):
+    story = magic()
+    story.story = 'a = 1'
+    story.features = 'Features()'
+    return story
+
+
+def test_daemon_socket_path(patch):
+    patch.object(os, 'getenv', return_value=None)
+    assert DaemonClientModule.socket_path().endswith(
+        os.path.join('storyscript-{}'.format(os.getuid()),
+                     'storyscript.sock'))
+
+
+def test_daemon_socket_path_runtime_dir(patch):
+    patch.object(os, 'getenv', side_effect=[None, '/run/user/1000'])
+    path = DaemonClientModule.socket_path()
+    assert path == '/run/user/1000/storyscript.sock'
+
+
+def test_daemon_socket_path_env(patch):
+    patch.object(os, 'getenv', return_value='my.sock')
+    assert DaemonClientModule.socket_path() == 'my.sock'
+
+
+def test_story_cache_miss(story):
+    cache = StoryCache()
+    assert cache.get(story) is None
+    assert cache.misses == 1
+
+
+def test_story_cache_hit(story):
+    cache = StoryCache()
+    cache.put(story, ['b.story'], 'compiled', warnings=['warning'])
+    assert cache.get(story) == (['b.story'], 'compiled', ['warning'])
+    assert cache.hits == 1
+
+
+def test_story_cache_maxsize(magic, story):
+    cache = StoryCache(maxsize=1)
+    cache.put(story, [], 'compiled')
+    other = magic(story='b = 1', features='Features()')
+    cache.put(other, [], 'other')
+    assert cache.get(story) is None
+    assert cache.get(other) == ([], 'other', [])
+
+
+def test_worker_warm(patch):
+    patch.object(Worker, 'cache', None)
+    patch.object(MutationTable, 'hub_mutations', None)
+    Worker.warm(cache_size=8)
+    assert MutationTable.hub_mutations is not None
+    assert Worker.cache.maxsize == 8
+
+
+def test_worker_compile(patch):
+    patch.object(App, 'compile')
+    patch.object(Worker, 'cache', 'cache')
+    result = Worker.compile('path', None, None, False, False, {})
+    App.compile.assert_called_with('path', ignored_path=None, ebnf=None,
+                                   concise=False, first=False, features={},
+                                   cache='cache', compact=False)
+    assert result == App.compile()
+
+
+def test_worker_compile_compact(patch):
+    patch.object(App, 'compile')
+    Worker.compile('path', None, None, False, False, {}, compact=True)
+    assert App.compile.call_args[1]['compact'] is True
+
+
+def test_worker_compile_ebnf(patch):
+    patch.object(App, 'compile')
+    Worker.compile('path', None, 'my.ebnf', False, False, {})
+    assert App.compile.call_args[1]['cache'] is None
+
+
+def test_worker_run(patch):
+    patch.object(os, 'chdir')
+    patch.object(Worker, 'compile')
+    request = {'command': 'compile', 'cwd': '/dir', 'args': {'path': 'p'}}
+    result = Worker.run(request)
+    os.chdir.assert_called_with('/dir')
+    Worker.compile.assert_called_with(path='p')
+    assert result == {'result': Worker.compile()}
+
+
+def test_worker_run_story_error(patch):
+    patch.object(os, 'chdir')
+    patch.object(Worker, 'lex')
+    Worker.lex.side_effect = StoryError(CompilerError(None), None)
+    result = Worker.run({'command': 'lex', 'cwd': '/dir', 'args': {}})
+    assert result['error'].startswith('E0001: ')
+
+
+def test_worker_run_internal_error(patch):
+    patch.object(os, 'chdir')
+    patch.object(Worker, 'parse', side_effect=Exception('ICE'))
+    result = Worker.run({'command': 'parse', 'cwd': '/dir', 'args': {}})
+    assert 'Internal error occured: ICE' in result['error']
+
+
+def test_daemon_dispatch(magic):
+    daemon = Daemon(path='my.sock', workers=1)
+    daemon.pool = magic()
+    request = {'command': 'compile', 'version': daemon.version}
+    result = daemon.dispatch(request)
+    daemon.pool.apply.assert_called_with(Worker.run, (request,))
+    assert result == daemon.pool.apply()
+
+
+def test_daemon_dispatch_ping():
+    daemon = Daemon(path='my.sock', workers=1)
+    assert daemon.dispatch({'command': 'ping'}) == {'result': daemon.version}
+
+
+def test_daemon_dispatch_version_mismatch(magic):
+    daemon = Daemon(path='my.sock', workers=1)
+    daemon.pool = magic()
+    result = daemon.dispatch({'command': 'compile', 'version': '0.0.1-old'})
+    assert 'unavailable' in result
+    daemon.pool.apply.assert_not_called()
+
+
+def test_daemon_bind_running(patch):
+    patch.object(os.path, 'exists', return_value=True)
+    patch.many(DaemonClient, ['owned', 'ping'])
+    with raises(DaemonError) as e:
+        Daemon(path='my.sock', workers=1).bind()
+    assert e.value.message == 'A daemon is already running on my.sock'
+
+
+def test_daemon_bind_other_user(patch):
+    patch.object(os.path, 'exists', return_value=True)
+    patch.object(DaemonClient, 'owned', return_value=False)
+    patch.object(os, 'unlink')
+    with raises(DaemonError) as e:
+        Daemon(path='my.sock', workers=1).bind()
+    assert e.value.message == 'my.sock belongs to another user'
+    os.unlink.assert_not_called()
+
+
+def test_daemon_client_no_socket(tmpdir):
+    client = DaemonClient(str(tmpdir.join('my.sock')))
+    assert client.owned() is False
+    assert client.compile('path') is None
+
+
+def test_daemon_client_owned(patch, tmpdir):
+    client = DaemonClient(str(tmpdir))
+    assert client.owned() is True
+    patch.object(os, 'getuid', return_value=os.getuid() + 1)
+    assert client.owned() is False
+
+
+def test_daemon_client_other_user(patch):
+    patch.object(DaemonClient, 'owned', return_value=False)
+    patch.object(DaemonClientModule, 'socket')
+    assert DaemonClient('my.sock').compile('path') is None
+    DaemonClientModule.socket.socket.assert_not_called()
+
+
+def test_daemon_client_request(patch):
+    patch.object(DaemonClient, 'send', return_value={'result': 'compiled'})
+    result = DaemonClient('my.sock').compile('path', concise=True)
+    message = DaemonClient.send.call_args[0][0]
+    assert message['command'] == 'compile'
+    assert message['cwd'] == os.getcwd()
+    assert message['args'] == {'path': 'path', 'ignored_path': None,
+                               'ebnf': None, 'concise': True, 'first': False,
+                               'features': None, 'compact': False}
+    assert result == 'compiled'
+
+
+def test_daemon_client_request_unavailable(patch):
+    patch.object(DaemonClient, 'send', return_value={'unavailable': '.'})
+    assert DaemonClient('my.sock').lex('path') is None
+
+
+def test_daemon_client_request_error(patch):
+    patch.object(DaemonClient, 'send', return_value={'error': 'E0001'})
+    with raises(DaemonError) as e:
+        DaemonClient('my.sock').parse('path')
+    assert e.value.message == 'E0001'
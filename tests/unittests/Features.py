@@ -3,3 +3,10 @@ from storyscript.Features import Features
 
 def test_features_str():
     assert str(Features(None)).startswith('Features(')
+
+
+def test_features_limits():
+    features = Features({'max_nodes': 10})
+    assert features.max_nodes == 10
+    assert features.deadline is None
+    assert 'max_nodes' not in Features.all_feature_names()
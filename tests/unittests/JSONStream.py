@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from storyscript.JSONStream import JSONStream
+from storyscript.Serializer import Serializer
+
+
+def clean(value):
+    if not isinstance(value, dict):
+        return value
+    return {k: clean(v) for k, v in value.items() if v}
+
+
+def stream(stories, metadata, clean=None, serializer=None):
+    output = io.StringIO()
+    writer = JSONStream(output, clean=clean, serializer=serializer)
+    for path, story in stories.items():
+        writer.story(path, story)
+    writer.end(metadata)
+    return output.getvalue()
+
+
+def test_json_stream():
+    stories = {'a.story': {'tree': {'1': {'method': 'execute',
+                                          'args': ['x\ny']}},
+                           'services': ['alpine']},
+               'b.story': {'tree': {}, 'services': []}}
+    metadata = {'services': ['alpine'], 'entrypoint': ['a.story']}
+    expected = dict(stories=stories, **metadata)
+    assert stream(stories, metadata) == json.dumps(expected, indent=2)
+
+
+def test_json_stream_empty():
+    metadata = {'services': [], 'entrypoint': []}
+    expected = dict(stories={}, **metadata)
+    assert stream({}, metadata) == json.dumps(expected, indent=2)
+
+
+def test_json_stream_clean():
+    stories = {'a.story': {'tree': {}, 'services': ['alpine']},
+               'b.story': {'tree': {}}}
+    metadata = {'services': [], 'entrypoint': ['a.story']}
+    expected = clean(dict(stories=stories, **metadata))
+    assert stream(stories, metadata, clean) == json.dumps(expected, indent=2)
+
+
+def test_json_stream_clean_empty():
+    assert stream({'a.story': {}}, {'services': []}, clean) == '{}'
+
+
+def test_json_stream_compact():
+    stories = {'a.story': {'tree': {'1': {'method': 'execute',
+                                          'args': ['caf\xe9']}},
+                           'services': ['alpine']},
+               'b.story': {'tree': {}, 'services': []}}
+    metadata = {'services': ['alpine'], 'entrypoint': ['a.story']}
+    expected = dict(stories=stories, **metadata)
+    result = stream(stories, metadata, serializer=Serializer(compact=True))
+    assert result == json.dumps(expected, separators=(',', ':'))
+
+
+def test_json_stream_compact_clean():
+    stories = {'a.story': {'tree': {}, 'services': ['alpine']}}
+    metadata = {'services': [], 'entrypoint': ['a.story']}
+    expected = clean(dict(stories=stories, **metadata))
+    result = stream(stories, metadata, clean, Serializer(compact=True))
+    assert result == json.dumps(expected, separators=(',', ':'))
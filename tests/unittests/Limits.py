@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from lark.lexer import Token
+
+from pytest import raises
+
+from storyscript.Features import Features
+from storyscript.Limits import Limits
+from storyscript.exceptions import CompilerError
+from storyscript.parser import Tree
+
+
+def limits(clock=None, **features):
+    if clock is None:
+        return Limits(Features(features))
+    return Limits(Features(features), clock=clock)
+
+
+def test_limits_init():
+    result = Limits()
+    assert result.max_source_bytes is None
+    assert result.max_nodes is None
+    assert result.max_depth is None
+    assert result.max_temporaries is None
+    assert result.deadline is None
+    assert result.temporaries == 0
+    assert result.steps == 0
+
+
+def test_limits_init_deadline():
+    result = limits(clock=lambda: 10, deadline=2)
+    assert result.timeout == 2
+    assert result.deadline == 12
+
+
+def test_limits_check_deadline():
+    times = iter([0, 1, 3])
+    result = limits(clock=lambda: next(times), deadline=2)
+    result.check_deadline()
+    with raises(CompilerError) as e:
+        result.check_deadline()
+    assert e.value.error == 'limit_deadline'
+    assert e.value.format_args['limit'] == 2
+
+
+def test_limits_check_source():
+    limits(max_source_bytes=3).check_source('abc')
+    with raises(CompilerError) as e:
+        limits(max_source_bytes=3).check_source('abcd')
+    assert e.value.error == 'limit_source_bytes'
+    assert e.value.format_args.size == 4
+    assert e.value.format_args.limit == 3
+
+
+def test_limits_check_source_unicode():
+    with raises(CompilerError):
+        limits(max_source_bytes=3).check_source('éé')
+
+
+def test_limits_check_nodes():
+    tree = Tree('a', [Tree('b', [Token('NAME', 'x')]), Tree('c', [])])
+    limits(max_nodes=3).check_nodes(tree)
+    with raises(CompilerError) as e:
+        limits(max_nodes=2).check_nodes(tree)
+    assert e.value.error == 'limit_nodes'
+
+
+def test_limits_tokens_unlimited():
+    tokens = iter([])
+    assert limits().tokens(tokens) is tokens
+
+
+def test_limits_tokens_depth():
+    tokens = [Token('_INDENT', ''), Token('_OP', '('), Token('_CP', ')'),
+              Token('_OSB', '['), Token('_DEDENT', '')]
+    assert list(limits(max_depth=2).tokens(tokens)) == tokens
+    with raises(CompilerError) as e:
+        list(limits(max_depth=1).tokens(tokens))
+    assert e.value.error == 'limit_depth'
+    assert e.value.column == tokens[1].column
+
+
+def test_limits_tokens_nodes():
+    tokens = [Token('NAME', 'a'), Token('EQUALS', '='), Token('INT', '1')]
+    assert list(limits(max_nodes=3).tokens(tokens)) == tokens
+    with raises(CompilerError) as e:
+        list(limits(max_nodes=2).tokens(tokens))
+    assert e.value.error == 'limit_nodes'
+    assert e.value.column == tokens[2].column
+
+
+def test_limits_tokens_operators():
+    tokens = [Token('INT', '1'), Token('PLUS', '+'), Token('INT', '2'),
+              Token('MULTIPLIER', '*'), Token('INT', '3'), Token('_NL', ''),
+              Token('NOT', '!'), Token('NAME', 'a')]
+    assert list(limits(max_depth=2).tokens(tokens)) == tokens
+    with raises(CompilerError) as e:
+        list(limits(max_depth=1).tokens(tokens))
+    assert e.value.error == 'limit_depth'
+    assert e.value.column == tokens[3].column
+
+
+def test_limits_tokens_deadline(patch):
+    patch.object(Limits, 'check_deadline')
+    Limits.check_every = 2
+    tokens = [Token('NAME', 'a'), Token('NAME', 'b'), Token('NAME', 'c')]
+    try:
+        list(limits(clock=lambda: 0, deadline=1).tokens(tokens))
+    finally:
+        Limits.check_every = 256
+    Limits.check_deadline.assert_called_once_with(tokens[1])
+
+
+def test_limits_temporary(patch, magic):
+    result = limits(max_temporaries=1)
+    patch.object(Limits, 'check_deadline')
+    result.temporary()
+    assert result.temporaries == 1
+    assert Limits.check_deadline.call_count == 1
+    tree = magic()
+    with raises(CompilerError) as e:
+        result.temporary(tree)
+    assert e.value.error == 'limit_temporaries'
+    assert e.value.line == tree.line()
+
+
+def test_limits_step(patch, magic):
+    patch.object(Limits, 'check_deadline')
+    Limits.check_every = 2
+    tree = magic()
+    result = limits()
+    try:
+        result.step()
+        result.step(tree)
+    finally:
+        Limits.check_every = 256
+    assert result.steps == 2
+    Limits.check_deadline.assert_called_once_with(tree=tree)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tracemalloc
+
+from pytest import fixture, mark
+
+from storyscript.MemoryProfiler import MemoryProfiler
+from storyscript.Profiler import Span
+
+
+@fixture
+def profiler():
+    profiler = MemoryProfiler()
+    profiler.start()
+    yield profiler
+    if tracemalloc.is_tracing():
+        profiler.stop()
+
+
+@fixture
+def stat(magic):
+    def stat(filename, lineno, size, count=1):
+        frame = magic(filename=filename, lineno=lineno)
+        return magic(traceback=[frame], size_diff=size, count_diff=count)
+    return stat
+
+
+def test_memory_profiler_init():
+    profiler = MemoryProfiler(top=3)
+    assert profiler.top == 3
+    assert profiler.peaks == {}
+    assert profiler.retained == {}
+    assert profiler.sites == {}
+    assert profiler.peak == 0
+
+
+def test_memory_profiler_start_stop(profiler):
+    assert tracemalloc.is_tracing()
+    profiler.stop()
+    assert tracemalloc.is_tracing() is False
+    assert profiler.peak > 0
+
+
+def test_memory_profiler_span_retained(profiler):
+    kept = []
+    with profiler.span('story', story='a.story') as story:
+        with profiler.span('parse') as parse:
+            kept.append(bytearray(100000))
+        with profiler.span('transform') as transform:
+            bytearray(200000)
+    assert profiler.retained[parse] >= 100000
+    assert profiler.retained[transform] < 100000
+    assert profiler.retained[story] >= 100000
+    assert story in profiler.sites
+    assert profiler.stack() == []
+
+
+@mark.skipif(not hasattr(tracemalloc, 'reset_peak'),
+             reason='needs tracemalloc.reset_peak')
+def test_memory_profiler_span_peaks(profiler):
+    with profiler.span('story', story='a.story') as story:
+        with profiler.span('parse') as parse:
+            bytearray(100000)
+        with profiler.span('transform') as transform:
+            bytearray(300000)
+    assert 100000 <= profiler.peaks[parse] < 300000
+    assert profiler.peaks[transform] >= 300000
+    assert profiler.peaks[story] >= profiler.peaks[transform]
+
+
+def test_memory_profiler_span_sites(profiler):
+    kept = []
+    with profiler.span('parse') as parse:
+        kept.append([object() for _ in range(1000)])
+    sites = profiler.top_sites([parse])
+    line = test_memory_profiler_span_sites.__code__.co_firstlineno + 3
+    assert sites[0][0].endswith('MemoryProfiler.py:{}'.format(line))
+    assert sites[0][2] >= 1000
+
+
+@mark.parametrize('name, parent, expected', [
+    ('story', 'lowering', True),
+    ('read', None, True),
+    ('lowering', 'story', True),
+    ('lowering.assignment', 'lowering', False),
+])
+def test_memory_profiler_snapshotted(name, parent, expected):
+    if parent is not None:
+        parent = Span(parent, None, None, 0, 0)
+    span = Span(name, None, parent, 0, 0)
+    assert MemoryProfiler.snapshotted(span) is expected
+
+
+def test_memory_profiler_site(stat):
+    path = os.path.join(os.getcwd(), 'storyscript', 'Story.py')
+    assert MemoryProfiler.site(stat(path, 12, 0)) == os.path.join(
+        'storyscript', 'Story.py:12')
+    assert MemoryProfiler.site(stat('/lark/tree.py', 3, 0)) == \
+        '/lark/tree.py:3'
+
+
+def test_memory_profiler_site_sys_path(patch, stat):
+    patch.object(sys, 'path', ['', '/usr/lib', '/usr/lib/site-packages'])
+    site = stat('/usr/lib/site-packages/lark/tree.py', 3, 0)
+    assert MemoryProfiler.site(site) == os.path.join('lark', 'tree.py:3')
+
+
+def test_memory_profiler_top_sites(stat):
+    profiler = MemoryProfiler(top=2)
+    profiler.sites = {
+        'a': [stat('/a.py', 1, 10), stat('/b.py', 2, 30)],
+        'b': [stat('/a.py', 1, 25, count=2), stat('/c.py', 3, 5)],
+    }
+    assert profiler.top_sites(['a', 'b']) == [('/a.py:1', 35, 3),
+                                              ('/b.py:2', 30, 1)]
+
+
+def test_memory_profiler_top_sites_excluded(stat):
+    profiler = MemoryProfiler()
+    profiler.sites = {
+        'story': [stat('/a.py', 1, 10), stat('/b.py', 2, 30)],
+        'parser_init': [stat('/b.py', 2, 30)],
+    }
+    assert profiler.top_sites(['story'], ['parser_init']) == [
+        ('/a.py:1', 10, 1)]
+
+
+def test_memory_profiler_memory_phases():
+    profiler = MemoryProfiler()
+    story = Span('story', 'a.story', None, 0, 0)
+    first = Span('parse', 'a.story', story, 0, 0)
+    second = Span('parse', 'b.story', None, 0, 0)
+    lowering = Span('lowering', 'a.story', story, 0, 0)
+    profiler.spans = [story, first, second, lowering]
+    profiler.peaks = {story: 50, first: 10, second: 20, lowering: 5}
+    profiler.retained = {story: 8, first: 1, second: 2, lowering: 3}
+    assert profiler.memory_phases() == [('parse', 2, 20, 3),
+                                        ('lowering', 1, 5, 3)]
+
+
+def test_memory_profiler_memory_stories(patch):
+    patch.object(MemoryProfiler, 'top_sites')
+    profiler = MemoryProfiler()
+    story = Span('story', 'a.story', None, 0, 0)
+    parse = Span('parse', 'a.story', story, 0, 0)
+    parser_init = Span('parser_init', 'a.story', story, 0, 0)
+    profiler.spans = [story, parser_init, parse]
+    profiler.peaks = {story: 50}
+    profiler.retained = {story: 8, parser_init: 3, parse: 1}
+    sites = MemoryProfiler.top_sites.return_value
+    assert profiler.memory_stories() == [('a.story', 50, 5, sites)]
+    MemoryProfiler.top_sites.assert_called_with([story], [parser_init])
+
+
+def test_memory_profiler_memory_report(patch, magic):
+    patch.object(MemoryProfiler, 'memory_phases',
+                 return_value=[('parse', 2, 2048, 1024)])
+    patch.object(MemoryProfiler, 'memory_stories',
+                 return_value=[('a.story', 4096, 512,
+                                [('a.py:1', 1024, 3)])])
+    patch.object(MemoryProfiler, 'top_sites',
+                 return_value=[('b.py:2', 2048, 4)])
+    profiler = MemoryProfiler()
+    profiler.reset_peak = magic()
+    profiler.peak = 8192
+    lines = profiler.memory_report().split('\n')
+    assert lines[0] == 'Overall peak: 8.0 KiB'
+    assert lines[2].split() == ['Phase', 'Calls', 'Peak', '(KiB)',
+                                'Retained', '(KiB)']
+    assert lines[3].split() == ['parse', '2', '2.0', '1.0']
+    assert lines[5] == ('Story a.story: peak 4.0 KiB, the bundle keeps '
+                        '0.5 KiB alive')
+    assert lines[6].split() == ['a.py:1', '1.0', 'KiB', '3', 'blocks']
+    assert lines[8] == 'Top allocation sites left by phases'
+    assert lines[9].split() == ['b.py:2', '2.0', 'KiB', '4', 'blocks']
+
+
+def test_memory_profiler_memory_report_no_reset_peak(patch):
+    patch.object(MemoryProfiler, 'memory_phases',
+                 return_value=[('parse', 2, 0, 1024)])
+    patch.object(MemoryProfiler, 'memory_stories',
+                 return_value=[('a.story', 0, 512, [])])
+    patch.object(MemoryProfiler, 'top_sites', return_value=[])
+    profiler = MemoryProfiler()
+    profiler.reset_peak = None
+    profiler.peak = 8192
+    lines = profiler.memory_report().split('\n')
+    assert lines[0] == 'Overall peak: 8.0 KiB'
+    assert lines[3].split() == ['parse', '2', 'n/a', '1.0']
+    assert lines[5] == ('Story a.story: peak n/a, the bundle keeps '
+                        '0.5 KiB alive')
+
+
+def test_memory_profiler_span_peak(magic):
+    profiler = MemoryProfiler()
+    profiler.reset_peak = magic()
+    assert profiler.span_peak(2048, ' KiB') == '2.0 KiB'
+    profiler.reset_peak = None
+    assert profiler.span_peak(2048, ' KiB') == 'n/a'
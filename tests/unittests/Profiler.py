@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from pytest import fixture, raises
+
+from storyscript.Profiler import NullProfiler, Profiler
+
+
+@fixture
+def clock():
+    """
+    A clock advancing by one second on every reading
+    """
+    ticks = iter(range(1000))
+    return lambda: next(ticks)
+
+
+@fixture
+def profiler(clock):
+    return Profiler(clock=clock)
+
+
+def test_null_profiler():
+    profiler = NullProfiler()
+    with profiler.span('parse') as span:
+        assert span is profiler.null_span
+    assert profiler.timed('lex', 'tokens') == 'tokens'
+    profiler.count('tokens', 2)
+    assert profiler.enabled is False
+    assert profiler.stats() is None
+
+
+def test_profiler_span(profiler):
+    with profiler.span('story', story='a.story') as story:
+        with profiler.span('parse') as parse:
+            pass
+    assert profiler.spans == [story, parse]
+    assert parse.parent == story
+    assert parse.story == 'a.story'
+    assert (story.start, parse.start, parse.end, story.end) == (0, 1, 2, 3)
+    assert profiler.stack() == []
+
+
+def test_profiler_span_error(profiler):
+    with raises(ValueError):
+        with profiler.span('parse'):
+            raise ValueError()
+    assert profiler.spans[0].duration() == 1
+    assert profiler.stack() == []
+
+
+def test_profiler_timed(profiler):
+    with profiler.span('parse', story='a.story'):
+        assert list(profiler.timed('lex', ['a', 'b'])) == ['a', 'b']
+    assert profiler.timings == [('lex', 'a.story', 3)]
+
+
+def test_profiler_timed_counter(profiler):
+    list(profiler.timed('lex', ['a', 'b'], counter='tokens'))
+    assert profiler.counts['tokens'] == 2
+
+
+def test_profiler_count(profiler):
+    profiler.count('cache_hits')
+    profiler.count('nodes', 10)
+    profiler.count('nodes', 5)
+    assert profiler.counts == {'cache_hits': 1, 'nodes': 15}
+
+
+def test_profiler_stats(profiler):
+    with profiler.span('parse'):
+        pass
+    profiler.count('nodes', 10)
+    stats = profiler.stats()
+    assert stats['nodes'] == 10
+    assert stats['tokens'] == 0
+    assert set(Profiler.counters) < set(stats)
+    assert stats['phases'] == {'parse': 1}
+
+
+def test_profiler_phases(profiler):
+    with profiler.span('story', story='a.story'):
+        with profiler.span('parse'):
+            pass
+        with profiler.span('parse'):
+            with profiler.span('transform'):
+                pass
+    profiler.add('lex', 10)
+    assert profiler.phases() == [('lex', 10, 1), ('parse', 4, 2),
+                                 ('transform', 1, 1)]
+
+
+def test_profiler_stories(profiler):
+    with profiler.span('story', story='a.story'):
+        with profiler.span('story', story='b.story'):
+            with profiler.span('parse'):
+                pass
+    with profiler.span('serialize'):
+        pass
+    assert profiler.stories() == [('b.story', 3), ('a.story', 2)]
+    assert profiler.total() == 6
+
+
+def test_profiler_trace(patch, profiler):
+    patch.object(os, 'getpid', return_value=1)
+    patch.object(threading, 'get_ident', return_value=2)
+    with profiler.span('story', story='a.story'):
+        with profiler.span('story', story='b.story'):
+            pass
+    events = profiler.trace()['traceEvents']
+    assert events[0] == {'name': 'a.story', 'cat': 'story', 'ph': 'X',
+                         'ts': 0, 'dur': 3e6, 'pid': 1, 'tid': 2,
+                         'args': {'story': 'a.story'}}
+    assert events[1]['name'] == 'b.story'
+    assert (events[1]['ts'], events[1]['dur']) == (1e6, 1e6)
+    assert events[2] == {'name': 'process_name', 'ph': 'M', 'pid': 1,
+                         'tid': 2, 'args': {'name': 'storyscript'}}
+
+
+def test_profiler_trace_phase(profiler):
+    with profiler.span('parse', story='a.story'):
+        pass
+    event = profiler.trace()['traceEvents'][0]
+    assert (event['name'], event['cat']) == ('parse', 'phase')
+
+
+def test_profiler_trace_empty(profiler):
+    assert profiler.trace() == {'traceEvents': [], 'displayTimeUnit': 'ms'}
+
+
+def test_profiler_report(profiler):
+    with profiler.span('story', story='a.story'):
+        with profiler.span('parse'):
+            pass
+    lines = profiler.report().split('\n')
+    assert lines[0].split() == ['Phase', 'Calls', 'Time', '(ms)', '%']
+    assert lines[1].split() == ['parse', '1', '1000.00', '33.3']
+    assert lines[4].split() == ['a.story', '3000.00', '100.0']
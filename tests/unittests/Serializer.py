@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import json
+
+from pytest import fixture, mark
+
+import storyscript.Serializer as SerializerModule
+from storyscript.Serializer import Serializer
+
+
+value = {'stories': {'a.story': {'tree': {'1': {'args': ['caf\xe9', 1.5]}},
+                                 'services': []}},
+         'entrypoint': ['a.story']}
+
+
+@fixture
+def stdlib(patch):
+    patch.object(SerializerModule, 'orjson', None)
+
+
+def test_serializer():
+    serializer = Serializer()
+    assert serializer.indent == 2
+    assert serializer.dumps(value) == json.dumps(value, indent=2)
+
+
+def test_serializer_compact():
+    serializer = Serializer(compact=True)
+    assert serializer.indent is None
+    expected = json.dumps(value, separators=(',', ':'))
+    assert serializer.dumps(value) == expected
+
+
+def test_serializer_stdlib(stdlib):
+    serializer = Serializer()
+    assert serializer.fast is False
+    assert serializer.dumps(value) == json.dumps(value, indent=2)
+
+
+def test_serializer_stdlib_compact(stdlib):
+    expected = json.dumps(value, separators=(',', ':'))
+    assert Serializer(compact=True).dumps(value) == expected
+
+
+@mark.parametrize('compact', [False, True])
+def test_serializer_dumpb(compact):
+    data = Serializer(compact=compact).dumpb(value)
+    assert isinstance(data, bytes)
+    assert json.loads(data.decode('utf-8')) == value
+    assert 'caf\xe9'.encode('utf-8') in data
+
+
+def test_serializer_dumpb_stdlib(stdlib):
+    data = Serializer(compact=True).dumpb(value)
+    expected = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    assert data == expected.encode('utf-8')
+
+
+def test_serializer_unsupported():
+    """
+    Ensures values the fast encoder rejects fall back to the stdlib
+    """
+    assert Serializer().dumps([2 ** 70]) == json.dumps([2 ** 70], indent=2)
+    assert Serializer().dumpb({1: 2 ** 70}) == b'{\n  "1": %d\n}' % 2 ** 70
+
+
+@mark.parametrize('compact', [False, True])
+@mark.parametrize('number', [0.1, 1.0, -2.5, 1e16, -1e16, 1.5e-7, 1e-4,
+                             123456789.125, 5e-324, 1.7976931348623157e308])
+def test_serializer_floats(compact, number):
+    """
+    Ensures floats are encoded like the stdlib does
+    """
+    serializer = Serializer(compact=compact)
+    expected = serializer.stdlib({'float': [number, number]})
+    assert serializer.dumps({'float': [number, number]}) == expected
+    assert serializer.dumpb({'float': [number, number]}) == \
+        expected.encode('utf-8')
+
+
+def test_serializer_floats_strings():
+    """
+    Ensures strings looking like exponents are still encoded by orjson
+    """
+    serializer = Serializer(compact=True)
+    assert serializer.fast_dumps(['1902cceb3e18', 'a 1e5']) is not None
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from storyscript.SourceMap import SourceMap
+
+
+def line(ln, src):
+    return {'method': 'execute', 'ln': ln, 'next': None, 'src': src}
+
+
+def bundle():
+    return {'stories': {
+        'a.story': {'tree': {'1.1': line('1.1', None),
+                             '1': line('1', 'a = b.c()'),
+                             '2': line('2', 'alpine echo')},
+                    'services': ['alpine']},
+        'b.story': {'tree': {}}
+    }, 'services': ['alpine'], 'entrypoint': ['a.story']}
+
+
+def test_source_map_strip():
+    source_map = SourceMap()
+    result = source_map.strip(bundle())
+    tree = result['stories']['a.story']['tree']
+    assert tree['1.1'] == {'method': 'execute', 'ln': '1.1', 'next': None}
+    assert 'src' not in tree['1']
+    assert 'src' not in tree['2']
+    assert result['stories']['a.story']['services'] == ['alpine']
+    assert result['stories']['b.story'] == {'tree': {}}
+    assert result['entrypoint'] == ['a.story']
+    assert source_map.output() == {'version': 1, 'stories': {
+        'a.story': {'1': 'a = b.c()', '2': 'alpine echo'}}}
+
+
+def test_source_map_strip_copies():
+    compiled = bundle()
+    SourceMap().strip(compiled)
+    assert compiled == bundle()
+
+
+def test_source_map_source():
+    source_map = SourceMap()
+    source_map.strip(bundle())
+    output = source_map.output()
+    assert SourceMap.source(output, 'a.story', '1.1') == 'a = b.c()'
+    assert SourceMap.source(output, 'a.story', '2') == 'alpine echo'
+    assert SourceMap.source(output, 'a.story', '3') is None
+    assert SourceMap.source(output, 'b.story', '1') is None
+
+
+def test_source_map_strip_linear():
+    source_map = SourceMap()
+    story = bundle()['stories']['a.story']
+    story['tree'] = list(story['tree'].values())
+    result = source_map.strip_story('a.story', story)
+    assert result['tree'][0] == {'method': 'execute', 'ln': '1.1',
+                                 'next': None}
+    assert source_map.stories == {
+        'a.story': {'1': 'a = b.c()', '2': 'alpine echo'}}
@@ -6,6 +6,7 @@ from lark.exceptions import UnexpectedInput, UnexpectedToken
 
 from pytest import fixture, mark, raises
 
+from storyscript.Limits import Limits
 from storyscript.Story import Story
 from storyscript.compiler import Compiler
 from storyscript.compiler.lowering.Lowering import Lowering
@@ -34,6 +35,13 @@ def compiler(patch, story):
 def test_story_init(story):
     assert story.story == 'story'
     assert story.path is None
+    assert isinstance(story.limits, Limits)
+
+
+def test_story_init_limits():
+    limits = Limits()
+    story = Story('story', features=None, limits=limits)
+    assert story.limits is limits
 
 
 def test_story_init_path():
@@ -73,7 +81,7 @@ def test_story_from_stream(patch, magic):
     patch.init(Story)
     stream = magic()
     result = Story.from_stream(stream, features=None)
-    Story.__init__.assert_called_with(stream.read(), None)
+    Story.__init__.assert_called_with(stream.read(), None, profiler=None)
     assert isinstance(result, Story)
 
 
@@ -86,23 +94,45 @@ def test_story_error(patch, story):
 
 def test_story_parse(patch, story, parser):
     story.parse(parser=parser)
-    parser.parse.assert_called_with(story.story)
+    parser.parse.assert_called_with(story.story, profiler=story.profiler,
+                                    limits=story.limits)
     assert story.tree == Parser.parse()
 
 
 def test_story_parse_debug(patch, story, parser):
     story.parse(parser=parser)
-    parser.parse.assert_called_with(story.story)
+    parser.parse.assert_called_with(story.story, profiler=story.profiler,
+                                    limits=story.limits)
 
 
 def test_story_parse_lower(patch, story, parser):
     patch.object(Lowering, 'process')
     story.parse(parser=parser, lower=True)
-    parser.parse.assert_called_with(story.story)
+    parser.parse.assert_called_with(story.story, profiler=story.profiler,
+                                    limits=story.limits)
     Lowering.process.assert_called_with(Parser.parse())
     assert story.tree == Lowering.process(Lowering.process())
 
 
+def test_story_parse_source_lines(patch, magic, story, parser):
+    story.profiler = magic()
+    story.parse(parser=parser)
+    story.profiler.count.assert_called_with('source_lines', len(story.lines))
+
+
+def test_story_parse_limits(patch, story, parser):
+    """
+    Ensures Story.parse checks the size of the source before parsing.
+    """
+    patch.object(Limits, 'check_source',
+                 side_effect=CompilerError('limit_source_bytes'))
+    patch.object(Story, 'error', return_value=Exception('error'))
+    with raises(Exception):
+        story.parse(parser=parser)
+    Limits.check_source.assert_called_with(story.story)
+    parser.parse.assert_not_called()
+
+
 @mark.parametrize('error', [
     UnexpectedToken('token', 'expected'),
     UnexpectedInput('token', 'expected'),
@@ -124,12 +154,12 @@ def test_story_modules(magic, story):
     story.tree = magic()
     story.tree.find_data.return_value = [import_tree]
     result = story.modules()
-    assert result == [import_tree.string.child().value[1:-1]]
+    assert result == [import_tree.string.child().value]
 
 
 def test_story_modules_no_extension(magic, story):
     import_tree = magic()
-    import_tree.string.child.return_value = magic(value='"hello"')
+    import_tree.string.child.return_value = magic(value='hello')
     story.tree = magic()
     story.tree.find_data.return_value = [import_tree]
     result = story.modules()
@@ -138,10 +168,35 @@ def test_story_modules_no_extension(magic, story):
 
 def test_story_compile(patch, story, compiler):
     story.compile()
-    Compiler.compile.assert_called_with(story.tree, story=story, features=None)
+    Compiler.compile.assert_called_with(story.tree, story=story,
+                                        features=None,
+                                        profiler=story.profiler,
+                                        limits=story.limits, errors=None,
+                                        warnings=[])
     assert story.compiled == Compiler.compile()
 
 
+def test_story_compile_errors(patch, story, compiler):
+    """
+    Ensures Story.compile collects the errors of independent blocks and
+    raises the first of them
+    """
+    first = CompilerError('first')
+    last = CompilerError('last')
+
+    def compile(*args, errors, **kwargs):
+        errors.append(first)
+        raise last
+
+    Compiler.compile.side_effect = compile
+    patch.object(Story, 'error', side_effect=lambda error: error)
+    errors = ['previous']
+    with raises(CompilerError) as e:
+        story.compile(errors=errors)
+    assert errors == ['previous', first, last]
+    assert e.value is first
+
+
 @mark.parametrize('error', [StorySyntaxError('error'), CompilerError('error')])
 def test_story_compiler_error(patch, story, compiler, error):
     """
@@ -185,6 +240,39 @@ def test_story_process(patch, story):
     assert result == story.compiled
 
 
+def test_story_check(patch, story, parser):
+    patch.object(Story, 'parse')
+    patch.object(Compiler, 'generate')
+    patch.object(Compiler, 'compile')
+    story.tree = 'tree'
+    story.check(parser=parser)
+    story.parse.assert_called_with(parser=parser)
+    Compiler.generate.assert_called_with('tree', story.features,
+                                         profiler=story.profiler,
+                                         limits=story.limits, errors=None,
+                                         warnings=[])
+    Compiler.compile.assert_not_called()
+    assert story.tree == Compiler.generate()
+
+
+def test_story_check_syntax_only(patch, story, parser):
+    patch.object(Story, 'parse')
+    patch.object(Compiler, 'generate')
+    story.check(parser=parser, syntax_only=True)
+    story.parse.assert_called_with(parser=parser)
+    Compiler.generate.assert_not_called()
+
+
+def test_story_check_error(patch, story, parser):
+    patch.object(Story, 'parse')
+    patch.object(Story, 'error', return_value=Exception('error'))
+    patch.object(Compiler, 'generate', side_effect=CompilerError(None))
+    story.tree = 'tree'
+    with raises(Exception):
+        story.check(parser=parser)
+    Story.error.assert_called_with(Compiler.generate.side_effect)
+
+
 def test_story_process_parser(patch, story, parser):
     patch.many(Story, ['parse', 'compile'])
     story.compiled = 'compiled'
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
-from storyscript import load, load_map, loads, version
+import storyscript
+from storyscript import Api as StoryscriptApi, load, load_map, loads, version
 from storyscript.Api import Api
-from storyscript.Version import version as real_version
+from storyscript.Version import get_version
 
 
 def test_storyscript_load():
@@ -17,4 +18,9 @@ def test_storyscript_load_map():
 
 
 def test_storyscript_version():
-    assert version == real_version
+    assert version == get_version()
+
+
+def test_storyscript_api():
+    assert StoryscriptApi is Api
+    assert storyscript.Api is Api
@@ -3,23 +3,16 @@ import io
 import subprocess
 from unittest import mock
 
-import pkg_resources
+from pytest import fixture, raises
 
 from storyscript import Version
 
 
-def test_git_version(patch):
-    patch.object(subprocess, 'run')
-    r = Version.git_version()
-    subprocess.run.assert_called_with(
-        ['git', 'describe', '--abbrev=0', '--tags'],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.DEVNULL,
-        universal_newlines=True,
-        check=True,
-        cwd=mock.ANY,
-    )
-    assert r == subprocess.run().stdout.strip()
+@fixture
+def versions():
+    Version.versions.cache_clear()
+    yield
+    Version.versions.cache_clear()
 
 
 def test_git_describe(patch):
@@ -49,12 +42,11 @@ def test_read_version_file(patch):
 
 
 def test_read_version_package(patch):
-    patch.object(pkg_resources, 'resource_string')
+    patch.object(Version, 'read_version_file', side_effect=Exception())
+    patch.object(Version, 'get_data')
     r = Version.read_version()
-    pkg_resources.resource_string.assert_called_with(
-        'storyscript', 'VERSION'
-    )
-    assert r == pkg_resources.resource_string().decode('utf8').strip()
+    Version.get_data.assert_called_with('storyscript', 'VERSION')
+    assert r == Version.get_data().decode('utf8').strip()
 
 
 def test_read_version(patch):
@@ -69,25 +61,57 @@ def test_read_version(patch):
     assert Version.read_version() is None
 
 
-def test_get_version(patch):
-    patch.object(Version, '_version')
-    assert Version.get_version() == Version._version
+def test_release():
+    assert Version.release('0.9.0') == '0.9.0'
+    assert Version.release('0.9.0-dirty') == '0.9.0'
+    assert Version.release('0.9.0-3-gc0ffee') == '0.9.0'
+    assert Version.release('0.9.0-3-gc0ffee-dirty') == '0.9.0'
 
-    patch.object(Version, 'git_describe')
-    Version._version = None
-    assert Version.get_version() == Version.git_describe()
 
-    Version.git_describe.side_effect = Exception('.no.file.found.')
-    assert Version.get_version() == '0.0.0'
+def test_versions(patch, versions):
+    patch.object(Version, 'read_version', return_value='1.0')
+    assert Version.versions() == ('1.0', '1.0')
+
+
+def test_versions_git(patch, versions):
+    patch.many(Version, ['read_version', 'git_describe', 'release'])
+    Version.read_version.return_value = None
+    result = Version.versions()
+    Version.release.assert_called_with(Version.git_describe())
+    assert result == (Version.git_describe(), Version.release())
+
+
+def test_versions_fallback(patch, versions):
+    patch.object(Version, 'read_version', return_value=None)
+    patch.object(Version, 'git_describe', side_effect=Exception('no git'))
+    assert Version.versions() == ('0.0.0', '0.0.0')
+
+
+def test_versions_cached(patch, versions):
+    patch.object(Version, 'read_version', return_value=None)
+    patch.object(Version, 'git_describe', return_value='0.9.0')
+    Version.versions()
+    Version.versions()
+    assert Version.git_describe.call_count == 1
+
+
+def test_get_version(patch):
+    patch.object(Version, 'versions', return_value=('a', 'b'))
+    assert Version.get_version() == 'a'
 
 
 def test_get_release_version(patch):
-    patch.object(Version, '_version')
-    assert Version.get_release_version() == Version._version
+    patch.object(Version, 'versions', return_value=('a', 'b'))
+    assert Version.get_release_version() == 'b'
+
+
+def test_version_constants(patch):
+    patch.object(Version, 'versions', return_value=('a', 'b'))
+    from storyscript.Version import release_version, version
+    assert version == 'a'
+    assert release_version == 'b'
 
-    patch.object(Version, 'git_version')
-    Version._version = None
-    assert Version.get_release_version() == Version.git_version()
 
-    Version.git_version.side_effect = Exception('.no.file.found.')
-    assert Version.get_release_version() == '0.0.0'
+def test_version_unknown():
+    with raises(AttributeError):
+        Version.unknown
@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
+from unittest.mock import ANY
 
+from storyscript.Features import Features
 from storyscript.compiler import Compiler
+from storyscript.compiler.binary import BinaryEncoder
 from storyscript.compiler.json import JSONCompiler
 from storyscript.compiler.lowering import Lowering
+from storyscript.compiler.optimizer import ConstantFolding, Independence, \
+    Inlining, Liveness
 from storyscript.compiler.semantics import Semantics
 
 
@@ -13,17 +18,117 @@ def test_compiler_generate(patch, magic):
     patch.many(JSONCompiler, ['compile'])
     tree = magic()
     result = Compiler.generate(tree, features=None)
-    Lowering.__init__.assert_called_with(parser=tree.parser, features=None)
+    Lowering.__init__.assert_called_with(parser=tree.parser, features=None,
+                                         profiler=ANY, limits=None)
     Lowering.process.assert_called_with(tree)
     Semantics.process.assert_called_with(Lowering.process())
     assert result == Semantics.process()
 
 
+def test_compiler_generate_warnings(patch, magic):
+    patch.init(Lowering)
+    patch.object(Lowering, 'process')
+    patch.init(Semantics)
+    patch.object(Semantics, 'process')
+    limits = magic()
+    Compiler.generate(magic(), features=None, limits=limits, errors=[],
+                      warnings=[])
+    Semantics.__init__.assert_called_with(features=None, profiler=ANY,
+                                          errors=[], warnings=[],
+                                          limits=limits)
+
+
 def test_compiler_compile(patch, magic):
     patch.object(Compiler, 'generate')
     patch.object(JSONCompiler, 'compile')
     tree = magic()
     result = Compiler.compile(tree, story=None, features=None)
-    Compiler.generate.assert_called_with(tree, None)
-    JSONCompiler.compile.assert_called_with(Compiler.generate())
+    Compiler.generate.assert_called_with(tree, None, profiler=ANY,
+                                         limits=None, errors=None,
+                                         warnings=None)
+    JSONCompiler.compile.assert_called_with(Compiler.generate(),
+                                            linear=False, passes=[])
     assert result == JSONCompiler.compile()
+
+
+def test_compiler_compile_linear(patch, magic):
+    patch.object(Compiler, 'generate')
+    patch.object(JSONCompiler, 'compile')
+    features = Features({'linear': True})
+    Compiler.compile(magic(), story=None, features=features)
+    JSONCompiler.compile.assert_called_with(Compiler.generate(), linear=True,
+                                            passes=[])
+
+
+def test_compiler_passes():
+    assert Compiler.passes(None, None) == []
+    assert Compiler.passes(Features({}), None) == []
+
+
+def test_compiler_passes_fold_constants(magic):
+    profiler = magic()
+    features = Features({'fold_constants': True})
+    passes = Compiler.passes(features, profiler)
+    assert len(passes) == 1
+    assert isinstance(passes[0], ConstantFolding)
+    assert passes[0].profiler == profiler
+
+
+def test_compiler_passes_inline_temporaries(magic):
+    features = Features({'fold_constants': True, 'inline_temporaries': True})
+    passes = Compiler.passes(features, magic())
+    assert [type(p) for p in passes] == [ConstantFolding, Inlining]
+
+
+def test_compiler_passes_release_hints(magic):
+    features = Features({'release_hints': True})
+    passes = Compiler.passes(features, magic())
+    assert [type(p) for p in passes] == [Liveness]
+
+
+def test_compiler_passes_parallel_groups(magic):
+    features = Features({'parallel_groups': True})
+    passes = Compiler.passes(features, magic())
+    assert [type(p) for p in passes] == [Independence]
+
+
+def test_compiler_compile_binary(patch, magic):
+    patch.object(Compiler, 'generate')
+    patch.object(JSONCompiler, 'compile')
+    patch.object(BinaryEncoder, 'encode')
+    result = Compiler.compile(magic(), story=None, features=None,
+                              backend='binary')
+    BinaryEncoder.encode.assert_called_with(JSONCompiler.compile())
+    assert result == BinaryEncoder.encode()
+
+
+def test_compiler_compile_profiler(patch, magic):
+    patch.object(Compiler, 'generate')
+    patch.object(JSONCompiler, 'compile')
+    profiler = magic()
+    Compiler.compile(magic(), story=None, features=None, profiler=profiler)
+    assert Compiler.generate.call_args[1]['profiler'] == profiler
+    profiler.span.assert_called_with('JSONCompiler')
+
+
+def test_compiler_generate_profiler(patch, magic):
+    patch.init(Lowering)
+    patch.object(Lowering, 'process')
+    patch.object(Semantics, 'process')
+    profiler = magic()
+    Compiler.generate(magic(), features=None, profiler=profiler)
+    assert Lowering.__init__.call_args[1]['profiler'] == profiler
+    spans = [c[0][0] for c in profiler.span.call_args_list]
+    assert spans == ['lowering', 'semantics']
+
+
+def test_compiler_generate_counts(patch, magic):
+    patch.init(Lowering)
+    patch.object(Lowering, 'process')
+    patch.object(Semantics, 'process')
+    profiler = magic()
+    tree = magic()
+    Compiler.generate(tree, features=None, profiler=profiler)
+    profiler.count.assert_any_call('nodes', tree.count_nodes())
+    profiler.count.assert_any_call('lowered_nodes',
+                                   Lowering.process().count_nodes())
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from pytest import mark, raises
+
+from storyscript.compiler.binary import BinaryEncoder
+
+
+@mark.parametrize('number, expected', [
+    (0, b'\x00'), (127, b'\x7f'), (128, b'\x80\x01'), (300, b'\xac\x02')
+])
+def test_binary_encoder_varint(number, expected):
+    data = bytearray()
+    BinaryEncoder.varint(data, number)
+    assert data == expected
+
+
+@mark.parametrize('string, expected', [
+    ('1', True), ('12.1', True), ('0.0.3', True), ('', False), ('01', False),
+    ('1.', False), ('a', False), ('1.01', False), ('1\n', False)
+])
+def test_binary_encoder_is_line(string, expected):
+    assert BinaryEncoder().is_line(string) is expected
+
+
+def test_binary_encoder_encode():
+    result = BinaryEncoder().encode({'a': ['b', 'a', '1.2', 3]})
+    assert result == (b'SSB\x01' + b'\x02\x01a\x01b' + b'\x07\x01' +
+                      b'\x05\x00' + b'\x06\x04\x05\x01\x05\x00' +
+                      b'\x08\x02\x01\x02' + b'\x03\x06')
+
+
+@mark.parametrize('value, expected', [
+    (None, b'\x00'), (False, b'\x01'), (True, b'\x02'), (-1, b'\x03\x01'),
+    (1.5, b'\x04?\xf8\x00\x00\x00\x00\x00\x00'), ((), b'\x06\x00')
+])
+def test_binary_encoder_encode_values(value, expected):
+    assert BinaryEncoder().encode(value) == b'SSB\x01\x00' + expected
+
+
+def test_binary_encoder_encode_interned():
+    """
+    Ensures the most frequent strings get the first indices
+    """
+    result = BinaryEncoder().encode(['a', 'b', 'b'])
+    assert result.startswith(b'SSB\x01\x02\x01b\x01a')
+
+
+def test_binary_encoder_encode_unsupported():
+    with raises(TypeError):
+        BinaryEncoder().encode({'a': object()})
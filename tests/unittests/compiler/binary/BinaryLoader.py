@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from pytest import mark, raises
+
+from storyscript.compiler.binary import BinaryEncoder, BinaryLoader
+
+
+@mark.parametrize('value', [
+    None, True, False, 0, -1, 2 ** 70, -2 ** 70, 1.5, 'caf\xe9', '12.1',
+    [], {}, {'1': {'method': 'execute', 'next': '1.2', 'args': [1, 'a']}},
+])
+def test_binary_loader_load(value):
+    assert BinaryLoader.load(BinaryEncoder().encode(value)) == value
+
+
+def test_binary_loader_load_tuple():
+    assert BinaryLoader.load(BinaryEncoder().encode((1, 2))) == [1, 2]
+
+
+@mark.parametrize('data, message', [
+    (b'{}', 'Not a compiled story'),
+    (b'SSB\x01\x00', 'Truncated compiled story'),
+    (b'SSB\x01\x00\x06\x02\x00', 'Truncated compiled story'),
+    (b'SSB\x01\x00\x09', 'Unknown tag 9 at byte 5'),
+    (b'SSB\x01\x00\x00\x00', 'Extra data after byte 6'),
+])
+def test_binary_loader_load_malformed(data, message):
+    with raises(ValueError) as e:
+        BinaryLoader.load(data)
+    assert str(e.value) == message
@@ -3,7 +3,7 @@ from lark.lexer import Token
 
 from pytest import fixture, mark, raises
 
-from storyscript.Version import version
+from storyscript.Version import get_version
 from storyscript.compiler.json import JSONCompiler, Lines, Objects
 from storyscript.exceptions import StorySyntaxError
 from storyscript.parser import Tree
@@ -84,7 +84,7 @@ def test_compiler_imports(patch, compiler, lines, tree):
     compiler.lines.modules = {}
     compiler.imports(tree, '1')
     module = tree.child(1).value
-    assert lines.modules[module] == tree.string.child(0).value[1:-1]
+    assert lines.modules[module] == tree.string.child(0).value
 
 
 def test_compiler_absolute_expression(patch, compiler, lines, tree):
@@ -852,7 +852,38 @@ def test_compiler_compile(patch, magic):
     result = JSONCompiler(story=None).compile(tree)
     JSONCompiler.parse_tree.assert_called_with(tree)
     lines = JSONCompiler(story=None).lines
-    expected = {'tree': lines.lines, 'version': version,
+    expected = {'tree': lines.lines, 'version': get_version(),
                 'services': lines.get_services(), 'functions': lines.functions,
                 'entrypoint': lines.entrypoint(), 'modules': lines.modules}
     assert result == expected
+
+
+def test_compiler_compile_passes(patch, magic):
+    patch.many(JSONCompiler, ['parse_tree'])
+    optimizer = magic()
+    compiler = JSONCompiler(story=None)
+    compiler.compile(magic(), passes=[optimizer])
+    optimizer.process.assert_called_with(compiler.lines)
+
+
+def test_compiler_compile_linear(patch, magic):
+    patch.many(JSONCompiler, ['parse_tree'])
+    compiler = JSONCompiler(story=None)
+    compiler.lines.lines = {'1': {'ln': '1', 'next': '2'},
+                            '2': {'ln': '2', 'method': 'function'}}
+    compiler.lines._lines = ['1', '2']
+    compiler.lines.functions = {'f': '2'}
+    result = compiler.compile(magic(), linear=True)
+    assert result['tree'] == [{'ln': '1', 'next': 1},
+                              {'ln': '2', 'method': 'function'}]
+    assert result['lines'] == {'1': 0, '2': 1}
+    assert result['entrypoint'] == 0
+    assert result['functions'] == {'f': 1}
+
+
+def test_compiler_compile_linear_empty(patch, magic):
+    patch.many(JSONCompiler, ['parse_tree'])
+    result = JSONCompiler(story=None).compile(magic(), linear=True)
+    assert result['tree'] == []
+    assert result['lines'] == {}
+    assert result['entrypoint'] is None
@@ -26,6 +26,50 @@ def test_lines_first(patch, lines):
     assert lines.first() == '1'
 
 
+def test_lines_instructions(lines):
+    lines.lines = {'1': {'ln': '1', 'enter': '1.1', 'next': '1.1'},
+                   '1.1': {'ln': '1.1', 'parent': '1', 'next': '2'},
+                   '2': {'ln': '2', 'exit': None}}
+    lines._lines = ['1', '1.1', '2']
+    instructions, index = lines.instructions()
+    assert instructions == [{'ln': '1', 'enter': 1, 'next': 1},
+                            {'ln': '1.1', 'parent': 0, 'next': 2},
+                            {'ln': '2', 'exit': None}]
+    assert index == {'1': 0, '1.1': 1, '2': 2}
+    assert lines.lines['1'] == {'ln': '1', 'enter': '1.1', 'next': '1.1'}
+
+
+def test_lines_instructions_parallel(lines):
+    lines.lines = {'1': {'ln': '1', 'next': '2', 'parallel': ['1', '2']},
+                   '2': {'ln': '2'}}
+    lines._lines = ['1', '2']
+    instructions, index = lines.instructions()
+    assert instructions[0]['parallel'] == [0, 1]
+    assert lines.lines['1']['parallel'] == ['1', '2']
+
+
+def test_lines_remove(lines):
+    lines.lines = {'1': {'ln': '1', 'enter': '2.1', 'exit': '3.2'},
+                   '2.1': {'ln': '2.1', 'parent': '1', 'next': '2'},
+                   '2': {'ln': '2', 'parent': '1', 'next': '3.2'},
+                   '3.2': {'ln': '3.2', 'next': '3.1'},
+                   '3.1': {'ln': '3.1', 'next': '3'},
+                   '3': {'ln': '3'}}
+    lines._lines = ['1', '2.1', '2', '3.2', '3.1', '3']
+    lines.remove({'2.1': '2', '3.2': '3.1', '3.1': '3'})
+    assert lines._lines == ['1', '2', '3']
+    assert lines.lines == {'1': {'ln': '1', 'enter': '2', 'exit': '3'},
+                           '2': {'ln': '2', 'parent': '1', 'next': '3'},
+                           '3': {'ln': '3'}}
+
+
+def test_lines_remove_none(lines):
+    lines.lines = {'1': {'ln': '1'}}
+    lines._lines = ['1']
+    lines.remove({})
+    assert lines.lines == {'1': {'ln': '1'}}
+
+
 def test_lines_first_none(lines):
     assert lines.first() is None
 
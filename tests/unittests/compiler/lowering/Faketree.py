@@ -152,6 +152,26 @@ def test_faketree_add_assignment(patch, fake_tree, block):
     assert result.children == [name]
 
 
+def test_faketree_add_assignment_limits(patch, magic, block):
+    patch.object(FakeTree, 'assignment')
+    patch.object(FakeTree, 'find_insert_pos', return_value=0)
+    limits = magic()
+    fake_tree = FakeTree(block, limits=limits)
+    block.children = [1]
+    fake_tree.add_assignment('value', original_line=10)
+    limits.temporary.assert_called_with('value')
+
+
+def test_faketree_add_assignment_count(patch, magic, block):
+    patch.object(FakeTree, 'assignment')
+    patch.object(FakeTree, 'find_insert_pos', return_value=0)
+    profiler = magic()
+    fake_tree = FakeTree(block, profiler=profiler)
+    block.children = [1]
+    fake_tree.add_assignment('value', original_line=10)
+    profiler.count.assert_called_with('temporaries')
+
+
 def test_faketree_add_assignment_more_children(patch, fake_tree, block):
     patch.object(FakeTree, 'assignment')
     patch.object(FakeTree, 'find_insert_pos', return_value=0)
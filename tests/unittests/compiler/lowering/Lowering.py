@@ -23,8 +23,10 @@ def entity(magic):
 
 def test_preprocessor_fake_tree(patch):
     patch.init(FakeTree)
-    result = Lowering.fake_tree('block')
-    FakeTree.__init__.assert_called_with('block')
+    lowering = Lowering(parser=None, features=None, limits='limits')
+    result = lowering.fake_tree('block')
+    FakeTree.__init__.assert_called_with('block', limits='limits',
+                                         profiler=lowering.profiler)
     assert isinstance(result, FakeTree)
 
 
@@ -72,6 +74,23 @@ def test_preprocessor_process(patch, magic, preprocessor):
         preprocessor.replace_expression, parent=None)
 
 
+def test_preprocessor_process_profiler(patch, magic, preprocessor):
+    """
+    Check that process times every sub-pass
+    """
+    patch.many(Lowering, ['visit_concise_when', 'visit_cmp_expr',
+                          'visit_as_expr', 'visit_arguments',
+                          'visit_assignment', 'visit_string_templates',
+                          'visit_function_dot', 'visit'])
+    preprocessor.profiler = magic()
+    preprocessor.process(magic())
+    spans = [c[0][0] for c in preprocessor.profiler.span.call_args_list]
+    assert spans == ['lowering.concise_when', 'lowering.cmp_expr',
+                     'lowering.as_expr', 'lowering.arguments',
+                     'lowering.assignment', 'lowering.string_templates',
+                     'lowering.function_dot', 'lowering.inline_expressions']
+
+
 def test_preprocessor_is_inline_expression(magic):
     """
     Check that inline_expressions are correctly detected
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture, mark
+
+from storyscript.compiler.json.Lines import Lines
+from storyscript.compiler.optimizer import ConstantFolding
+
+
+@fixture
+def folding():
+    return ConstantFolding()
+
+
+def literal(kind, value):
+    return {'$OBJECT': kind, kind: value}
+
+
+def expression(name, *values):
+    return {'$OBJECT': 'expression', 'expression': name,
+            'values': list(values)}
+
+
+def path(name):
+    return {'$OBJECT': 'path', 'paths': [name]}
+
+
+def cast(value, type):
+    return {'$OBJECT': 'type_cast', 'value': value,
+            'type': {'$OBJECT': 'type', 'type': type}}
+
+
+def test_constantfolding_init(magic):
+    profiler = magic()
+    folding = ConstantFolding(profiler=profiler)
+    assert folding.profiler == profiler
+    assert folding.constants == {}
+    assert folding.folded == 0
+
+
+def test_constantfolding_init_profiler(folding):
+    assert folding.profiler.enabled is False
+
+
+def test_constantfolding_assignments():
+    lines = {
+        '1': {'method': 'expression', 'name': ['a']},
+        '2': {'method': 'expression', 'name': ['a', 'b']},
+        '3': {'method': 'for', 'output': ['i']},
+        '4': {'method': 'function', 'output': ['int'], 'args': [
+            {'$OBJECT': 'arg', 'name': 'n'}]},
+        '5': {'method': 'execute', 'name': None},
+    }
+    result = ConstantFolding.assignments(lines)
+    assert result == {'a': 2, 'i': 1, 'int': 1, 'n': 1}
+
+
+@mark.parametrize('name, values, result', [
+    ('sum', [literal('int', 1), literal('int', 2)], literal('int', 3)),
+    ('sum', [literal('float', 1.5), literal('float', 2.0)],
+     literal('float', 3.5)),
+    ('sum', [literal('string', 'a'), literal('string', 'b')],
+     literal('string', 'ab')),
+    ('subtraction', [literal('int', 1), literal('int', 3)],
+     literal('int', -2)),
+    ('multiplication', [literal('int', 2), literal('int', 3),
+                        literal('int', 4)], literal('int', 24)),
+    ('modulus', [literal('int', 5), literal('int', 3)], literal('int', 2)),
+    ('exponential', [literal('int', 2), literal('int', 10)],
+     literal('int', 1024)),
+    ('and', [literal('boolean', True), literal('boolean', False)],
+     literal('boolean', False)),
+    ('or', [literal('boolean', True), literal('boolean', False)],
+     literal('boolean', True)),
+    ('not', [literal('boolean', True)], literal('boolean', False)),
+    ('equal', [literal('string', 'a'), literal('string', 'a')],
+     literal('boolean', True)),
+    ('less', [literal('int', 2), literal('int', 1)],
+     literal('boolean', False)),
+    ('less_equal', [literal('float', 1.0), literal('float', 1.0)],
+     literal('boolean', True)),
+])
+def test_constantfolding_operation(folding, name, values, result):
+    assert folding.operation(name, values) == result
+
+
+@mark.parametrize('name, values', [
+    ('sum', [literal('int', 1), literal('float', 2.0)]),
+    ('sum', [literal('boolean', True), literal('boolean', True)]),
+    ('subtraction', [literal('string', 'a'), literal('string', 'b')]),
+    ('multiplication', [literal('float', 1e308), literal('float', 10.0)]),
+    ('division', [literal('int', 4), literal('int', 2)]),
+    ('modulus', [literal('int', -5), literal('int', 3)]),
+    ('modulus', [literal('int', 5), literal('int', 0)]),
+    ('modulus', [literal('float', 5.0), literal('float', 3.0)]),
+    ('exponential', [literal('int', 2), literal('int', -1)]),
+    ('exponential', [literal('int', 2), literal('int', 100)]),
+    ('exponential', [literal('int', 2), literal('int', 63)]),
+    ('exponential', [literal('float', 2.0), literal('float', 2.0)]),
+    ('sum', [literal('int', 2 ** 63 - 1), literal('int', 1)]),
+    ('subtraction', [literal('int', -2 ** 63), literal('int', 1)]),
+    ('multiplication', [literal('int', 2 ** 32), literal('int', 2 ** 31)]),
+    ('not', [literal('int', 1)]),
+    ('less', [literal('boolean', True), literal('boolean', False)]),
+    ('unknown', [literal('int', 1), literal('int', 1)]),
+])
+def test_constantfolding_operation_unfolded(folding, name, values):
+    assert folding.operation(name, values) is None
+
+
+def test_constantfolding_fits():
+    assert ConstantFolding.fits('int', 2 ** 63 - 1) is True
+    assert ConstantFolding.fits('int', -2 ** 63) is True
+    assert ConstantFolding.fits('int', 2 ** 63) is False
+    assert ConstantFolding.fits('int', -2 ** 63 - 1) is False
+    assert ConstantFolding.fits('string', 'a' * 100) is True
+
+
+@mark.parametrize('value, type, result', [
+    (literal('int', 1), 'string', literal('string', '1')),
+    (literal('int', 1), 'float', literal('float', 1.0)),
+    (literal('string', 'a'), 'string', literal('string', 'a')),
+])
+def test_constantfolding_cast(folding, value, type, result):
+    assert folding.cast(value, {'$OBJECT': 'type', 'type': type}) == result
+
+
+@mark.parametrize('value, type', [
+    (literal('float', 1.5), 'string'),
+    (literal('boolean', True), 'string'),
+    (literal('string', '1'), 'int'),
+    (literal('float', 1.5), 'int'),
+])
+def test_constantfolding_cast_unfolded(folding, value, type):
+    assert folding.cast(value, {'$OBJECT': 'type', 'type': type}) is None
+
+
+def test_constantfolding_fold(folding):
+    value = expression('sum', literal('int', 1),
+                       expression('multiplication', literal('int', 2),
+                                  literal('int', 3)))
+    assert folding.fold(value) == literal('int', 7)
+    assert folding.folded == 2
+
+
+def test_constantfolding_fold_cast(folding):
+    value = expression('sum', literal('string', 'a'),
+                       cast(literal('int', 1), 'string'))
+    assert folding.fold(value) == literal('string', 'a1')
+
+
+def test_constantfolding_fold_partial(folding):
+    value = expression('sum', path('a'),
+                       expression('sum', literal('int', 1),
+                                  literal('int', 2)))
+    assert folding.fold(value) == expression('sum', path('a'),
+                                             literal('int', 3))
+    assert folding.folded == 1
+
+
+def test_constantfolding_fold_list(folding):
+    value = [{'$OBJECT': 'arg', 'name': 'x',
+              'arg': expression('not', literal('boolean', False))}]
+    assert folding.fold(value) == [{'$OBJECT': 'arg', 'name': 'x',
+                                    'arg': literal('boolean', True)}]
+
+
+def test_constantfolding_fold_path(folding):
+    folding.constants['a'] = literal('int', 1)
+    result = folding.fold(path('a'))
+    assert result == literal('int', 1)
+    assert result is not folding.constants['a']
+    assert folding.folded == 1
+
+
+def test_constantfolding_fold_path_nested(folding):
+    folding.constants['a'] = literal('int', 1)
+    value = {'$OBJECT': 'path', 'paths': ['a', 'b']}
+    assert folding.fold(value) == value
+
+
+def test_constantfolding_process(magic):
+    profiler = magic()
+    lines = Lines(story=None)
+    lines.lines = {
+        '1': {'method': 'expression', 'name': ['a'], 'args': [
+            expression('sum', literal('int', 1), literal('int', 2))]},
+        '2': {'method': 'expression', 'name': ['b'], 'args': [
+            expression('sum', path('a'), literal('int', 1))]},
+        '3': {'method': 'execute', 'name': None, 'args': [
+            {'$OBJECT': 'arg', 'name': 'x', 'arg': path('b')}]},
+        '4': {'method': 'return', 'args': None},
+    }
+    ConstantFolding(profiler=profiler).process(lines)
+    assert lines.lines['1']['args'] == [literal('int', 3)]
+    assert lines.lines['2']['args'] == [literal('int', 4)]
+    assert lines.lines['3']['args'][0]['arg'] == literal('int', 4)
+    profiler.span.assert_called_with('constant_folding')
+    profiler.count.assert_called_with('folded_constants', 4)
+
+
+def test_constantfolding_process_reassigned():
+    lines = Lines(story=None)
+    lines.lines = {
+        '1': {'method': 'expression', 'name': ['a'],
+              'args': [literal('int', 1)]},
+        '2': {'method': 'expression', 'name': ['a'],
+              'args': [expression('sum', path('a'), literal('int', 1))]},
+        '3': {'method': 'expression', 'name': ['b'], 'args': [path('a')]},
+    }
+    ConstantFolding().process(lines)
+    assert lines.lines['3']['args'] == [path('a')]
+
+
+def test_constantfolding_process_before_assignment():
+    lines = Lines(story=None)
+    lines.lines = {
+        '1': {'method': 'expression', 'name': ['b'], 'args': [path('a')]},
+        '2': {'method': 'expression', 'name': ['a'],
+              'args': [literal('int', 1)]},
+    }
+    ConstantFolding().process(lines)
+    assert lines.lines['1']['args'] == [path('a')]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture
+
+from storyscript.compiler.json.Lines import Lines
+from storyscript.compiler.optimizer import Independence
+
+
+@fixture
+def independence():
+    return Independence()
+
+
+def path(*names):
+    return {'$OBJECT': 'path', 'paths': list(names)}
+
+
+def arg(value):
+    return {'$OBJECT': 'arg', 'name': 'x', 'arg': value}
+
+
+def call(ln, next=None, name=None, args=None, **options):
+    line = {'ln': ln, 'method': 'execute', 'service': 'http', 'next': next,
+            'name': name, 'args': args}
+    line.update(options)
+    return line
+
+
+def make_lines(*items):
+    lines = Lines(story=None)
+    for item in items:
+        lines.lines[item['ln']] = item
+        lines._lines.append(item['ln'])
+    return lines
+
+
+def test_independence_init(magic):
+    profiler = magic()
+    independence = Independence(profiler=profiler)
+    assert independence.profiler == profiler
+    assert independence.groups == 0
+
+
+def test_independence_reads():
+    line = {'name': ['a', 'b'], 'args': [arg(path('c', path('d')))]}
+    assert Independence.reads(line) == {'a', 'c', 'd'}
+
+
+def test_independence_reads_indexes():
+    line = {'name': ['m', path('k', path('i'))], 'args': []}
+    assert Independence.reads(line) == {'m', 'k', 'i'}
+
+
+def test_independence_writes():
+    line = {'name': ['a', 'b'], 'output': ['c'], 'service': 'r'}
+    assert Independence.writes(line, {'r'}) == {'a', 'c', 'r'}
+    assert Independence.writes(line, set()) == {'a', 'c'}
+
+
+def test_independence_is_call():
+    assert Independence.is_call({'method': 'execute'}) is True
+    assert Independence.is_call({'method': 'execute', 'enter': '2'}) is False
+    assert Independence.is_call({'method': 'expression'}) is False
+
+
+def test_independence_variables():
+    lines = {'1': {'name': ['a', 'b'], 'output': None},
+             '2': {'name': None, 'output': ['c']}}
+    assert Independence.variables(lines) == {'a', 'c'}
+
+
+def test_independence_process(magic):
+    profiler = magic()
+    lines = make_lines(call('1', '2', name=['a']),
+                       call('2', '3', name=['b']),
+                       call('3', '4', args=[arg(path('a'))]),
+                       call('4'))
+    Independence(profiler=profiler).process(lines)
+    assert lines.lines['1']['parallel'] == ['1', '2']
+    assert lines.lines['3']['parallel'] == ['3', '4']
+    assert 'parallel' not in lines.lines['2']
+    profiler.span.assert_called_with('independence')
+    profiler.count.assert_called_with('parallel_groups', 2)
+
+
+def test_independence_process_writes(independence):
+    lines = make_lines(call('1', '2', args=[arg(path('a'))]),
+                       call('2', '3', name=['b']),
+                       call('3', '4', name=['a']),
+                       call('4', name=['a']))
+    independence.process(lines)
+    assert lines.lines['1']['parallel'] == ['1', '2']
+    assert 'parallel' not in lines.lines['3']
+    assert 'parallel' not in lines.lines['4']
+
+
+def test_independence_process_services(independence):
+    lines = make_lines(call('1', '2', output=['r'], enter='2'),
+                       call('2', '3', service='r', parent='1'),
+                       call('3', '4', service='r', parent='1'),
+                       call('4'))
+    independence.process(lines)
+    assert all('parallel' not in line for line in lines.lines.values())
+
+
+def test_independence_process_blocks(independence):
+    lines = make_lines(call('1', '2'),
+                       {'ln': '2', 'method': 'if', 'enter': '3', 'next': '3'},
+                       call('3', '4', parent='2'),
+                       call('4'))
+    independence.process(lines)
+    assert all('parallel' not in line for line in lines.lines.values())
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture
+
+from storyscript.compiler.json.Lines import Lines
+from storyscript.compiler.optimizer import Inlining
+
+
+@fixture
+def inlining():
+    return Inlining()
+
+
+def path(*names):
+    return {'$OBJECT': 'path', 'paths': list(names)}
+
+
+def integer(value):
+    return {'$OBJECT': 'int', 'int': value}
+
+
+def expression(name, *values):
+    return {'$OBJECT': 'expression', 'expression': name,
+            'values': list(values)}
+
+
+def mutation(name):
+    return {'$OBJECT': 'mutation', 'mutation': name, 'args': []}
+
+
+def make_lines(*items):
+    lines = Lines(story=None)
+    for item in items:
+        lines.lines[item['ln']] = item
+        lines._lines.append(item['ln'])
+    return lines
+
+
+def test_inlining_init(magic):
+    profiler = magic()
+    inlining = Inlining(profiler=profiler)
+    assert inlining.profiler == profiler
+    assert inlining.uses == {}
+    assert inlining.inlined == 0
+
+
+def test_inlining_init_profiler(inlining):
+    assert inlining.profiler.enabled is False
+
+
+def test_inlining_temporary():
+    assert Inlining.temporary({'name': ['__p-1.1']}) == '__p-1.1'
+    assert Inlining.temporary({'name': ['a']}) is None
+    assert Inlining.temporary({'name': ['__p-1.1', 'a']}) is None
+    assert Inlining.temporary({'name': None}) is None
+
+
+def test_inlining_paths():
+    value = [expression('sum', path('a'), path('b', path('c')))]
+    result = list(Inlining.paths(value))
+    assert result == [path('a'), path('b', path('c')), path('c')]
+
+
+def test_inlining_count(inlining):
+    value = [path('__p-1.1'), path('__p-1.2', integer(0)), path('a')]
+    inlining.count('1', value)
+    assert inlining.uses == {'__p-1.1': ['1'], '__p-1.2': [None]}
+
+
+def test_inlining_replace():
+    value = [expression('sum', path('__p-1.1'), path('__p-1.1', 'a'))]
+    result = Inlining.replace(value, '__p-1.1', integer(1))
+    assert result == [expression('sum', integer(1), path('__p-1.1', 'a'))]
+
+
+def test_inlining_is_copy():
+    line = {'method': 'expression', 'args': [path('__p-1.1')]}
+    assert Inlining.is_copy(line, '__p-1.1') is True
+    assert Inlining.is_copy(line, '__p-1.2') is False
+    line['method'] = 'return'
+    assert Inlining.is_copy(line, '__p-1.1') is False
+
+
+def test_inlining_process_expression(magic):
+    profiler = magic()
+    lines = make_lines(
+        {'ln': '1.1', 'method': 'expression', 'name': ['__p-1.1'],
+         'args': [expression('sum', path('a'), integer(1))], 'next': '1'},
+        {'ln': '1', 'method': 'expression', 'name': ['b'],
+         'args': [expression('multiplication', path('__p-1.1'),
+                             integer(2))]})
+    Inlining(profiler=profiler).process(lines)
+    assert lines._lines == ['1']
+    assert lines.lines['1']['args'] == [
+        expression('multiplication', expression('sum', path('a'), integer(1)),
+                   integer(2))]
+    profiler.span.assert_called_with('inlining')
+    profiler.count.assert_called_with('inlined_temporaries', 1)
+
+
+def test_inlining_process_mutation(inlining):
+    lines = make_lines(
+        {'ln': '1', 'method': 'while', 'enter': '2.1', 'args': []},
+        {'ln': '2.1', 'method': 'mutation', 'name': ['__p-2.1'],
+         'args': [path('a'), mutation('length')], 'parent': '1',
+         'next': '2'},
+        {'ln': '2', 'method': 'expression', 'name': ['b'],
+         'args': [path('__p-2.1')], 'parent': '1'})
+    inlining.process(lines)
+    assert lines.lines['1']['enter'] == '2'
+    assert lines.lines['2'] == {'ln': '2', 'method': 'mutation',
+                                'name': ['b'], 'parent': '1',
+                                'args': [path('a'), mutation('length')]}
+    assert inlining.inlined == 1
+
+
+def test_inlining_process_chain(inlining):
+    lines = make_lines(
+        {'ln': '1.2', 'method': 'mutation', 'name': ['__p-1.2'],
+         'args': [path('a'), mutation('length')], 'next': '1.1'},
+        {'ln': '1.1', 'method': 'expression', 'name': ['__p-1.1'],
+         'args': [path('__p-1.2')], 'next': '1'},
+        {'ln': '1', 'method': 'expression', 'name': ['b'],
+         'args': [path('__p-1.1')]})
+    inlining.process(lines)
+    assert lines._lines == ['1']
+    assert lines.lines['1']['method'] == 'mutation'
+    assert inlining.inlined == 2
+
+
+def test_inlining_process_unused(inlining):
+    lines = make_lines(
+        {'ln': '1.1', 'method': 'expression', 'name': ['__p-1.1'],
+         'args': [integer(1)], 'next': '1'},
+        {'ln': '1', 'method': 'expression', 'name': ['b'],
+         'args': [integer(1)]})
+    inlining.process(lines)
+    assert lines._lines == ['1']
+
+
+def test_inlining_process_kept(inlining):
+    lines = make_lines(
+        {'ln': '1.1', 'method': 'execute', 'name': ['__p-1.1'],
+         'service': 'alpine', 'next': '1.2'},
+        {'ln': '1.2', 'method': 'mutation', 'name': ['__p-1.2'],
+         'args': [path('a'), mutation('length')], 'next': '1.3'},
+        {'ln': '1.3', 'method': 'expression', 'name': ['__p-1.3'],
+         'args': [path('a')], 'next': '1.4'},
+        {'ln': '1.4', 'method': 'expression', 'name': ['__p-1.4'],
+         'args': [path('a')], 'next': '1'},
+        {'ln': '1', 'method': 'while', 'args': [expression(
+            'sum', path('__p-1.1'), path('__p-1.2'), path('__p-1.3'),
+            path('__p-1.3'), path('__p-1.4'))]})
+    inlining.process(lines)
+    assert lines._lines == ['1.1', '1.2', '1.3', '1.4', '1']
+    assert inlining.inlined == 0
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture
+
+from storyscript.compiler.json.Lines import Lines
+from storyscript.compiler.optimizer import Liveness
+
+
+@fixture
+def liveness():
+    return Liveness()
+
+
+def path(*names):
+    return {'$OBJECT': 'path', 'paths': list(names)}
+
+
+def make_lines(*items):
+    lines = Lines(story=None)
+    for item in items:
+        lines.lines[item['ln']] = item
+        lines._lines.append(item['ln'])
+    return lines
+
+
+def test_liveness_init(magic):
+    profiler = magic()
+    liveness = Liveness(profiler=profiler)
+    assert liveness.profiler == profiler
+    assert liveness.released == 0
+
+
+def test_liveness_init_profiler(liveness):
+    assert liveness.profiler.enabled is False
+
+
+def test_liveness_defines():
+    assert Liveness.defines({'method': 'expression', 'name': ['a']}) == {'a'}
+    assert Liveness.defines({'method': 'expression',
+                             'name': ['a', 'b']}) == set()
+    assert Liveness.defines({'method': 'for', 'output': ['i']}) == {'i'}
+
+
+def test_liveness_defines_function():
+    line = {'method': 'function', 'output': ['int'],
+            'args': [{'$OBJECT': 'arg', 'name': 'n'}]}
+    assert Liveness.defines(line) == {'n'}
+
+
+def test_liveness_reads():
+    line = {'method': 'execute', 'service': 's', 'name': ['a', 'b'],
+            'args': [path('c', path('d')), path('e')]}
+    result = Liveness.reads(line, {'a', 'c', 'd', 's'})
+    assert result == {'a', 'c', 'd', 's'}
+
+
+def test_liveness_reads_indexes():
+    line = {'method': 'expression', 'name': ['m', path('j', path('i'))],
+            'args': []}
+    assert Liveness.reads(line, {'m', 'i', 'j'}) == {'m', 'i', 'j'}
+
+
+def test_liveness_block(liveness):
+    lines = {'1': {'method': 'for'},
+             '2': {'method': 'if', 'parent': '1'},
+             '3': {'method': 'expression', 'parent': '2'}}
+    assert liveness.block(lines, lines['3'], ('for',)) == '1'
+    assert liveness.block(lines, lines['3'], ('while',)) is None
+
+
+def test_liveness_successors(liveness):
+    lines = {'1': {'method': 'while', 'enter': '2', 'exit': '3'},
+             '2': {'method': 'expression', 'parent': '1', 'next': '3'},
+             '3': {'method': 'expression'}}
+    assert liveness.successors(lines, lines['1']) == {'2', '3'}
+    assert liveness.successors(lines, lines['2']) == {'1', '3'}
+    assert liveness.successors(lines, lines['3']) == set()
+
+
+def test_liveness_successors_guarded(liveness):
+    lines = {'1': {'method': 'try', 'enter': '2', 'exit': '3'},
+             '2': {'method': 'expression', 'parent': '1', 'next': '3'},
+             '3': {'method': 'catch', 'enter': '4', 'exit': '5'},
+             '4': {'method': 'expression', 'parent': '3', 'next': '5'},
+             '5': {'method': 'finally', 'enter': '6'},
+             '6': {'method': 'expression', 'parent': '5'}}
+    assert liveness.successors(lines, lines['2']) == {'3'}
+    assert liveness.successors(lines, lines['4']) == {'5'}
+    assert liveness.successors(lines, lines['6']) == set()
+
+
+def test_liveness_process(magic):
+    profiler = magic()
+    lines = make_lines(
+        {'ln': '1', 'method': 'execute', 'name': ['a'], 'next': '2'},
+        {'ln': '2', 'method': 'expression', 'name': ['b'],
+         'args': [path('a')], 'next': '3'},
+        {'ln': '3', 'method': 'execute', 'name': ['c'],
+         'args': [{'$OBJECT': 'arg', 'name': 'x', 'arg': path('b')}]})
+    Liveness(profiler=profiler).process(lines)
+    assert lines.lines['1'].get('release') is None
+    assert lines.lines['2']['release'] == ['a']
+    assert lines.lines['3']['release'] == ['b', 'c']
+    profiler.span.assert_called_with('liveness')
+    profiler.count.assert_called_with('released_variables', 3)
+
+
+def test_liveness_process_loop(liveness):
+    lines = make_lines(
+        {'ln': '1', 'method': 'expression', 'name': ['a'], 'next': '2'},
+        {'ln': '2', 'method': 'while', 'args': [path('n')], 'enter': '3',
+         'next': '3'},
+        {'ln': '3', 'method': 'expression', 'name': ['n'],
+         'args': [path('a')], 'parent': '2', 'next': '4'},
+        {'ln': '4', 'method': 'expression', 'name': ['b'],
+         'args': [path('n')]})
+    liveness.process(lines)
+    assert lines.lines['3'].get('release') is None
+    assert lines.lines['4']['release'] == ['b', 'n']
+
+
+def test_liveness_process_branches(liveness):
+    lines = make_lines(
+        {'ln': '1', 'method': 'expression', 'name': ['a'], 'next': '2'},
+        {'ln': '2', 'method': 'if', 'args': [path('a')], 'enter': '3',
+         'exit': '4', 'next': '3'},
+        {'ln': '3', 'method': 'expression', 'name': ['b'],
+         'args': [path('a')], 'parent': '2', 'next': '4'},
+        {'ln': '4', 'method': 'expression', 'name': ['c'],
+         'args': [path('a')]})
+    liveness.process(lines)
+    assert lines.lines['2'].get('release') is None
+    assert lines.lines['3']['release'] == ['b']
+    assert lines.lines['4']['release'] == ['a', 'c']
+
+
+def test_liveness_process_handlers(liveness):
+    lines = make_lines(
+        {'ln': '1', 'method': 'expression', 'name': ['a'], 'next': '2'},
+        {'ln': '2', 'method': 'execute', 'service': 'http', 'output': ['s'],
+         'enter': '3', 'next': '3'},
+        {'ln': '3', 'method': 'when', 'service': 's', 'output': ['r'],
+         'parent': '2', 'enter': '4', 'next': '4'},
+        {'ln': '4', 'method': 'execute', 'service': 'r', 'parent': '3',
+         'args': [path('a')]})
+    liveness.process(lines)
+    assert all('release' not in line for line in lines.lines.values())
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture
+
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.compiler.Compiler import Compiler
+from storyscript.compiler.semantics.PerformanceLint import PerformanceLint
+from storyscript.compiler.semantics.Semantics import Semantics
+from storyscript.parser import Tree
+
+
+@fixture
+def lint():
+    return PerformanceLint(function_table=None, mutation_table=None,
+                           features=None)
+
+
+def warnings(source, lint=True):
+    """
+    Checks a story, returning the names and lines of its warnings.
+    """
+    features = Features({'globals': True, 'lint': lint})
+    story = Story(source, features)
+    story.parse(parser=story._parser())
+    found = []
+    Compiler.generate(story.tree, features, warnings=found)
+    return [(warning.error, int(str(warning.line).split('.')[0]))
+            for warning in found]
+
+
+def test_performance_lint_init(lint):
+    assert lint.warnings == []
+    assert lint.temporaries == {}
+
+
+def test_performance_lint_init_warnings():
+    found = []
+    lint = PerformanceLint(function_table=None, mutation_table=None,
+                           features=None, warnings=found)
+    assert lint.warnings is found
+
+
+def test_performance_lint_direct():
+    inner = Tree('a', [])
+    tree = Tree('block', [Tree('rules', [Tree('a', [inner])]),
+                          Tree('nested_block', [Tree('a', [])])])
+    assert list(PerformanceLint.direct(tree, 'a')) == [tree.rules.a]
+
+
+def test_performance_lint_breaks():
+    loop = Tree('while_block', [Tree('break_statement', [])])
+    assert PerformanceLint.breaks(Tree('block', [loop])) is False
+    tree = Tree('block', [Tree('if_block', [Tree('break_statement', [])])])
+    assert PerformanceLint.breaks(tree) is True
+
+
+def test_performance_lint_disabled():
+    assert warnings('foreach [1] as i\n    a = http fetch\n',
+                    lint=False) == []
+
+
+def test_performance_lint_service():
+    source = ('foreach [1, 2] as i\n'
+              '    a = http fetch url: "u"\n'
+              '    b = http fetch url: "{i}"\n')
+    assert warnings(source) == [('lint_loop_invariant_service', 2)]
+
+
+def test_performance_lint_service_assigned():
+    source = ('foreach ["a", "b"] as i\n'
+              '    u = i\n'
+              '    a = http fetch url: u\n')
+    assert warnings(source) == []
+
+
+def test_performance_lint_service_while():
+    source = ('while true\n'
+              '    a = http fetch url: "u"\n')
+    assert warnings(source) == []
+
+
+def test_performance_lint_mutation_loop():
+    source = ('a = "x"\n'
+              'foreach [1, 2] as i\n'
+              '    b = a.length()\n'
+              '    c = i.increment()\n')
+    assert warnings(source) == [('lint_repeated_mutation', 3)]
+
+
+def test_performance_lint_mutation_repeated():
+    source = ('a = "x"\n'
+              'b = a.lowercase().uppercase()\n'
+              'c = a.lowercase().uppercase()\n'
+              'a = "y"\n'
+              'd = a.lowercase()\n')
+    assert warnings(source) == [('lint_repeated_mutation', 3)]
+
+
+def test_performance_lint_mutation_function():
+    source = ('function f s:string returns int\n'
+              '    n = s.length()\n'
+              '    return s.length()\n'
+              'function g s:string returns int\n'
+              '    return s.length()\n')
+    assert warnings(source) == [('lint_repeated_mutation', 3)]
+
+
+def test_performance_lint_while():
+    source = ('c = 0\n'
+              'while c < 3\n'
+              '    d = 1\n'
+              'while c < 3\n'
+              '    c = c + 1\n'
+              'while true\n'
+              '    if c > 1\n'
+              '        break\n'
+              'while true\n'
+              '    log info msg: "x"\n')
+    assert warnings(source) == [('lint_while_no_exit', 2)]
+
+
+def test_performance_lint_while_nested_break():
+    source = ('while true\n'
+              '    foreach [1] as i\n'
+              '        break\n')
+    assert warnings(source) == [('lint_while_no_exit', 1)]
+
+
+def test_performance_lint_while_temporary():
+    source = ('a = "x"\n'
+              'while a.length() < 3\n'
+              '    a = "{a}x"\n')
+    assert ('lint_while_no_exit', 2) not in warnings(source)
+
+
+def test_performance_lint_concat():
+    source = ('a = "x"\n'
+              'n = 0\n'
+              'foreach [1, 2] as i\n'
+              '    a = a + "b"\n'
+              '    n = n + i\n')
+    assert warnings(source) == [('lint_string_concat_loop', 4)]
+
+
+def test_performance_lint_concat_interpolation():
+    source = ('a = ""\n'
+              'foreach ["a", "b"] as i\n'
+              '    a = "{a}{i}"\n')
+    assert warnings(source) == [('lint_string_concat_loop', 3)]
+
+
+def test_semantics_lint(patch, magic):
+    patch.object(PerformanceLint, 'visit')
+    profiler = magic()
+    found = []
+    semantics = Semantics(Features({'lint': True}), profiler=profiler,
+                          warnings=found)
+    semantics.function_table = None
+    semantics.mutation_table = None
+    tree = Tree('start', [])
+    semantics.lint(tree)
+    PerformanceLint.visit.assert_called_with(tree)
+    profiler.span.assert_called_with('PerformanceLint')
+    profiler.count.assert_called_with('lint_warnings', 0)
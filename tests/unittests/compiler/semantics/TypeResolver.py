@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 from lark.lexer import Token
 
-from storyscript.compiler.semantics.TypeResolver import ScopeSelectiveVisitor
+from pytest import raises
+
+from storyscript.Features import Features
+from storyscript.compiler.semantics.TypeResolver import \
+    ScopeSelectiveVisitor, TypeResolver
+from storyscript.exceptions import CompilerError
 from storyscript.parser import Tree
 
 
@@ -72,3 +77,54 @@ def test_scope_selective_visitor_token():
     ]), scope=None)
     assert tv._a == 3
     assert tv._b == 1
+
+
+def type_resolver(errors):
+    return TypeResolver(function_table=None, mutation_table=None,
+                        features=Features(None), errors=errors)
+
+
+def test_type_resolver_independent():
+    assignment = Tree('block', [Tree('rules', [Tree('assignment', [])])])
+    expression = Tree('block', [Tree('rules', [Tree('absolute_expression',
+                                                    [])])])
+    function = Tree('block', [Tree('function_block', [])])
+    assert TypeResolver.independent(assignment) is False
+    assert TypeResolver.independent(expression) is True
+    assert TypeResolver.independent(function) is True
+
+
+def test_type_resolver_start_errors(patch):
+    """
+    Ensures errors of independent blocks are collected, and that the others
+    are raised
+    """
+    error = CompilerError('error')
+    patch.object(TypeResolver, 'visit', side_effect=[error, None, error])
+    patch.object(TypeResolver, 'independent', side_effect=[True, False])
+    errors = []
+    resolver = type_resolver(errors)
+    resolver.in_when_block = False
+    tree = Tree('start', [Tree('block', []), Tree('block', []),
+                          Tree('block', [])])
+    with raises(CompilerError):
+        resolver.start(tree)
+    assert errors == [error]
+    assert TypeResolver.visit.call_count == 3
+
+
+def test_type_resolver_visit_isolated_flags(patch):
+    """
+    Ensures the flags of the block in which an error occurred are restored
+    """
+    resolver = type_resolver([])
+
+    def visit(block, scope):
+        resolver.in_when_block = True
+        raise CompilerError('error')
+
+    patch.object(TypeResolver, 'visit', side_effect=visit)
+    patch.object(TypeResolver, 'independent', return_value=True)
+    resolver.visit_isolated(Tree('block', []), None)
+    assert resolver.in_when_block is False
+    assert len(resolver.errors) == 1
@@ -26,3 +26,15 @@ def test_a_selective_visitor():
     visitor = TestVisitor()
     visitor.visit(tree)
     assert visitor._node == 2
+
+
+def test_selective_visitor_limits(magic):
+    """
+    Tests that visited nodes are counted against the limits.
+    """
+    limits = magic()
+    visitor = SelectiveVisitor(function_table=None, mutation_table=None,
+                               features=None, limits=limits)
+    tree = Tree('node', [])
+    visitor.visit(tree)
+    limits.step.assert_called_with(tree)
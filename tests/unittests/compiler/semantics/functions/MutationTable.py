@@ -0,0 +1,21 @@
+from storyscript.compiler.semantics.functions.MutationTable import \
+    MutationTable
+from storyscript.compiler.semantics.types.Types import AnyType, IntType
+
+
+def test_mutation_table_resolved():
+    table = MutationTable.init()
+    assert table.resolved == 0
+    assert table.resolve(IntType.instance(), 'increment') is not None
+    assert table.resolve(AnyType.instance(), 'increment') is not None
+    assert table.resolve(IntType.instance(), 'foo') is None
+    assert table.resolved == 2
+
+
+def test_mutation_table_init_shared():
+    first = MutationTable.init()
+    second = MutationTable.init()
+    assert MutationTable.hub_mutations is not None
+    assert first.mutations is second.mutations is MutationTable.hub_mutations
+    first.resolve(IntType.instance(), 'increment')
+    assert second.resolved == 0
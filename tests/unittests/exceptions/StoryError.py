@@ -104,6 +104,21 @@ def test_storyerror_header(patch, storyerror, error):
                                      storyerror.int_line(), error.column)
 
 
+def test_storyerror_header_warning(patch, storyerror):
+    patch.many(StoryError, ['name', 'int_line'])
+    storyerror.with_color = False
+    storyerror.error_tuple = ('W0001', 'hint')
+    assert storyerror.header().startswith('Warning: performance issue in ')
+
+
+def test_storyerror_is_warning(storyerror):
+    assert storyerror.is_warning() is False
+    storyerror.error_tuple = ('E0001', '')
+    assert storyerror.is_warning() is False
+    storyerror.error_tuple = ('W0001', '')
+    assert storyerror.is_warning() is True
+
+
 def test_storyerror_symbols(patch, storyerror, error):
     """
     Ensures StoryError.symbols creates one symbol when there is no end column.
@@ -144,6 +159,19 @@ def test_story_error_symbols_end_column(patch, storyerror, error):
     assert result == '      ^^^'
 
 
+@mark.parametrize('end_column', [None, 'None'])
+def test_story_error_symbols_unknown_end_column(storyerror, error,
+                                                end_column):
+    """
+    Ensures StoryError.symbols creates one symbol when the end column is
+    unknown.
+    """
+    error.end_column = end_column
+    error.column = '1'
+    storyerror.with_color = False
+    assert storyerror.symbols(line=' a') == '      ^'
+
+
 def test_story_error_symbols_end_column_tabs(patch, storyerror, error):
     """
     Ensures StoryError.symbols deals correctly with tabs.
@@ -392,6 +420,32 @@ def test_storyerror_echo(patch, storyerror):
     click.echo.assert_called_with(StoryError.message())
 
 
+def test_storyerror_to_dict(patch, storyerror, error):
+    """
+    Ensures StoryError.to_dict returns the error code and its position
+    """
+    patch.many(StoryError, ['process', 'error_code', 'hint', 'int_line'])
+    error.column = '3'
+    error.end_column = 5
+    result = storyerror.to_dict()
+    assert StoryError.process.call_count == 1
+    assert result == {'code': StoryError.error_code(),
+                      'hint': StoryError.hint(), 'path': None,
+                      'line': StoryError.int_line(), 'column': 3,
+                      'end_column': 5}
+
+
+def test_storyerror_to_dict_no_position(patch):
+    """
+    Ensures StoryError.to_dict supports errors without a position
+    """
+    storyerror = StoryError.create_error('first_option_more_stories')
+    result = storyerror.to_dict()
+    assert result['code'] == 'E0055'
+    assert result['line'] is None
+    assert result['column'] is None
+
+
 def test_storyerror_create_error(patch):
     """
     Ensures that Errors without Tokens can be created
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import io
+from unittest.mock import ANY
 
 from lark import Lark
 
@@ -88,6 +89,56 @@ def test_parser_parse(patch, parser):
     assert result == Parser.transformer().transform()
 
 
+def test_parser_parse_profiler(patch, magic, parser):
+    """
+    Ensures Parser.parse times parsing and transforming separately
+    """
+    patch.many(Parser, ['transformer', 'stream_parse'])
+    profiler = magic()
+    result = parser.parse('source', profiler=profiler)
+    Parser.stream_parse.assert_called_with('source\n', profiler, None)
+    parser.lark.parse.assert_not_called()
+    spans = [c[0][0] for c in profiler.span.call_args_list]
+    assert spans == ['parse', 'transform']
+    Parser.transformer().transform.assert_called_with(Parser.stream_parse())
+    assert result == Parser.transformer().transform()
+
+
+def test_parser_parse_limits(patch, magic, parser):
+    """
+    Ensures Parser.parse guards the token stream and checks the size of the
+    tree when given limits
+    """
+    patch.many(Parser, ['transformer', 'stream_parse'])
+    limits = magic()
+    parser.parse('source', limits=limits)
+    Parser.stream_parse.assert_called_with('source\n', ANY, limits)
+    limits.check_nodes.assert_called_with(Parser.stream_parse())
+    assert limits.check_deadline.call_count == 1
+
+
+def test_parser_stream_parse(magic, parser):
+    profiler = magic()
+    frontend = parser.lark.parser
+    result = parser.stream_parse('source', profiler)
+    frontend.lex.assert_called_with('source')
+    profiler.timed.assert_called_with('lex', frontend.lex(),
+                                      counter='tokens')
+    frontend.parser.parse.assert_called_with(
+        profiler.timed(), frontend.lexer.set_parser_state)
+    assert result == frontend.parser.parse()
+
+
+def test_parser_stream_parse_limits(magic, parser):
+    profiler = magic()
+    limits = magic()
+    frontend = parser.lark.parser
+    parser.stream_parse('source', profiler, limits)
+    limits.tokens.assert_called_with(frontend.lex())
+    profiler.timed.assert_called_with('lex', limits.tokens(),
+                                      counter='tokens')
+
+
 def test_parser_parse_empty(patch, parser, magic):
     """
     Ensures that empty stories are parsed correctly
@@ -165,6 +165,12 @@ def test_tree_attributes(patch):
     assert result == Tree.node()
 
 
+def test_tree_count_nodes():
+    tree = Tree('start', [Tree('block', [Tree('line', ['x'])]),
+                          Tree('block', [])])
+    assert tree.count_nodes() == 4
+
+
 def test_tree_find():
     """
     Ensures Tree.find can find the correct subtree.